@@ -0,0 +1,93 @@
+import contextlib
+import shutil
+import socket
+import subprocess
+from typing import Iterator
+
+from benchmarks.timing import measure, report
+from src.data.nmapdevice import NmapDevice
+from src.executor.connect_scanner import TOP_PORTS, ConnectScanner
+from src.util.display import Display
+
+HOSTS = 50
+TIMEOUT = 0.2
+
+
+def loopback_devices() -> list[NmapDevice]:
+    # Every address in 127.0.0.0/8 is loopback, so these are real hosts that answer every connect
+    return [
+        NmapDevice(hostname=None, ip_addr=f"127.0.0.{i}", mac_addr=None, os=None, ports=None)
+        for i in range(1, HOSTS + 1)
+    ]
+
+
+@contextlib.contextmanager
+def filtered_port(devices: list[NmapDevice]) -> Iterator[int]:
+    """
+    Listen on the same port of every device without ever accepting, once the backlog of each listener is full
+    further connects go unanswered, like a firewalled port on a real network
+    :return: the port
+    """
+    with contextlib.ExitStack() as stack:
+        port: int = 0
+        for device in devices:
+            listener: socket.socket = stack.enter_context(socket.socket())
+            listener.bind((device.ip_addr, port))
+            listener.listen(0)
+            port = listener.getsockname()[1]
+            stack.enter_context(socket.create_connection((device.ip_addr, port)))
+        yield port
+
+
+def sequential_scan(devices: list[NmapDevice], ports: list[int]) -> None:
+    for device in devices:
+        for port in ports:
+            with contextlib.suppress(OSError), socket.create_connection((device.ip_addr, port), timeout=TIMEOUT):
+                pass
+
+
+def run() -> None:
+    Display().enable_headless()
+    devices: list[NmapDevice] = loopback_devices()
+    probes: int = len(devices) * len(TOP_PORTS)
+
+    # Loopback answers every connect straight away, so this is the cost per port of the scanner itself
+    report(f"sequential, {HOSTS} hosts x top 100", measure(lambda: sequential_scan(devices, TOP_PORTS)), probes, "port")
+    report(
+        f"connect scanner, {HOSTS} hosts x top 100",
+        measure(lambda: ConnectScanner(timeout=TIMEOUT).scan(devices)),
+        probes,
+        "port",
+    )
+
+    # With one unanswered port per host the sequential scan waits out every timeout in turn
+    with filtered_port(devices) as port:
+        ports: list[int] = [*TOP_PORTS, port]
+        probes = len(devices) * len(ports)
+        report(
+            f"sequential, {HOSTS} hosts x top 100 + 1 filtered",
+            measure(lambda: sequential_scan(devices, ports)),
+            probes,
+            "port",
+        )
+        report(
+            f"connect scanner, {HOSTS} hosts x top 100 + 1 filtered",
+            measure(lambda: ConnectScanner(ports=ports, timeout=TIMEOUT).scan(devices)),
+            probes,
+            "port",
+        )
+
+    if shutil.which("nmap") is None:
+        print("nmap not found, skipping the nmap comparison")
+        return
+    nmap_command: list[str] = ["nmap", "-F", "-sT", "-n", "-Pn", "-oX", "-", f"127.0.0.1-{HOSTS}"]
+    report(
+        f"nmap -F -sT, {HOSTS} hosts x top 100",
+        measure(lambda: subprocess.run(nmap_command, capture_output=True, check=False)),
+        len(devices) * len(TOP_PORTS),
+        "port",
+    )
+
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,56 @@
+import os
+import tempfile
+
+from benchmarks.timing import measure, report
+from src.data.nmapdevice import NmapDevice
+from src.db import db_connector
+from src.db.data.device import Device
+from src.db.service.device_identity_index import DeviceIdentityIndex
+from src.db.service.device_service import DeviceService
+
+DEVICES = 5_000
+
+
+def mac_for(i: int) -> str:
+    return ":".join(f"{b:02X}" for b in (0xAA, 0xBB, (i >> 16) & 0xFF, (i >> 8) & 0xFF, i & 0xFF, 0x01))
+
+
+def run() -> None:
+    with tempfile.TemporaryDirectory() as directory:
+        db_connector.DB_PATH = os.path.join(directory, "database.db")
+        DeviceService().create_many(
+            Device(id=None, device_name=f"device-{i}", owned_by=None, mac_addr=mac_for(i)) for i in range(DEVICES)
+        )
+        hits: list[NmapDevice] = [
+            NmapDevice(
+                hostname=None,
+                ip_addr=f"10.0.{i >> 8}.{i & 0xFF}",
+                mac_addr=f"{mac_for(i)} | Vendor",
+                os=None,
+                ports=None,
+            )
+            for i in range(DEVICES)
+        ]
+
+        service = DeviceService()
+        # pylint: disable=protected-access
+        report(
+            "query per scan hit",
+            measure(
+                lambda: [
+                    service._connection.find_one("SELECT * FROM devices WHERE mac_addr = ?;", (hit.mac_addr[:17],))
+                    for hit in hits
+                ]
+            ),
+            DEVICES,
+            "hit",
+        )
+
+        index = DeviceIdentityIndex()
+        index.invalidate()
+        report("DeviceIdentityIndex.load", measure(index.load), DEVICES, "device")
+        report("DeviceIdentityIndex.resolve_all", measure(lambda: index.resolve_all(hits)), DEVICES, "hit")
+
+
+if __name__ == "__main__":
+    run()
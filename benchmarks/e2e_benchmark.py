@@ -0,0 +1,128 @@
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+
+from benchmarks.timing import measure, report
+
+FAKE_NMAP: Path = Path(__file__).parent / "fake_nmap.py"
+NETWORK = "10.0.0.0"
+RUNS = 5
+
+
+@dataclass
+class Scenario:
+    label: str
+    hosts: int
+    ports: int
+    args: list[str] = field(default_factory=lambda: ["--port-scan"])
+    # Any other FAKE_NMAP_ settings, e.g. latency or failures
+    environment: dict[str, str] = field(default_factory=dict)
+
+
+SCENARIOS: list[Scenario] = [
+    Scenario("discovery only, 16 hosts", 16, 4, args=[]),
+    Scenario("discovery only, 254 hosts", 254, 4, args=[]),
+    Scenario("port scan, 16 hosts x 4 ports", 16, 4),
+    Scenario("port scan, 64 hosts x 4 ports", 64, 4),
+    Scenario("port scan, 64 hosts x 64 ports", 64, 64),
+    Scenario("port scan, 16 hosts, 0.2s per nmap run", 16, 4, environment={"FAKE_NMAP_LATENCY": "0.2"}),
+    Scenario("progressive scans, 16 hosts x 16 ports", 16, 16, args=["--port-scan", "--extended-port-scan"]),
+    Scenario("port scan, 64 hosts, 20% of runs fail", 64, 4, environment={"FAKE_NMAP_FAILURE_RATE": "0.2"}),
+    Scenario("port scan, 64 hosts, 20% of runs cut off", 64, 4, environment={"FAKE_NMAP_PARTIAL_RATE": "0.2"}),
+]
+
+
+def whos_home_command(args: list[str]) -> list[str]:
+    return [
+        sys.executable,
+        "-m",
+        "src.whos_home",
+        *args,
+        "--nmap-path",
+        str(FAKE_NMAP),
+        "--output",
+        "jsonl",
+        "--headless",
+    ]
+
+
+def run_whos_home(args: list[str], environment: dict[str, str], cache: Path) -> tuple[float, list[dict]]:
+    """
+    Run the whole CLI in a fresh interpreter against the fake nmap, as a user would run it
+    :param args: the arguments after `main`
+    :param environment: FAKE_NMAP_ settings
+    :param cache: directory to keep the caches in, so runs don't share them with the user's
+    :return: the seconds taken and the json records output
+    """
+    started: float = time.perf_counter()
+    completed = subprocess.run(
+        whos_home_command(args),
+        capture_output=True,
+        text=True,
+        check=False,
+        env={**os.environ, "XDG_CACHE_HOME": str(cache), **environment},
+    )
+    seconds: float = time.perf_counter() - started
+    records: list[dict] = [json.loads(line) for line in completed.stdout.splitlines() if line.startswith("{")]
+    return seconds, records
+
+
+def record_and_replay(cache: Path) -> None:
+    # Recorded from the stand-in itself, recording from a real nmap only needs FAKE_NMAP_REAL left as nmap
+    recordings: str = str(cache / "recordings")
+    seconds, _ = run_whos_home(
+        [NETWORK, "--port-scan"],
+        {"FAKE_NMAP_HOSTS": "16", "FAKE_NMAP_RECORD_DIR": recordings, "FAKE_NMAP_REAL": str(FAKE_NMAP)},
+        cache / "record",
+    )
+    report("record port scan, 16 hosts", seconds, 16, "host")
+    seconds, records = run_whos_home([NETWORK, "--port-scan"], {"FAKE_NMAP_REPLAY_DIR": recordings}, cache / "replay")
+    report(f"replay port scan, {count(records, 'port_scan')} hosts", seconds, 16, "host")
+
+
+def fake_nmap_run() -> float:
+    """
+    Time a single port scan by the fake nmap on its own, every nmap run of a scenario costs at least this, and
+    most of it is starting an interpreter
+    :return: the seconds taken
+    """
+    return (
+        measure(
+            lambda: subprocess.run(
+                [str(FAKE_NMAP), "-F", "-sV", "-O", "-oX", "-", "10.0.0.1"], capture_output=True, check=True
+            ),
+            RUNS,
+        )
+        / RUNS
+    )
+
+
+def count(records: list[dict], record_type: str) -> int:
+    return sum(1 for record in records if record.get("type") == record_type)
+
+
+def run() -> None:
+    report("fake nmap port scan alone", fake_nmap_run())
+    with tempfile.TemporaryDirectory() as directory:
+        for i, scenario in enumerate(SCENARIOS):
+            seconds, records = run_whos_home(
+                [NETWORK, *scenario.args],
+                {
+                    "FAKE_NMAP_HOSTS": str(scenario.hosts),
+                    "FAKE_NMAP_PORTS": str(scenario.ports),
+                    **scenario.environment,
+                },
+                # Each scenario starts with empty caches, as a first run would
+                Path(directory) / str(i),
+            )
+            report(scenario.label, seconds, max(count(records, "host"), 1), "host")
+        record_and_replay(Path(directory))
+
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,48 @@
+import os
+import tempfile
+from dataclasses import asdict, astuple
+
+from benchmarks.timing import measure, report
+from src.db import db_connector
+from src.db.data.device import Device
+from src.db.service.device_service import DeviceService
+
+ROWS = 20_000
+
+
+def legacy_create(service: DeviceService, device: Device) -> None:
+    """
+    The create path before statements were cached, kept here to compare against
+    """
+    entity_dict = dict(asdict(device).items())
+    cols = ", ".join(entity_dict.keys())
+    vals = ", ".join([":" + k for k in entity_dict.keys()])
+    # pylint: disable=protected-access
+    service._connection.find_all(f"INSERT INTO devices ({cols}) VALUES ({vals});", entity_dict)
+
+
+def run() -> None:
+    devices: list[Device] = [Device(id=None, device_name=f"device-{i}", owned_by=None) for i in range(ROWS)]
+
+    report("dataclasses.astuple", measure(lambda: [astuple(d) for d in devices]), ROWS, "row")
+    report("Entity.to_row", measure(lambda: [d.to_row() for d in devices]), ROWS, "row")
+    report("dataclasses.asdict", measure(lambda: [asdict(d) for d in devices]), ROWS, "row")
+    report("Entity.to_dict", measure(lambda: [d.to_dict() for d in devices]), ROWS, "row")
+
+    with tempfile.TemporaryDirectory() as directory:
+        db_connector.DB_PATH = os.path.join(directory, "database.db")
+        service = DeviceService()
+
+        report(
+            "legacy create (sql rebuilt per row)",
+            measure(lambda: [legacy_create(service, d) for d in devices]),
+            ROWS,
+            "row",
+        )
+        report("EntityService.create (cached sql)", measure(lambda: [service.create(d) for d in devices]), ROWS, "row")
+        report("EntityService.create_many", measure(lambda: service.create_many(devices)), ROWS, "row")
+        report("EntityService.read_all", measure(service.read_all), ROWS * 3, "row")
+
+
+if __name__ == "__main__":
+    run()
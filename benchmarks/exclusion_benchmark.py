@@ -0,0 +1,53 @@
+import ipaddress
+import random
+
+from benchmarks.timing import measure, report
+from src.util.exclusions import ExclusionIndex
+from src.util.host_range import shards
+
+EXCLUSIONS = 50_000
+LOOKUPS = 100_000
+
+
+def synthetic_exclusions() -> list[ipaddress.IPv4Network]:
+    generator = random.Random(42)
+    # Mostly single devices with a few small subnets, spread across 10.0.0.0/8
+    return [
+        ipaddress.ip_network(f"{ipaddress.IPv4Address(0x0A000000 + generator.getrandbits(24))}/{prefix}", strict=False)
+        for prefix in generator.choices([32, 30, 28], weights=[90, 8, 2], k=EXCLUSIONS)
+    ]
+
+
+def run() -> None:
+    exclusions: list[ipaddress.IPv4Network] = synthetic_exclusions()
+    generator = random.Random(7)
+    addresses: list[str] = [str(ipaddress.IPv4Address(0x0A000000 + generator.getrandbits(24))) for _ in range(LOOKUPS)]
+    # A linear scan of the exclusions per address, for comparison
+    sample: list[ipaddress.IPv4Address] = [ipaddress.ip_address(address) for address in addresses[:100]]
+
+    index = ExclusionIndex(exclusions)
+    print(f"{len(exclusions)} exclusions merged into {len(index)} intervals")
+    report("build the index", measure(lambda: ExclusionIndex(exclusions)), len(exclusions), "exclusion")
+    report(f"check {len(addresses)} addresses", measure(lambda: [index.contains(a) for a in addresses]), LOOKUPS, "ip")
+    report(
+        f"check {len(sample)} addresses linearly",
+        measure(lambda: [any(address in network for network in exclusions) for address in sample]),
+        len(sample),
+        "ip",
+    )
+    report(
+        "filter the /16 shards of 10.0.0.0/8",
+        measure(lambda: [shard for shard in shards([ipaddress.ip_network("10.0.0.0/8")]) if not index.covers(shard)]),
+        256,
+        "shard",
+    )
+    report(
+        "exclusions within each /16 shard",
+        measure(lambda: [list(index.within(shard)) for shard in shards([ipaddress.ip_network("10.0.0.0/8")])]),
+        256,
+        "shard",
+    )
+
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,264 @@
+#!/usr/bin/env python3
+"""
+A stand-in for nmap that answers without touching the network, so the whole of whos_home can be run and timed
+offline, e.g. `whos_home main 10.0.0.0 --nmap-path benchmarks/fake_nmap.py --port-scan`. Only the standard library
+is used, of any Python 3.10 or later, as it is run as a separate process like nmap is.
+
+It is configured through the environment:
+
+- FAKE_NMAP_HOSTS: hosts found up by host discovery, spread over the network scanned, 16 by default
+- FAKE_NMAP_PORTS: open ports found on each host by a port scan, 4 by default
+- FAKE_NMAP_LATENCY: seconds each run takes before answering, 0 by default
+- FAKE_NMAP_FAILURE_RATE: chance a run fails outright, exiting 1 with an error and no output
+- FAKE_NMAP_PARTIAL_RATE: chance a run is cut off half way through its XML, exiting 2
+- FAKE_NMAP_SEED: seed of the hosts and ports generated and of the failures, 0 by default
+- FAKE_NMAP_REPLAY_DIR: answer with the XML recorded for the same arguments, when there is one
+- FAKE_NMAP_RECORD_DIR: run the nmap in FAKE_NMAP_REAL, "nmap" by default, and record what it answers
+"""
+import hashlib
+import html
+import ipaddress
+import os
+import random
+import socket
+import sys
+import time
+from pathlib import Path
+
+VERSION = """Nmap version 7.95 ( https://nmap.org )
+Platform: x86_64-pc-linux-gnu
+Compiled with: liblua-5.4.6 openssl-3.0.13 libssh2-1.11.0 libz-1.3 libpcre2-10.42 libpcap-1.10.4 nmap-libdnet-1.12 ipv6
+Compiled without:
+Available nsock engines: epoll poll select
+"""
+
+# Options followed by a value, which is skipped when looking for the target
+OPTIONS_WITH_VALUES = {
+    "-oX",
+    "-p",
+    "--exclude",
+    "--excludefile",
+    "--exclude-ports",
+    "--max-retries",
+    "--host-timeout",
+    "--min-rate",
+    "--max-rate",
+    "--min-hostgroup",
+    "--max-rtt-timeout",
+    "--initial-rtt-timeout",
+}
+
+# Roughly nmap's most common ports, in order, the open ports generated are picked from these first
+COMMON_PORTS = [80, 23, 443, 21, 22, 25, 3389, 110, 445, 139, 143, 53, 135, 3306, 8080, 1723, 111, 995, 993, 5900]
+TOP_100_PORTS = sorted(
+    set(COMMON_PORTS)
+    | {7, 9, 13, 26, 37, 79, 81, 88, 106, 113, 119, 144, 179, 199, 389, 427, 444, 465, 513, 514, 515, 543, 544}
+    | {548, 554, 587, 631, 646, 873, 990, 1025, 1026, 1027, 1028, 1029, 1110, 1433, 1720, 1755, 1900, 2000, 2001}
+    | {2049, 2121, 2717, 3000, 3128, 3986, 4899, 5000, 5009, 5051, 5060, 5101, 5190, 5357, 5432, 5631, 5666, 5800}
+    | {6000, 6001, 6646, 7070, 8000, 8008, 8009, 8081, 8443, 8888, 9100, 9999, 10000, 32768, 49152, 49153, 49154}
+    | {49155, 49156, 49157}
+)
+
+MAC_PREFIXES = ["B8:27:EB", "DC:A6:32", "00:1A:11", "F0:9F:C2", "3C:22:FB", "00:17:88"]
+OPERATING_SYSTEMS = [
+    ("Linux 5.0 - 5.14", "Linux", "Linux"),
+    ("Microsoft Windows 10 1709 - 21H2", "Microsoft", "Windows"),
+    ("Apple macOS 13 (Ventura)", "Apple", "Mac OS X"),
+    ("FreeBSD 13.0-RELEASE", "FreeBSD", "FreeBSD"),
+]
+
+
+def main(args: list[str]) -> int:
+    if "--version" in args:
+        print(VERSION, end="")
+        return 0
+    key: str = record_key(args)
+    if os.environ.get("FAKE_NMAP_RECORD_DIR"):
+        return record(args, Path(os.environ["FAKE_NMAP_RECORD_DIR"]) / f"{key}.xml")
+
+    rng = random.Random(f"{os.environ.get('FAKE_NMAP_SEED', '0')} {key}")
+    time.sleep(float(os.environ.get("FAKE_NMAP_LATENCY", "0")))
+    if rng.random() < float(os.environ.get("FAKE_NMAP_FAILURE_RATE", "0")):
+        print("Failed to open device eth0 (fake nmap failure)", file=sys.stderr)
+        return 1
+
+    recorded: Path | None = (
+        Path(os.environ["FAKE_NMAP_REPLAY_DIR"]) / f"{key}.xml" if os.environ.get("FAKE_NMAP_REPLAY_DIR") else None
+    )
+    if recorded is not None and recorded.exists():
+        xml: str = recorded.read_text(encoding="UTF-8")
+    elif "-sn" in args:
+        xml = discovery_xml(args, int(os.environ.get("FAKE_NMAP_HOSTS", "16")))
+    else:
+        xml = port_scan_xml(args, int(os.environ.get("FAKE_NMAP_PORTS", "4")))
+
+    if rng.random() < float(os.environ.get("FAKE_NMAP_PARTIAL_RATE", "0")):
+        # Cut off like an nmap killed mid scan, without the closing tags
+        print(xml[: len(xml) // 2], end="")
+        print("Interrupted (fake nmap partial output)", file=sys.stderr)
+        return 2
+    print(xml, end="")
+    return 0
+
+
+def record_key(args: list[str]) -> str:
+    """
+    Key recordings by the arguments nmap was run with, in any order, as whos_home doesn't order its flags, and with
+    an exclude file replaced by what is in it, as its path is a new temporary file every run
+    :param args: the arguments
+    :return: a hash of the arguments
+    """
+    parts: list[str] = []
+    for i, arg in enumerate(args):
+        if i > 0 and args[i - 1] == "--excludefile":
+            arg = Path(arg).read_text(encoding="UTF-8") if Path(arg).exists() else arg
+        parts.append(arg)
+    return hashlib.sha256("\0".join(sorted(parts)).encode()).hexdigest()[:32]
+
+
+def record(args: list[str], recording: Path) -> int:
+    # Only imported when recording, every run of the stand-in counts towards the timings of a benchmark
+    import subprocess  # pylint: disable=import-outside-toplevel
+
+    # Recording is off for the nmap run, which can be this stand-in, generating the scans to replay
+    environment: dict[str, str] = {name: value for name, value in os.environ.items() if name != "FAKE_NMAP_RECORD_DIR"}
+    completed = subprocess.run(
+        [os.environ.get("FAKE_NMAP_REAL", "nmap"), *args], capture_output=True, text=True, check=False, env=environment
+    )
+    if completed.returncode == 0:
+        recording.parent.mkdir(parents=True, exist_ok=True)
+        recording.write_text(completed.stdout, encoding="UTF-8")
+    print(completed.stdout, end="")
+    print(completed.stderr, end="", file=sys.stderr)
+    return completed.returncode
+
+
+def option(args: list[str], name: str) -> str | None:
+    return args[args.index(name) + 1] if name in args[:-1] else None
+
+
+def target(args: list[str]) -> str:
+    positional: list[str] = [
+        arg
+        for i, arg in enumerate(args)
+        if not arg.startswith("-") and (i == 0 or args[i - 1] not in OPTIONS_WITH_VALUES)
+    ]
+    return positional[-1] if positional else "127.0.0.1"
+
+
+def parse_ports(ports: str) -> set[int]:
+    parsed: set[int] = set()
+    for part in ports.split(","):
+        start, _, end = part.strip().partition("-")
+        if start.isdigit() and (not end or end.isdigit()):
+            parsed.update(range(int(start), int(end or start) + 1))
+    return parsed
+
+
+def format_ports(ports: list[int]) -> str:
+    ranges: list[str] = []
+    for port in ports:
+        if ranges and ranges[-1].rpartition("-")[2] == str(port - 1):
+            ranges[-1] = f"{ranges[-1].partition('-')[0]}-{port}"
+        else:
+            ranges.append(str(port))
+    return ",".join(ranges)
+
+
+def scanned_ports(args: list[str]) -> list[int]:
+    if "-p-" in args:
+        ports: set[int] = set(range(1, 65536))
+    elif option(args, "-p") is not None:
+        ports = parse_ports(option(args, "-p") or "")
+    elif "-F" in args:
+        ports = set(TOP_100_PORTS)
+    else:
+        # Not nmap's top 1000, but about as many ports, including the top 100
+        ports = set(TOP_100_PORTS) | set(range(1, 1001))
+    return sorted(ports - parse_ports(option(args, "--exclude-ports") or ""))
+
+
+def header(args: list[str]) -> str:
+    command: str = html.escape(" ".join(["nmap", *args]))
+    return (
+        '<?xml version="1.0" encoding="UTF-8"?>\n<!DOCTYPE nmaprun>\n'
+        f'<nmaprun scanner="nmap" args="{command}" start="{int(time.time())}" version="7.95" xmloutputversion="1.05">\n'
+    )
+
+
+def footer(up: int, total: int) -> str:
+    return (
+        f'<runstats><finished time="{int(time.time())}" exit="success"/>'
+        f'<hosts up="{up}" down="{total - up}" total="{total}"/></runstats>\n</nmaprun>\n'
+    )
+
+
+def address_xml(ip_addr: ipaddress.IPv4Address | ipaddress.IPv6Address) -> str:
+    xml: str = f'<address addr="{ip_addr}" addrtype="ipv{ip_addr.version}"/>'
+    if ip_addr.version == 4:
+        # The same address always gets the same MAC, as a real device would
+        host: int = int(ip_addr)
+        prefix: str = MAC_PREFIXES[host % len(MAC_PREFIXES)]
+        xml += (
+            f'<address addr="{prefix}:{host >> 16 & 255:02X}:{host >> 8 & 255:02X}:{host & 255:02X}" addrtype="mac"/>'
+        )
+    return xml
+
+
+def discovery_xml(args: list[str], hosts: int) -> str:
+    network = ipaddress.ip_network(target(args), strict=False)
+    total: int = max(network.num_addresses - 2, 1) if network.version == 4 else network.num_addresses
+    up: int = min(hosts, total)
+    first: int = int(network.network_address) + (1 if network.num_addresses > 2 else 0)
+    # Spread evenly over the network, so shards of a big range each find some
+    step: int = max(total // max(up, 1), 1)
+    lines: list[str] = [header(args)]
+    for i in range(up):
+        ip_addr = ipaddress.ip_address(first + i * step)
+        lines.append(
+            f'<host><status state="up" reason="arp-response"/>{address_xml(ip_addr)}'
+            f'<hostnames/><times srtt="{200 + i % 50 * 37}" rttvar="100" to="100000"/></host>\n'
+        )
+    lines.append(footer(up, total))
+    return "".join(lines)
+
+
+def port_scan_xml(args: list[str], open_ports: int) -> str:
+    ip_addr = ipaddress.ip_address(target(args).partition("/")[0])
+    ports: list[int] = scanned_ports(args)
+    scanned: set[int] = set(ports)
+    # A host has the same open ports whichever ports are scanned, half of them common ones found by any scan
+    rng = random.Random(f"{os.environ.get('FAKE_NMAP_SEED', '0')} {ip_addr}")
+    common: list[int] = rng.sample(COMMON_PORTS, min((open_ports + 1) // 2, len(COMMON_PORTS)))
+    chosen: list[int] = [
+        port for port in common + rng.sample(range(1, 65536), open_ports - len(common)) if port in scanned
+    ]
+    lines: list[str] = [
+        header(args),
+        f'<scaninfo type="syn" protocol="tcp" numservices="{len(ports)}" services="{format_ports(ports)}"/>\n',
+        f'<host><status state="up" reason="arp-response"/>{address_xml(ip_addr)}<hostnames/><ports>\n',
+    ]
+    for port in sorted(set(chosen)):
+        try:
+            name: str = socket.getservbyport(port, "tcp")
+        except OSError:
+            name = "unknown"
+        product: str = f' product="fake {name}" version="1.{port % 10}"' if "-sV" in args else ""
+        lines.append(
+            f'<port protocol="tcp" portid="{port}"><state state="open" reason="syn-ack"/>'
+            f'<service name="{name}"{product} method="probed" conf="10"/></port>\n'
+        )
+    lines.append("</ports>")
+    if "-O" in args:
+        name, vendor, family = OPERATING_SYSTEMS[int(ip_addr) % len(OPERATING_SYSTEMS)]
+        lines.append(
+            f'<os><osmatch name="{name}" accuracy="100">'
+            f'<osclass vendor="{vendor}" osfamily="{family}" accuracy="100"/></osmatch></os>'
+        )
+    lines.append("</host>\n")
+    lines.append(footer(1, 1))
+    return "".join(lines)
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,39 @@
+import random
+import tracemalloc
+
+from benchmarks.timing import measure, report, report_allocations
+from src.util.mac_vendors import BUNDLED_PREFIXES, OuiIndex, read_prefixes
+
+LOOKUPS = 100_000
+
+
+def allocated_bytes(build) -> int:
+    tracemalloc.start()
+    built = build()
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del built
+    return size
+
+
+def run() -> None:
+    entries: list[tuple[str, str]] = list(read_prefixes(BUNDLED_PREFIXES))
+    print(f"{len(entries)} prefixes from {BUNDLED_PREFIXES}")
+    generator = random.Random(7)
+    macs: list[str] = [
+        ":".join(f"{generator.getrandbits(8):02X}" for _ in range(6)) for _ in range(LOOKUPS // 2)
+    ] + [  # Half of the lookups are for assigned prefixes
+        ":".join(prefix[i : i + 2] for i in range(0, 6, 2)) + ":00:00:01" for prefix, _ in entries[: LOOKUPS // 2]
+    ]
+
+    index = OuiIndex(entries)
+    report("read the bundled table", measure(lambda: list(read_prefixes(BUNDLED_PREFIXES))), len(entries), "prefix")
+    report("load the index", measure(lambda: OuiIndex(entries)), len(entries), "prefix")
+    report(f"look up {len(macs)} MAC addresses", measure(lambda: [index.lookup(mac) for mac in macs]), len(macs), "mac")
+    report_allocations("index", allocated_bytes(lambda: OuiIndex(entries)) / len(entries), "prefix")
+    # What a dict of the prefix strings to the vendors would hold instead
+    report_allocations("dict of prefixes", allocated_bytes(lambda: dict(entries)) / len(entries), "prefix")
+
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,55 @@
+import io
+
+from rich.console import Console
+from rich.progress import Progress, SpinnerColumn, TextColumn
+
+from benchmarks.timing import measure, report
+from src.util.scan_progress import ScanProgress
+
+TARGETS = [100, 1_000, 5_000]
+IN_FLIGHT = 20
+REFRESHES = 20
+
+
+def command(i: int) -> str:
+    return f"nmap -F -sV -T5 -Pn -O -oX - 10.0.{i >> 8}.{i & 0xFF}"
+
+
+def legacy_progress(targets: int) -> Progress:
+    # A task per command, as the port scan used to add, with the finished ones hidden
+    progress = Progress(
+        TextColumn(" "),
+        SpinnerColumn(style="magenta", spinner_name="aesthetic"),
+        TextColumn("[progress.description]{task.description}"),
+        console=Console(file=io.StringIO(), width=200),
+    )
+    for i in range(targets):
+        task = progress.add_task(description=f"[bold magenta] Running: [/bold magenta][bold cyan]{command(i)}")
+        if i >= IN_FLIGHT:
+            progress.update(task, completed=True, visible=False)
+    return progress
+
+
+def aggregate_progress(targets: int) -> ScanProgress:
+    progress = ScanProgress()
+    progress.add_commands(targets)
+    for i in range(targets):
+        task = progress.start(command(i))
+        if i >= IN_FLIGHT:
+            progress.complete(task)
+    return progress
+
+
+def run() -> None:
+    console = Console(file=io.StringIO(), width=200)
+    for targets in TARGETS:
+        legacy: Progress = legacy_progress(targets)
+        aggregate: ScanProgress = aggregate_progress(targets)
+        legacy_seconds: float = measure(lambda p=legacy: console.print(p.get_renderable()), REFRESHES)
+        aggregate_seconds: float = measure(lambda p=aggregate: console.print(p), REFRESHES)
+        report(f"task per command, {targets} targets", legacy_seconds, REFRESHES, "refresh")
+        report(f"aggregate progress, {targets} targets", aggregate_seconds, REFRESHES, "refresh")
+
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,56 @@
+import contextlib
+import io
+
+from rich import print as rprint
+
+from benchmarks.timing import measure, report
+from src.data.nmapdevice import NmapDevice
+from src.data.scan_result import ScanResult
+from src.output.nmap_output import format_and_output, get_ip_and_mac_message, render_device_table
+
+DEVICES = 65_536
+# Rendering a line per device with the width worked out per line is quadratic, so it is run on fewer devices
+LEGACY_DEVICES = 2_000
+
+
+class BenchmarkScanResult(ScanResult):
+    def get_hosts_up_from_runstats(self) -> int:
+        return DEVICES
+
+    def get_total_hosts_from_runstats(self) -> str:
+        return str(DEVICES)
+
+
+def devices(count: int) -> list[NmapDevice]:
+    return [
+        NmapDevice(
+            hostname=f"device-{i}.lan" if i % 3 else None,
+            ip_addr=f"10.0.{i >> 8}.{i & 0xFF}",
+            mac_addr=f"AA:BB:CC:DD:{i >> 8:02X}:{i & 0xFF:02X} | Vendor {i % 7}" if i % 5 else None,
+            os=None,
+            ports=None,
+        )
+        for i in range(count)
+    ]
+
+
+def legacy_output(rendered: list[NmapDevice]) -> None:
+    for device in rendered:
+        rprint(get_ip_and_mac_message(device, rendered))
+
+
+def run() -> None:
+    legacy: list[NmapDevice] = devices(LEGACY_DEVICES)
+    table: list[NmapDevice] = devices(DEVICES)
+    with contextlib.redirect_stdout(io.StringIO()):
+        legacy_seconds: float = measure(lambda: legacy_output(legacy))
+        render_seconds: float = measure(lambda: render_device_table(table))
+        output_seconds: float = measure(lambda: format_and_output(BenchmarkScanResult(run_stats={}, hosts=[]), table))
+
+    report(f"line per device, {LEGACY_DEVICES} devices", legacy_seconds, LEGACY_DEVICES, "device")
+    report(f"render_device_table, {DEVICES} devices", render_seconds, DEVICES, "device")
+    report(f"format_and_output, {DEVICES} devices", output_seconds, DEVICES, "device")
+
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,53 @@
+import contextlib
+import io
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Callable
+
+from benchmarks.timing import report
+from src.data.command_result import CommandResult
+from src.data.executor_callback_events import ExecutorCallbackEvents
+from src.executor.result_consumer import ResultConsumer
+
+RESULTS = 500
+WORKERS = 20
+PORT_SCAN_XML = Path(__file__).parent.parent / "tests" / "parser" / "resources" / "fake_nmap_response.xml"
+
+
+def hold_time(post_execution: Callable[[CommandResult], None], command_result: CommandResult) -> float:
+    """
+    Run the post execution step for every result on a thread pool, like the port scan does
+    :return: total seconds the workers spent in the post execution step
+    """
+
+    def work(_) -> float:
+        started: float = time.perf_counter()
+        post_execution(command_result)
+        return time.perf_counter() - started
+
+    with ThreadPoolExecutor(max_workers=WORKERS) as executor:
+        return sum(executor.map(work, range(RESULTS)))
+
+
+def run() -> None:
+    command_result = CommandResult(
+        command="nmap -F -oX - 10.0.0.1",
+        stdout=PORT_SCAN_XML.read_text(encoding="UTF-8"),
+        stderr="",
+        return_code=0,
+        success=True,
+    )
+    with contextlib.redirect_stdout(io.StringIO()):
+        inline_seconds: float = hold_time(ExecutorCallbackEvents.handle_port_scan_result, command_result)
+        with ResultConsumer(ExecutorCallbackEvents.handle_port_scan_result) as consumer:
+            queued_seconds: float = hold_time(consumer.submit, command_result)
+        handled_seconds: float = consumer.metrics.total_handle_time
+
+    report(f"handled on the workers, {RESULTS} results", inline_seconds, RESULTS, "result")
+    report(f"queued by the workers, {RESULTS} results", queued_seconds, RESULTS, "result")
+    report(f"handled by the consumer, {RESULTS} results", handled_seconds, RESULTS, "result")
+
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,52 @@
+import os
+import tempfile
+
+import rich
+
+from benchmarks.timing import measure, report
+from src.db import db_connector
+from src.db.data.observation import Observation
+from src.db.service.observation_service import ObservationService
+from src.db.service.retention_engine import RetentionEngine, RetentionPolicy, SECONDS_IN_A_DAY
+
+DEVICES = 50
+DAYS = 14
+INTERVAL = 5 * 60
+START = 1_700_000_000
+
+
+def observations() -> list[Observation]:
+    return [
+        Observation(
+            id=None,
+            device_id=device_id,
+            mac_addr=None,
+            ip_addr=f"10.0.0.{device_id}",
+            hostname=None,
+            observed_at=observed_at,
+        )
+        for device_id in range(1, DEVICES + 1)
+        for observed_at in range(START, START + DAYS * SECONDS_IN_A_DAY, INTERVAL)
+        # Every device is home for 8 hours a day
+        if (observed_at - START) % SECONDS_IN_A_DAY < 8 * 60 * 60
+    ]
+
+
+def run() -> None:
+    with tempfile.TemporaryDirectory() as directory:
+        db_connector.DB_PATH = os.path.join(directory, "database.db")
+        rows: list[Observation] = observations()
+        ObservationService().create_many(rows)
+        engine = RetentionEngine(RetentionPolicy(raw_retention_days=1, max_gap_seconds=2 * INTERVAL))
+        now: int = START + DAYS * SECONDS_IN_A_DAY
+
+        size_before: int = os.path.getsize(db_connector.DB_PATH)
+        report("history before compaction", measure(lambda: engine.history(1, START), 10), 10, "query")
+        report("RetentionEngine.compact", measure(lambda: engine.compact(now=now)), len(rows), "observation")
+        report("history after compaction", measure(lambda: engine.history(1, START), 10), 10, "query")
+        size_after: int = os.path.getsize(db_connector.DB_PATH)
+        rich.print(f"[bold magenta] [+] db size: [bold cyan]{size_before // 1024} KiB -> {size_after // 1024} KiB")
+
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,109 @@
+import subprocess
+import sys
+import time
+from dataclasses import dataclass
+
+from benchmarks.timing import report
+
+CLI_MODULE = "src.whos_home"
+CLI_HELP = [sys.executable, "-c", f"from {CLI_MODULE} import app; app()", "main", "--help"]
+RUNS = 5
+# Time to import the CLI, leaving out typer which it can't start without. Around 40ms when this was added,
+# the budget leaves room for slower machines but is gone over if scanning, parsing or the db are imported up front.
+IMPORT_BUDGET_SECONDS = 0.15
+
+
+@dataclass
+class ImportTime:
+    module: str
+    # Seconds spent importing the module itself, and including everything it imported
+    self_seconds: float
+    cumulative_seconds: float
+    depth: int
+
+
+def import_times(module: str = CLI_MODULE) -> list[ImportTime]:
+    """
+    Import a module in a fresh interpreter with -X importtime
+    :param module: the module to import
+    :return: the time taken by every module imported, in the order they finished importing
+    """
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"], capture_output=True, text=True, check=True
+    )
+    times: list[ImportTime] = []
+    for line in completed.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line.removeprefix("import time:").split("|")
+        times.append(
+            ImportTime(
+                module=name.strip(),
+                self_seconds=int(self_us) / 1_000_000,
+                cumulative_seconds=int(cumulative_us) / 1_000_000,
+                depth=(len(name) - len(name.lstrip()) - 1) // 2,
+            )
+        )
+    return times
+
+
+def cumulative_seconds(times: list[ImportTime], module: str) -> float:
+    return next((t.cumulative_seconds for t in times if t.module == module), 0.0)
+
+
+def imported_by(times: list[ImportTime], module: str) -> list[ImportTime]:
+    """
+    Find the modules imported directly by a module, -X importtime lists them just before it, one level deeper
+    :param times: import times from `import_times`
+    :param module: the importing module
+    :return: the modules it imported
+    """
+    position: int = next(i for i, t in enumerate(times) if t.module == module)
+    depth: int = times[position].depth
+    children: list[ImportTime] = []
+    for imported in reversed(times[:position]):
+        if imported.depth <= depth:
+            break
+        if imported.depth == depth + 1:
+            children.append(imported)
+    return children
+
+
+def cli_latency() -> float:
+    """
+    Time the CLI from start to exit in a fresh interpreter, showing the help so no scan is run
+    :return: the fastest of several runs, in seconds
+    """
+    fastest: float = float("inf")
+    for _ in range(RUNS):
+        started: float = time.perf_counter()
+        subprocess.run(CLI_HELP, capture_output=True, check=True)
+        fastest = min(fastest, time.perf_counter() - started)
+    return fastest
+
+
+def fastest_import_without_typer() -> float:
+    """
+    Time importing the CLI without typer, the fastest of a few runs so a busy machine doesn't go over budget
+    :return: the seconds taken
+    """
+    return min(
+        cumulative_seconds(times, CLI_MODULE) - cumulative_seconds(times, "typer")
+        for times in (import_times() for _ in range(3))
+    )
+
+
+def run() -> None:
+    times: list[ImportTime] = import_times()
+    for imported in sorted(imported_by(times, CLI_MODULE), key=lambda t: -t.cumulative_seconds):
+        report(f"import {imported.module}", imported.cumulative_seconds)
+    report(f"import {CLI_MODULE}", cumulative_seconds(times, CLI_MODULE))
+    fastest: float = fastest_import_without_typer()
+    report(f"import {CLI_MODULE}, without typer", fastest)
+    report("cold CLI --help", cli_latency())
+    if fastest > IMPORT_BUDGET_SECONDS:
+        sys.exit(f"Importing {CLI_MODULE} went over its {IMPORT_BUDGET_SECONDS * 1000:.0f} ms budget")
+
+
+if __name__ == "__main__":
+    run()
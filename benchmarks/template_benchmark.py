@@ -0,0 +1,54 @@
+import tracemalloc
+
+from benchmarks.render_benchmark import devices
+from benchmarks.timing import measure, report, report_allocations
+from src.data.nmapdevice import NmapDevice
+from src.output.nmap_output import (
+    build_device_line,
+    check_hostname_is_none,
+    format_ip_addr,
+    get_max_mac_length,
+    hostname_message_builder,
+    ip_message_builder,
+    mac_addr_message_builder,
+)
+
+DEVICES = 20_000
+
+
+def builder_device_line(device: NmapDevice, max_mac_length: int) -> str:
+    # How every line was rendered before the templates, with new builders per line
+    line: str = ip_message_builder(format_ip_addr(device.ip_addr)).build()
+    if device.mac_addr is not None:
+        line += mac_addr_message_builder(f"{device.mac_addr:<{max_mac_length}}").build()
+    return line + hostname_message_builder(check_hostname_is_none(device.hostname)).build()
+
+
+def peak_bytes_per_line(render, rendered: list[NmapDevice], max_mac_length: int) -> float:
+    """
+    Measure the most memory allocated at once while rendering each line, i.e. the temporary objects it creates
+    :return: the mean over every line, in bytes
+    """
+    total: int = 0
+    tracemalloc.start()
+    for device in rendered:
+        tracemalloc.reset_peak()
+        before, _ = tracemalloc.get_traced_memory()
+        render(device, max_mac_length)
+        _, peak = tracemalloc.get_traced_memory()
+        total += peak - before
+    tracemalloc.stop()
+    return total / len(rendered)
+
+
+def run() -> None:
+    rendered: list[NmapDevice] = devices(DEVICES)
+    max_mac_length: int = get_max_mac_length(rendered)
+    for label, render in [("builder per line", builder_device_line), ("compiled template", build_device_line)]:
+        seconds: float = measure(lambda r=render: [r(device, max_mac_length) for device in rendered])
+        report(f"{label}, {DEVICES} lines", seconds, DEVICES, "line")
+        report_allocations(f"{label}, {DEVICES} lines", peak_bytes_per_line(render, rendered, max_mac_length), "line")
+
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,58 @@
+import time
+from typing import Callable
+
+import rich
+
+from src.output.typer_output_builder import TyperOutputBuilder
+
+
+def measure(fn: Callable[[], object], iterations: int = 1) -> float:
+    """
+    Time a callable over a number of iterations
+    :param fn: the callable to time
+    :param iterations: how many times to call it
+    :return: the total number of seconds taken
+    """
+    start: float = time.perf_counter()
+    for _ in range(iterations):
+        fn()
+    return time.perf_counter() - start
+
+
+def report(label: str, seconds: float, operations: int = 1, unit: str = "op") -> None:
+    """
+    Print a benchmark result as total time and time per operation
+    :param label: what was measured
+    :param seconds: total seconds taken
+    :param operations: number of operations covered by the timing
+    :param unit: name of a single operation, e.g. row or device
+    :return: nothing, only outputs to the user
+    """
+    rich.print(
+        TyperOutputBuilder()
+        .add_square()
+        .apply_bold_magenta(f" {label:<48}")
+        .apply_bold_cyan(f"{seconds * 1000:>10.2f} ms")
+        .apply_bold_magenta(" total, ")
+        .apply_bold_cyan(f"{seconds / max(operations, 1) * 1_000_000:>8.2f} µs")
+        .apply_bold_magenta(f" per {unit}")
+        .build()
+    )
+
+
+def report_allocations(label: str, bytes_per_operation: float, unit: str = "op") -> None:
+    """
+    Print how much memory was allocated per operation
+    :param label: what was measured
+    :param bytes_per_operation: bytes allocated per operation
+    :param unit: name of a single operation, e.g. line
+    :return: nothing, only outputs to the user
+    """
+    rich.print(
+        TyperOutputBuilder()
+        .add_square()
+        .apply_bold_magenta(f" {label:<48}")
+        .apply_bold_cyan(f"{bytes_per_operation:>10.0f} B")
+        .apply_bold_magenta(f"  allocated per {unit}")
+        .build()
+    )
@@ -0,0 +1,87 @@
+import gzip
+import re
+from pathlib import Path
+from typing import Annotated, Iterator
+
+import rich
+import typer as t
+
+from src.util.mac_address import HEX_DIGITS
+from src.util.mac_vendors import BUNDLED_PREFIXES, PREFIX_LENGTHS
+
+HEADER: str = """# MAC address prefixes and the vendors they are assigned to, generated by generate_mac_prefixes.py from the IEEE
+# MA-L, MA-M and MA-S registries. In the format of nmap's nmap-mac-prefixes: the hex digits of the prefix followed
+# by the vendor, six digits are an MA-L (OUI) assignment, seven an MA-M and nine an MA-S. Don't edit it directly.
+"""
+# Bits in a prefix of each length, as Wireshark's manuf writes them after the address
+MASK_LENGTHS: dict[int, int] = {length * 4: length for length in PREFIX_LENGTHS}
+
+
+def read_ieee_registry(path: Path) -> Iterator[tuple[str, str]]:
+    """
+    Read a registry in the text format the IEEE publishes them in, e.g. oui.txt, mam.txt, oui36.txt and iab.txt.
+    Every assignment has a line with the OUI in hex, then a line with either the OUI again or, for the smaller
+    blocks, the range of addresses assigned under it.
+    :param path: the registry
+    :return: the hex prefixes and their vendors
+    """
+    oui: str = ""
+    with open(path, encoding="UTF-8", errors="replace") as lines:
+        for line in lines:
+            if "(hex)" in line:
+                oui = line.partition("(hex)")[0].strip().replace("-", "").upper()
+            elif "(base 16)" in line:
+                assignment, _, vendor = line.partition("(base 16)")
+                start, _, end = assignment.strip().upper().partition("-")
+                # A block is the digits its first and last address share, e.g. 0D7000-0D7FFF under 40-D8-55
+                shared: int = next((i for i, (a, b) in enumerate(zip(start, end)) if a != b), len(end))
+                yield (oui + start[:shared] if end else start), vendor.strip()
+
+
+def read_wireshark_manuf(path: Path) -> Iterator[tuple[str, str]]:
+    """
+    Read Wireshark's manuf, which is generated from the same registries, an address with the number of bits in
+    the prefix when it isn't 24, the short vendor name and the full one
+    :param path: the manuf file
+    :return: the hex prefixes and their vendors
+    """
+    with open(path, encoding="UTF-8", errors="replace") as lines:
+        for line in lines:
+            fields: list[str] = line.split("#")[0].strip().split("\t")
+            if len(fields) < 2:
+                continue
+            address, _, bits = fields[0].partition("/")
+            length: int | None = MASK_LENGTHS.get(int(bits)) if bits.isdigit() else 6
+            digits: str = address.replace(":", "").replace("-", "").upper()
+            if length is not None and len(digits) >= length and HEX_DIGITS.issuperset(digits):
+                yield digits[:length], fields[-1].strip()
+
+
+def generate(
+    registries: Annotated[
+        list[Path],
+        t.Argument(
+            help="IEEE registries (oui.txt, mam.txt, oui36.txt, iab.txt) or Wireshark's manuf, an assignment in a "
+            "later file replaces the same one in an earlier file"
+        ),
+    ],
+    output: Annotated[Path, t.Option(help="The gzipped table to write")] = BUNDLED_PREFIXES,
+) -> None:
+    """
+    Generate the bundled table of MAC address prefixes from the IEEE registries
+    """
+    vendors: dict[str, str] = {}
+    for registry in registries:
+        manuf: bool = registry.name.startswith("manuf")
+        for prefix, vendor in read_wireshark_manuf(registry) if manuf else read_ieee_registry(registry):
+            if len(prefix) in PREFIX_LENGTHS and vendor:
+                vendors[prefix] = re.sub(r"\s+", " ", vendor)
+    # Written without a timestamp, so regenerating from the same registries doesn't change the file
+    with gzip.GzipFile(output, "wb", compresslevel=9, mtime=0) as table:
+        table.write(HEADER.encode("UTF-8"))
+        table.write("".join(f"{prefix} {vendors[prefix]}\n" for prefix in sorted(vendors)).encode("UTF-8"))
+    rich.print(f"[bold green] Wrote {len(vendors)} prefixes to {output}")
+
+
+if __name__ == "__main__":
+    t.run(generate)
@@ -14,13 +14,19 @@ class CommandResult:
     stderr: str
     return_code: int
     success: bool
+    # Whether the command ran out of time, or nmap gave up on a host at its --host-timeout
+    timed_out: bool = False
 
     @staticmethod
-    def create_command_result(completed_process: CompletedProcess[str], command: str) -> CommandResult:
+    def create_command_result(
+        completed_process: CompletedProcess[str], command: str, timed_out: bool = False
+    ) -> CommandResult:
         return CommandResult(
             command=" ".join(command),
             stdout="" if not completed_process else completed_process.stdout.strip(),
             stderr="" if not completed_process else completed_process.stderr.strip(),
             return_code="" if not completed_process else completed_process.returncode,
             success=("" if not completed_process else completed_process.returncode == 0),
+            # nmap still exits 0 when a host hits --host-timeout, but marks the host in its xml
+            timed_out=timed_out or bool(completed_process and 'timedout="true"' in completed_process.stdout),
         )
@@ -1,17 +1,23 @@
-import datetime
-from dataclasses import dataclass
-from typing import Callable
+from __future__ import annotations
 
-from rich.progress import TaskID
+from dataclasses import dataclass
+from typing import Callable, TYPE_CHECKING
 
 from src.data.command_result import CommandResult
-from src.data.scan_result import ScanResult
-from src.output.nmap_output import format_and_output_from_port_scan
-from src.output.typer_output_builder import TyperOutputBuilder
-from src.parser.nmap_output_parser import NmapOutputParser
 from src.util.logger import Logger
 from src.util.progress_service import ProgressService
 
+if TYPE_CHECKING:
+    from rich.progress import TaskID
+
+    from src.data.nmapdevice import NmapDevice
+    from src.data.scan_result import ScanResult
+    from src.db.service.observation_writer import ObservationWriter
+    from src.executor.result_consumer import ResultConsumer
+    from src.util.device_diff import DeviceDiff
+    from src.util.fingerprint_cache import FingerprintCache
+    from src.util.progressive_scan import ProgressivePortScan
+
 
 @dataclass
 class ExecutorCallbackEvents:
@@ -36,25 +42,84 @@ class ExecutorCallbackEvents:
 
     @staticmethod
     def pre_execution_callback(command: str) -> TaskID:
-        task: TaskID = ProgressService().progress.add_task(
-            description=TyperOutputBuilder()
-            .apply_bold_magenta(" Running: ")
-            .apply_bold_cyan(command)
-            .apply_bold_magenta(" at: ")
-            .apply_bold_cyan(datetime.datetime.now().time().strftime("%H:%M:%S"))
-            .apply_bold_magenta(" .......")
-            .build()
-        )
-
-        Logger().debug(f"Creating progress with task_id: {task}")
+        task: TaskID = ProgressService().progress.start(command)
+        Logger().debug(f"Started progress task with task_id: {task} for: {command}")
         return task
 
     @staticmethod
-    def post_execution_callback(command_result: CommandResult, task_id: TaskID) -> None:
+    def post_execution_callback(command_result: CommandResult, task_id: TaskID, consumer: ResultConsumer) -> None:
+        """
+        Runs on the worker thread that ran the command, so only marks the command as done and hands the result
+        over to the consumer, the worker can then go straight on to the next command
+        :param command_result: result of the command
+        :param task_id: progress task of the command
+        :param consumer: consumer that handles the results
+        :return: nothing
+        """
         Logger().debug("Completing progress task....")
-        ProgressService().progress.update(task_id, completed=True, visible=False)
+        ProgressService().progress.complete(task_id, success=command_result.success, timed_out=command_result.timed_out)
+        consumer.submit(command_result)
+
+    @staticmethod
+    def handle_port_scan_result(
+        command_result: CommandResult,
+        writer: ObservationWriter | None = None,
+        diff: bool = False,
+        fingerprints: FingerprintCache | None = None,
+        progressive: ProgressivePortScan | None = None,
+    ) -> None:
+        """
+        Parse, output and save the result of a port scan, runs on the consumer thread
+        :param command_result: result of the port scan
+        :param writer: the writer to record the devices seen with, if they are being saved
+        :param diff: only output the ports that changed since the previous port scan of the device
+        :param fingerprints: the fingerprints to merge into, or take from, the device, if they are being cached
+        :param progressive: the progressive scan this is a stage of, if the port scans are run as one
+        :return: nothing
+        """
+        from src.parser.nmap_output_parser import NmapOutputParser
 
         if command_result.success:
             parser: NmapOutputParser = NmapOutputParser(command_result)
             outputted_scan_result: ScanResult = parser.create_scan_result()
-            format_and_output_from_port_scan(outputted_scan_result)
+            device: NmapDevice = outputted_scan_result.get_device()
+            if fingerprints is not None:
+                device = fingerprints.update(device)
+            if progressive is not None:
+                progressive.add_scanned_ports(outputted_scan_result.get_scanned_ports())
+                device = progressive.merge(device)
+                if not progressive.final:
+                    # Shown straight away, but only diffed and saved once every stage has scanned it
+                    if not diff:
+                        ExecutorCallbackEvents.handle_port_scan_device(device)
+                    return
+            ExecutorCallbackEvents.handle_port_scan_device(device, writer, diff)
+
+    @staticmethod
+    def handle_port_scan_device(
+        device: NmapDevice, writer: ObservationWriter | None = None, diff: bool = False
+    ) -> None:
+        """
+        Output and save a device from a port scan, whichever scanner found its ports
+        :param device: the device from the port scan
+        :param writer: the writer to record the devices seen with, if they are being saved
+        :param diff: only output the ports that changed since the previous port scan of the device
+        :return: nothing
+        """
+        from src.output.json_output import JsonOutput, output_diff, output_port_scan
+        from src.output.nmap_output import format_and_output_diff, format_and_output_port_scan_device
+        from src.util.device_diff import DeviceDiffer
+
+        device_diff: DeviceDiff | None = DeviceDiffer().diff_ports(device) if diff else None
+        if device_diff is not None and not device_diff.first_scan:
+            if JsonOutput().enabled:
+                output_diff(device_diff)
+            else:
+                format_and_output_diff(device_diff)
+        elif JsonOutput().enabled:
+            output_port_scan(device)
+        else:
+            format_and_output_port_scan_device(device)
+        if writer is not None:
+            # Port scans don't see MAC addresses, so only record hosts against devices that are already known
+            writer.submit(device, learn=False)
@@ -0,0 +1,12 @@
+from enum import Enum
+
+
+class PortScanner(str, Enum):
+    """
+    Backends that can run the port scan of the discovered hosts
+    """
+
+    NMAP = "nmap"
+
+    # A TCP connect per port from a single event loop, finds open ports without running nmap for each host
+    CONNECT = "connect"
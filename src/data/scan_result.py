@@ -4,6 +4,7 @@ from dataclasses import dataclass
 from typing import OrderedDict, Any, Tuple, Optional
 
 from src.data.nmapdevice import NmapDevice, OperatingSystem, Port, Service
+from src.util.mac_vendors import MacVendors
 
 
 @dataclass
@@ -14,6 +15,8 @@ class ScanResult:
 
     run_stats: OrderedDict[str, Any]
     hosts: list[dict] | dict
+    # What nmap was asked to scan, one per protocol, only port scans have it
+    scan_info: list[dict] | dict | None = None
 
     def get_os_info_for_host(self) -> dict | None:
         """
@@ -126,7 +129,8 @@ class ScanResult:
             if address.get("@addrtype") == address_type:
                 addr = address.get("@addr")
                 if address_type == "mac":
-                    vendor = address.get("@vendor", "").strip()
+                    # nmap leaves the vendor out for prefixes it doesn't know, which the bundled table may
+                    vendor = address.get("@vendor", "").strip() or MacVendors().lookup(addr)
                     return f"{addr} | {vendor if vendor else '(Unknown Vendor)'}"
                 return addr
         return None
@@ -145,6 +149,29 @@ class ScanResult:
             return None
         return self.hosts[i]["hostnames"]["hostname"]["@name"]
 
+    def get_round_trip_times(self) -> list[float]:
+        """
+        Get the smoothed round trip times nmap measured to each host
+        :return: the round trip times in seconds, of the hosts nmap measured one for
+        """
+        hosts: list[dict] = self.hosts if isinstance(self.hosts, list) else [self.hosts] if self.hosts else []
+        round_trip_times: list[float] = []
+        for host in hosts:
+            srtt: str | None = (host.get("times") or {}).get("@srtt") if isinstance(host, dict) else None
+            if srtt is not None and srtt.isdigit():
+                # nmap reports them in microseconds
+                round_trip_times.append(int(srtt) / 1_000_000)
+        return round_trip_times
+
+    def get_scanned_ports(self, protocol: str = "tcp") -> str | None:
+        """
+        Get the ports nmap scanned, whichever way they were chosen, e.g. -F or --top-ports
+        :param protocol: the protocol of the ports
+        :return: the ports as nmap lists them, e.g. "1,3-4,6-7", or None if this wasn't a port scan
+        """
+        scan_info: list[dict] = self.scan_info if isinstance(self.scan_info, list) else [self.scan_info or {}]
+        return next((info.get("@services") for info in scan_info if info.get("@protocol") == protocol), None)
+
     def get_devices(self) -> list[NmapDevice]:
         """
         Get the ip addresses and the hostnames from the scan result
@@ -157,7 +184,8 @@ class ScanResult:
             NmapDevice(
                 hostname=self.find_hostname(i),
                 mac_addr=self.get_address(i, "mac"),
-                ip_addr=self.get_address(i, "ipv4"),
+                # A host found by an IPv6 scan (-6) only has an ipv6 address
+                ip_addr=self.get_address(i, "ipv4") or self.get_address(i, "ipv6"),
                 os=None,
                 ports=None,
             )
@@ -189,17 +217,19 @@ class ScanResult:
         or an issue occurs during retrieval, appropriate fallback messages
         are returned to indicate the result.
 
-        :return: The IPv4 address as a string if available, "(No IPv4)" if no
-            IPv4 address is found, or "(Error)" in case of an exception.
+        :return: The IPv4 address as a string if available, the IPv6 address of a
+            host from an IPv6 scan, "(No IPv4)" if neither is found, or "(Error)"
+            in case of an exception.
         :rtype: str
         """
         try:
             addresses = self.hosts.get("address", [])
             if isinstance(addresses, dict):
                 addresses = [addresses]
-            for addr in addresses:
-                if addr.get("@addrtype") == "ipv4":
-                    return str(addr.get("@addr"))
+            for address_type in ("ipv4", "ipv6"):
+                for addr in addresses:
+                    if addr.get("@addrtype") == address_type:
+                        return str(addr.get("@addr"))
             return "(No IPv4)"
         except (AttributeError, TypeError):
             return "(Error)"
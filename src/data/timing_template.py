@@ -0,0 +1,15 @@
+from enum import Enum
+
+
+class TimingTemplate(str, Enum):
+    """
+    nmap timing templates that can be forced instead of picking timing from the size and history of the network
+    """
+
+    AUTO = "auto"
+
+    NORMAL = "normal"  # -T3
+
+    AGGRESSIVE = "aggressive"  # -T4
+
+    INSANE = "insane"  # -T5
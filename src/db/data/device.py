@@ -9,6 +9,10 @@ from src.db.data.user import User
 class Device(Entity):
     device_name: str
     owned_by: int | None
+    # Identity of the device as last seen on the network, mac_addr is stored normalized
+    mac_addr: str | None = None
+    ip_addr: str | None = None
+    hostname: str | None = None
 
     def get_owned_by_user(self) -> User | None:
         return UserService().read(self.owned_by) if self.owned_by is not None else None
@@ -1,4 +1,8 @@
-from dataclasses import dataclass, astuple, asdict
+from __future__ import annotations
+
+from dataclasses import dataclass, fields
+from functools import cache
+from typing import Sequence
 
 
 @dataclass
@@ -6,8 +10,31 @@ class Entity:
     # Can be None when initializing to make use of db autoincrement
     id: int | None
 
+    @classmethod
+    def columns(cls) -> tuple[str, ...]:
+        """
+        Column names of the entity, in dataclass field order. Worked out once per entity type.
+        :return: tuple of column names
+        """
+        return _columns_for(cls)
+
+    @classmethod
+    def from_row(cls, row: Sequence) -> Entity:
+        """
+        Build the entity straight from a row selected in `columns()` order, without going through a dict
+        :param row: the row returned by sqlite
+        :return: the entity
+        """
+        return cls(*row)
+
     def to_row(self) -> tuple:
-        return astuple(self)
+        # Shallow on purpose, astuple deep copies every field recursively
+        return tuple(getattr(self, column) for column in self.columns())
 
     def to_dict(self) -> dict:
-        return dict(asdict(self).items())
+        return {column: getattr(self, column) for column in self.columns()}
+
+
+@cache
+def _columns_for(entity_type: type[Entity]) -> tuple[str, ...]:
+    return tuple(field.name for field in fields(entity_type))
@@ -0,0 +1,17 @@
+from dataclasses import dataclass
+
+from src.db.data.entity import Entity
+
+
+@dataclass
+class Observation(Entity):
+    """
+    A device seen on the network by a scan
+    """
+
+    device_id: int | None
+    mac_addr: str | None
+    ip_addr: str
+    hostname: str | None
+    # Seconds since the epoch
+    observed_at: int
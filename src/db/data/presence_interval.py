@@ -0,0 +1,32 @@
+from dataclasses import dataclass
+
+from src.db.data.entity import Entity
+
+
+@dataclass
+class PresenceInterval(Entity):
+    """
+    A span of time a device was seen on the network for, compacted from its observations
+    """
+
+    # Identifies the device even when it is not a known device, see `presence_key`
+    device_key: str
+    device_id: int | None
+    ip_addr: str
+    hostname: str | None
+    # Seconds since the epoch of the first and last observation in the span
+    arrived_at: int
+    left_at: int
+    observation_count: int
+
+
+def presence_key(device_id: int | None, mac_addr: str | None, ip_addr: str, hostname: str | None) -> str:
+    """
+    Build the key that observations of the same device are grouped under
+    :return: the key, based on the device id, falling back to the MAC address, then the ip address and hostname
+    """
+    if device_id is not None:
+        return f"device:{device_id}"
+    if mac_addr is not None:
+        return f"mac:{mac_addr}"
+    return f"ip:{ip_addr}|{hostname or ''}"
@@ -1,14 +1,16 @@
 import os
 import sqlite3
-from contextlib import closing
+from contextlib import closing, contextmanager
 from sqlite3 import Connection
-from typing import Any
+from typing import Any, Iterable, Iterator
 
 from src.util.logger import Logger
 
 # TODO- env var or something else
 DB_PATH = "database.db"
-SCHEMA_SQL = "resources/schema.sql"
+MIGRATIONS_DIR = os.path.join(os.path.dirname(__file__), "..", "resources", "migrations")
+# Version of the newest file in MIGRATIONS_DIR, bump it when adding a migration
+SCHEMA_VERSION = 4
 
 
 class DatabaseConnector:
@@ -16,8 +18,6 @@ class DatabaseConnector:
         self.connection: Connection | None = None
 
     def connect(self) -> None:
-        run_migration: bool = not os.path.exists(DB_PATH)
-
         try:
             self.connection = sqlite3.connect(DB_PATH)
             self.connection.row_factory = sqlite3.Row
@@ -26,8 +26,7 @@ class DatabaseConnector:
             Logger().debug(f"Database connection failed {e}")
             raise e
 
-        if run_migration:
-            self.__initialize_db()
+        self.__migrate()
 
     def find_one(self, query: str, params: Any = None) -> Any:
         return self.__execute_query(query, params)
@@ -35,6 +34,55 @@ class DatabaseConnector:
     def find_all(self, query: str, params: Any = None) -> Any:
         return self.__execute_query(query, params, fetch_one=False)
 
+    def insert(self, query: str, params: Any = None) -> int:
+        """
+        Execute an insert statement
+        :param query: the insert statement
+        :param params: params for the statement
+        :return: the rowid of the inserted row
+        """
+        with closing(self.connection.cursor()) as cursor:
+            try:
+                cursor.execute(query, params)
+                self.connection.commit()
+                return cursor.lastrowid
+            except sqlite3.Error as e:
+                Logger().debug(f"Query: {query} with params: {params} failed with error: {e}")
+                raise e
+
+    def execute_many(self, query: str, params: Iterable[Any]) -> None:
+        """
+        Execute the same statement for every set of params, committed as a single transaction
+        :param query: the statement to execute
+        :param params: an iterable of params, one per execution
+        :return: nothing
+        """
+        with closing(self.connection.cursor()) as cursor:
+            try:
+                cursor.executemany(query, params)
+                self.connection.commit()
+            except sqlite3.Error as e:
+                Logger().debug(f"Query: {query} failed for a batch with error: {e}")
+                self.connection.rollback()
+                raise e
+
+    @contextmanager
+    def transaction(self) -> Iterator[Connection]:
+        """
+        Run several statements as one transaction, committed when the block exits and rolled back on error
+        :return: the connection to execute the statements on
+        """
+        try:
+            self.connection.execute("BEGIN")
+            yield self.connection
+            self.connection.commit()
+        except BaseException as e:
+            # Anything raised in the block, not only by sqlite, would otherwise leave the transaction open for the
+            # next statement to commit
+            Logger().debug(f"Transaction failed and was rolled back with error: {e!r}")
+            self.connection.rollback()
+            raise
+
     def __execute_query(self, query: str, params: Any = None, fetch_one: bool = True) -> Any:
         with closing(self.connection.cursor()) as cursor:
             try:
@@ -50,16 +98,71 @@ class DatabaseConnector:
                 Logger().debug(f"Query: {query} with params: {params} failed with error: {e}")
                 raise e
 
-    def __initialize_db(self) -> None:
-        Logger().debug("Migrating database...")
-        with open(SCHEMA_SQL, "r", encoding="utf-8") as file:
-            sql: str = file.read()
+    def __migrate(self) -> None:
+        """
+        Bring the schema up to date. The schema version is kept in `PRAGMA user_version`, so when the db is
+        already current this is a single pragma read. Otherwise, every pending migration is applied in one
+        transaction, and the db is left as it was if any of them fail.
+        """
+        version: int = self.connection.execute("PRAGMA user_version;").fetchone()[0]
+        if version >= SCHEMA_VERSION:
+            return
+
+        if version == 0:
+            if self.__has_table("users"):
+                # Created from the single schema file used before migrations were versioned
+                version = 1
+            else:
+                # Only takes effect before the first table is created
+                self.connection.execute("PRAGMA auto_vacuum = INCREMENTAL;")
 
-        for query in sql.split(";"):
-            self.__execute_query(query)
+        Logger().debug(f"Migrating database from version {version} to {SCHEMA_VERSION}...")
+        with self.transaction() as connection:
+            for migration_version, path in available_migrations():
+                if migration_version <= version:
+                    continue
+                Logger().debug(f"Applying migration: {os.path.basename(path)}")
+                for statement in read_statements(path):
+                    connection.execute(statement)
+            connection.execute(f"PRAGMA user_version = {SCHEMA_VERSION};")
+
+    def __has_table(self, name: str) -> bool:
+        query: str = "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?;"
+        return self.connection.execute(query, (name,)).fetchone() is not None
 
     def close(self):
         if self.connection:
             self.connection.close()
             Logger().debug("Database connection closed")
             self.connection = None
+
+
+def available_migrations() -> list[tuple[int, str]]:
+    """
+    Find the migrations, named like 0001_description.sql
+    :return: the version and path of every migration, oldest first
+    """
+    return sorted(
+        (int(name.split("_", 1)[0]), os.path.join(MIGRATIONS_DIR, name))
+        for name in os.listdir(MIGRATIONS_DIR)
+        if name.endswith(".sql")
+    )
+
+
+def read_statements(path: str) -> list[str]:
+    """
+    Read the statements from a sql file, a statement ends at a line where it is complete
+    :param path: path of the sql file
+    :return: each statement in the file
+    """
+    statements: list[str] = []
+    pending: str = ""
+    with open(path, "r", encoding="utf-8") as file:
+        for line in file:
+            pending += line
+            if sqlite3.complete_statement(pending):
+                statements.append(pending.strip())
+                pending = ""
+    if pending.strip():
+        raise sqlite3.ProgrammingError(f"Incomplete statement at the end of {path}: {pending.strip()}")
+    return statements
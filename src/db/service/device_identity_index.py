@@ -0,0 +1,174 @@
+from __future__ import annotations
+
+import threading
+from dataclasses import replace
+from typing import Iterable
+
+from src.data.nmapdevice import NmapDevice
+from src.db.data.device import Device
+from src.db.data.user import User
+from src.db.service.device_service import DeviceService
+from src.db.service.user_service import UserService
+from src.util.logger import Logger
+from src.util.mac_address import normalize_mac
+
+
+class DeviceIdentityIndex:
+    """
+    Singleton in-memory index of the known devices, so scan hits can be matched to a device and its owner
+    without a query per hit. Devices are keyed on their normalized MAC address, falling back to the IP
+    address and hostname for hosts where no MAC address was found. The index is loaded from the db once,
+    writes go through to the db before the index is updated, and `invalidate()` forces a reload.
+    """
+
+    _instance = None
+    _initialized = False
+    _lock = threading.RLock()
+
+    def __new__(cls, *args, **kwargs):
+        if cls._instance is None:
+            cls._instance = super(DeviceIdentityIndex, cls).__new__(cls, *args, **kwargs)
+        return cls._instance
+
+    def __init__(self) -> None:
+        if DeviceIdentityIndex._initialized:
+            return
+        DeviceIdentityIndex._initialized = True
+        self._loaded: bool = False
+        self._by_id: dict[int, Device] = {}
+        self._by_mac: dict[str, Device] = {}
+        self._by_ip_and_hostname: dict[tuple[str, str | None], Device] = {}
+        self._owners: dict[int, User] = {}
+
+    def load(self) -> DeviceIdentityIndex:
+        """
+        Load every known device and user from the db, only the first call does any work
+        :return: the loaded index
+        """
+        with self._lock:
+            if self._loaded:
+                return self
+            Logger().debug("Loading device identity index.... ")
+            for device in DeviceService().read_all():
+                self._add(device)
+            self._owners.update((user.id, user) for user in UserService().read_all())
+            self._loaded = True
+            Logger().debug(f"Loaded {len(self._by_id)} devices into the identity index")
+            return self
+
+    def invalidate(self) -> None:
+        """
+        Drop everything held in memory, the next lookup will reload from the db
+        :return: nothing
+        """
+        with self._lock:
+            self._loaded = False
+            self._by_id.clear()
+            self._by_mac.clear()
+            self._by_ip_and_hostname.clear()
+            self._owners.clear()
+
+    def resolve(self, nmap_device: NmapDevice) -> Device | None:
+        """
+        Find the known device for a scan hit
+        :param nmap_device: device found by the scan
+        :return: the known device, or None if it has not been seen before
+        """
+        self.load()
+        mac_addr: str | None = normalize_mac(nmap_device.mac_addr)
+        if mac_addr is not None and mac_addr in self._by_mac:
+            return self._by_mac[mac_addr]
+        # Devices first seen without a MAC address, e.g. from an unprivileged scan
+        return self._by_ip_and_hostname.get((nmap_device.ip_addr, nmap_device.hostname))
+
+    def resolve_all(self, nmap_devices: Iterable[NmapDevice]) -> list[Device | None]:
+        """
+        Find the known device for each scan hit
+        :param nmap_devices: devices found by the scan
+        :return: the known device for each scan hit, in the same order, None where it is unknown
+        """
+        self.load()
+        return [self.resolve(nmap_device) for nmap_device in nmap_devices]
+
+    def owner_of(self, device: Device | None) -> User | None:
+        """
+        Get the owner of a known device from memory
+        :param device: the known device
+        :return: the user that owns the device, or None
+        """
+        self.load()
+        if device is None or device.owned_by is None:
+            return None
+        return self._owners.get(device.owned_by)
+
+    def save(self, device: Device) -> Device:
+        """
+        Create or update a device in the db, then in the index
+        :param device: the device to save, created if it has no id
+        :return: the saved device, with its id set
+        """
+        self.load()
+        device = replace(device, mac_addr=normalize_mac(device.mac_addr))
+        with self._lock:
+            if device.id is None:
+                device = replace(device, id=DeviceService().create(device))
+            elif DeviceService().update(device) is None:
+                raise ValueError(f"Device with id: {device.id} does not exist")
+            self._remove(device.id)
+            self._add(device)
+        return device
+
+    def learn(self, nmap_device: NmapDevice) -> Device:
+        """
+        Resolve a scan hit, saving it as a new device if it is not known yet. A known device has its
+        last seen MAC address, ip address and hostname written through when they change.
+        :param nmap_device: device found by the scan
+        :return: the known device
+        """
+        known: Device | None = self.resolve(nmap_device)
+        if known is None:
+            return self.save(
+                Device(
+                    id=None,
+                    device_name=nmap_device.hostname or nmap_device.ip_addr,
+                    owned_by=None,
+                    mac_addr=nmap_device.mac_addr,
+                    ip_addr=nmap_device.ip_addr,
+                    hostname=nmap_device.hostname,
+                )
+            )
+        mac_addr: str | None = normalize_mac(nmap_device.mac_addr) or known.mac_addr
+        hostname: str | None = nmap_device.hostname or known.hostname
+        if (mac_addr, nmap_device.ip_addr, hostname) != (known.mac_addr, known.ip_addr, known.hostname):
+            return self.save(replace(known, mac_addr=mac_addr, ip_addr=nmap_device.ip_addr, hostname=hostname))
+        return known
+
+    def remove(self, device_id: int) -> None:
+        """
+        Delete a device from the db and the index
+        :param device_id: id of the device to delete
+        :return: nothing
+        """
+        self.load()
+        with self._lock:
+            DeviceService().delete(device_id)
+            self._remove(device_id)
+
+    def __len__(self) -> int:
+        return len(self._by_id)
+
+    def _add(self, device: Device) -> None:
+        self._by_id[device.id] = device
+        if device.mac_addr is not None:
+            self._by_mac[device.mac_addr] = device
+        elif device.ip_addr is not None:
+            self._by_ip_and_hostname[(device.ip_addr, device.hostname)] = device
+
+    def _remove(self, device_id: int) -> None:
+        previous: Device | None = self._by_id.pop(device_id, None)
+        if previous is None:
+            return
+        if previous.mac_addr is not None:
+            self._by_mac.pop(previous.mac_addr, None)
+        else:
+            self._by_ip_and_hostname.pop((previous.ip_addr, previous.hostname), None)
@@ -7,9 +7,9 @@ class DeviceService(EntityService):
     def __init__(self):
         super().__init__("devices", Device)
 
-    def create(self, entity: Device) -> None:
+    def create(self, entity: Device) -> int:
         self.validate(entity)
-        super().create(entity)
+        return super().create(entity)
 
     def read(self, _id: int) -> Device | None:
         return super().read(_id)
@@ -1,48 +1,89 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from functools import cache
+from typing import Iterable
+
 from src.db.data.entity import Entity
 from src.db.db_connector import DatabaseConnector
 
 
+@dataclass(frozen=True)
+class EntityStatements:
+    """
+    The SQL used by an `EntityService`, generated once per table and entity type. Reusing the exact same
+    strings also means sqlite3 hits its per-connection prepared statement cache instead of re-preparing.
+    """
+
+    insert: str
+    select_by_id: str
+    select_all: str
+    update: str
+    delete: str
+    exists: str
+
+
+@cache
+def compile_statements(table: str, _type: type[Entity]) -> EntityStatements:
+    """
+    Generate the statements for a table, cached so each entity type only pays for this once
+    :param table: name of the table
+    :param _type: entity type stored in the table
+    :return: the statements for the table
+    """
+    columns: tuple[str, ...] = _type.columns()
+    column_list: str = ", ".join(columns)
+    placeholders: str = ", ".join("?" for _ in columns)
+    assignments: str = ", ".join(f"{column} = ?" for column in columns if column != "id")
+    return EntityStatements(
+        insert=f"INSERT INTO {table} ({column_list}) VALUES ({placeholders});",
+        select_by_id=f"SELECT {column_list} FROM {table} WHERE id = ?;",
+        select_all=f"SELECT {column_list} FROM {table};",
+        update=f"UPDATE {table} SET {assignments} WHERE id = ?;",
+        delete=f"DELETE FROM {table} WHERE id = ?;",
+        exists=f"SELECT 1 FROM {table} WHERE id = ?;",
+    )
+
+
 class EntityService:
     def __init__(self, table_name: str, _type: type[Entity]) -> None:
         self._table: str = table_name
         self._type: type[Entity] = _type
+        self._statements: EntityStatements = compile_statements(table_name, _type)
         self._connection: DatabaseConnector = DatabaseConnector()
         self._connection.connect()
 
-    def create(self, entity: Entity) -> None:
-        entity_dict = entity.to_dict()
-        cols = ", ".join(entity_dict.keys())
-        vals = ", ".join([":" + k for k in entity_dict.keys()])
-        sql = f"INSERT INTO {self._table} ({cols}) VALUES ({vals});"
-        self._connection.find_all(sql, entity_dict)
+    def create(self, entity: Entity) -> int:
+        return self._connection.insert(self._statements.insert, entity.to_row())
+
+    def create_many(self, entities: Iterable[Entity]) -> None:
+        """
+        Insert all the entities within a single transaction, for bulk ingest
+        :param entities: entities to insert
+        :return: nothing, entities are written to the db
+        """
+        self._connection.execute_many(self._statements.insert, (entity.to_row() for entity in entities))
 
     def read(self, _id: int) -> Entity | None:
-        entity = self._connection.find_one(f"SELECT * FROM {self._table} WHERE id = ?;", (_id,))
-        return self._type(**dict(entity)) if entity is not None else None
+        row = self._connection.find_one(self._statements.select_by_id, (_id,))
+        return self._type.from_row(row) if row is not None else None
 
     def read_all(self) -> list[Entity]:
-        rows = self._connection.find_all(f"SELECT * FROM {self._table};")
-        return [self._type(**dict(row)) for row in rows]
+        rows = self._connection.find_all(self._statements.select_all)
+        return [self._type.from_row(row) for row in rows]
 
     def update(self, entity: Entity) -> Entity | None:
         if not self.exists(entity.id):
             return None
-        update_sql = f"UPDATE {self._table} "
-        set_strs = []
-        entity_as_dict = entity.to_dict()
-        for k in entity_as_dict.keys():
-            if k == "id":
-                continue
-            set_strs.append(f"SET {k} = :{k}")
-        update_sql += ", ".join(set_strs)
-        update_sql += " WHERE id = :id"
-        self._connection.find_one(update_sql, entity_as_dict)
+        row: tuple = entity.to_row()
+        # id is the first column, but it is bound last for the WHERE clause
+        self._connection.find_one(self._statements.update, row[1:] + row[:1])
         return entity
 
     def delete(self, _id: int) -> None:
         if not self.exists(_id):
             return
-        self._connection.find_one(f"DELETE FROM {self._table} WHERE id = ?;", (_id,))
+        self._connection.find_one(self._statements.delete, (_id,))
 
     def exists(self, _id: int) -> bool:
-        return self._connection.find_one(f"SELECT * FROM {self._table} WHERE id = ?;", (_id,)) is not None
+        return self._connection.find_one(self._statements.exists, (_id,)) is not None
@@ -0,0 +1,16 @@
+from src.db.service.entity_service import EntityService
+from src.db.data.observation import Observation
+
+
+class ObservationService(EntityService):
+    def __init__(self):
+        super().__init__("observations", Observation)
+
+    def create(self, entity: Observation) -> int:
+        return super().create(entity)
+
+    def read(self, _id: int) -> Observation | None:
+        return super().read(_id)
+
+    def read_all(self) -> list[Observation]:
+        return super().read_all()
@@ -0,0 +1,195 @@
+from __future__ import annotations
+
+import queue
+import threading
+import time
+from dataclasses import dataclass, field
+
+from src.data.nmapdevice import NmapDevice
+from src.db.data.device import Device
+from src.db.data.observation import Observation
+from src.db.service.device_identity_index import DeviceIdentityIndex
+from src.db.service.observation_service import ObservationService
+from src.util.logger import Logger
+from src.util.mac_address import normalize_mac
+
+
+@dataclass
+class PendingObservation:
+    """
+    A device seen by a scan stage, waiting to be written by the `ObservationWriter`
+    """
+
+    device: NmapDevice
+    observed_at: int = field(default_factory=lambda: int(time.time()))
+    # Whether an unknown device should be saved as a new known device
+    learn: bool = True
+
+
+@dataclass
+class WriterMetrics:  # pylint: disable=too-many-instance-attributes
+    """
+    Metrics for the `ObservationWriter`, latencies are in seconds
+    """
+
+    queue_depth: int = 0
+    max_queue_depth: int = 0
+    batches: int = 0
+    rows_written: int = 0
+    rows_failed: int = 0
+    dropped: int = 0
+    last_flush_latency: float = 0.0
+    max_flush_latency: float = 0.0
+    total_flush_latency: float = 0.0
+
+    @property
+    def mean_flush_latency(self) -> float:
+        return self.total_flush_latency / self.batches if self.batches else 0.0
+
+
+_STOP = object()
+
+
+class ObservationWriter:
+    """
+    Writes observations to the db from a single background thread, so persisting never blocks the threads
+    that are scanning. Scan stages `submit` devices onto a bounded queue, the writer thread resolves them
+    to known devices and batches the observations into one transaction per `batch_size` rows, or per
+    `flush_interval` seconds when fewer rows arrive. `close` flushes everything still queued before returning.
+    """
+
+    def __init__(
+        self,
+        max_queue_size: int = 10_000,
+        batch_size: int = 500,
+        flush_interval: float = 1.0,
+        submit_timeout: float = 1.0,
+    ) -> None:
+        """
+        :param max_queue_size: maximum number of observations waiting to be written
+        :param batch_size: number of observations written per transaction
+        :param flush_interval: maximum number of seconds an observation waits before its batch is written
+        :param submit_timeout: how long `submit` waits for space on a full queue before dropping the observation
+        """
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.submit_timeout = submit_timeout
+        self.metrics = WriterMetrics()
+        # Devices are submitted from more than one thread, e.g. the port scan results and the hostname lookups
+        self._metrics_lock = threading.Lock()
+        self._queue: queue.Queue = queue.Queue(maxsize=max_queue_size)
+        self._thread: threading.Thread | None = None
+
+    def start(self) -> ObservationWriter:
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="observation-writer", daemon=True)
+            self._thread.start()
+        return self
+
+    def submit(self, device: NmapDevice, observed_at: int | None = None, learn: bool = True) -> bool:
+        """
+        Queue a device seen by a scan to be written in the background
+        :param device: the device that was seen
+        :param observed_at: when it was seen in seconds since the epoch, defaults to now
+        :param learn: save the device as a new known device if it is unknown. Should be False for scans
+            that cannot see the MAC address, so they don't create duplicates of devices known by MAC address
+        :return: True if it was queued, False if it was dropped because the queue stayed full
+        """
+        pending = PendingObservation(device, int(time.time()) if observed_at is None else observed_at, learn)
+        try:
+            self._queue.put(pending, timeout=self.submit_timeout)
+        except queue.Full:
+            with self._metrics_lock:
+                self.metrics.dropped += 1
+            Logger().debug(f"Observation queue is full, dropping observation of {device.ip_addr}")
+            return False
+        with self._metrics_lock:
+            depth: int = self._queue.qsize()
+            self.metrics.queue_depth = depth
+            self.metrics.max_queue_depth = max(self.metrics.max_queue_depth, depth)
+        return True
+
+    def close(self) -> WriterMetrics:
+        """
+        Flush everything that is queued and stop the writer thread
+        :return: the final metrics of the writer
+        """
+        if self._thread is not None:
+            self._queue.put(_STOP)
+            self._thread.join()
+            self._thread = None
+        Logger().debug(f"Observation writer closed with metrics: {self.metrics}")
+        return self.metrics
+
+    def __enter__(self) -> ObservationWriter:
+        return self.start()
+
+    def __exit__(self, *_) -> None:
+        self.close()
+
+    def _run(self) -> None:
+        # The connection has to be created on the thread that uses it
+        service: ObservationService = ObservationService()
+        batch: list[PendingObservation] = []
+        deadline: float = 0.0
+        while True:
+            timeout: float | None = max(deadline - time.monotonic(), 0.0) if batch else None
+            try:
+                item = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                item = None
+
+            if item is _STOP:
+                self._flush(service, batch)
+                return
+            if item is not None:
+                if not batch:
+                    deadline = time.monotonic() + self.flush_interval
+                batch.append(item)
+            if len(batch) >= self.batch_size or (batch and time.monotonic() >= deadline):
+                self._flush(service, batch)
+                batch = []
+
+    def _flush(self, service: ObservationService, batch: list[PendingObservation]) -> None:
+        if not batch:
+            return
+        started: float = time.perf_counter()
+        try:
+            index: DeviceIdentityIndex = DeviceIdentityIndex()
+            # Resolve every device before inserting, learning a new device writes on its own connection
+            observations: list[Observation] = [
+                self._to_observation(index.learn(p.device) if p.learn else index.resolve(p.device), p) for p in batch
+            ]
+            service.create_many(observations)
+            self.metrics.rows_written += len(batch)
+        except Exception as e:  # pylint: disable=broad-exception-caught
+            # Keep the writer alive, losing one batch is better than losing every later one
+            self.metrics.rows_failed += len(batch)
+            Logger().debug(f"Failed to write a batch of {len(batch)} observations: {e}")
+        latency: float = time.perf_counter() - started
+        self.metrics.batches += 1
+        self.metrics.last_flush_latency = latency
+        self.metrics.max_flush_latency = max(self.metrics.max_flush_latency, latency)
+        self.metrics.total_flush_latency += latency
+        with self._metrics_lock:
+            self.metrics.queue_depth = self._queue.qsize()
+
+    @staticmethod
+    def _to_observation(known: Device | None, pending: PendingObservation) -> Observation:
+        if known is None:
+            return Observation(
+                id=None,
+                device_id=None,
+                mac_addr=normalize_mac(pending.device.mac_addr),
+                ip_addr=pending.device.ip_addr,
+                hostname=pending.device.hostname,
+                observed_at=pending.observed_at,
+            )
+        return Observation(
+            id=None,
+            device_id=known.id,
+            mac_addr=known.mac_addr,
+            ip_addr=pending.device.ip_addr,
+            hostname=pending.device.hostname or known.hostname,
+            observed_at=pending.observed_at,
+        )
@@ -0,0 +1,201 @@
+from __future__ import annotations
+
+import time
+from dataclasses import dataclass, replace
+from sqlite3 import Connection
+
+from src.db.data.observation import Observation
+from src.db.data.presence_interval import PresenceInterval, presence_key
+from src.db.db_connector import DatabaseConnector
+from src.db.service.entity_service import EntityStatements, compile_statements
+from src.util.logger import Logger
+
+SECONDS_IN_A_DAY = 24 * 60 * 60
+
+_INTERVAL_COLUMNS: str = ", ".join(PresenceInterval.columns())
+_OBSERVATION_COLUMNS: str = ", ".join(Observation.columns())
+SELECT_DUE_OBSERVATIONS = (
+    f"SELECT {_OBSERVATION_COLUMNS} FROM observations WHERE observed_at < ? ORDER BY observed_at, id LIMIT ?;"
+)
+SELECT_LATEST_INTERVAL = (
+    f"SELECT {_INTERVAL_COLUMNS} FROM presence_intervals WHERE device_key = ? ORDER BY left_at DESC LIMIT 1;"
+)
+SELECT_DEVICE_INTERVALS = (
+    f"SELECT {_INTERVAL_COLUMNS} FROM presence_intervals WHERE device_id = ? AND left_at >= ? ORDER BY arrived_at;"
+)
+SELECT_DEVICE_OBSERVATIONS = (
+    f"SELECT {_OBSERVATION_COLUMNS} FROM observations WHERE device_id = ? AND observed_at >= ? ORDER BY observed_at;"
+)
+
+
+@dataclass
+class RetentionPolicy:
+    """
+    How long presence data is kept for
+    """
+
+    # Observations older than this are compacted into presence intervals
+    raw_retention_days: float = 7
+    # Presence intervals that ended longer ago than this are deleted, None keeps them forever
+    interval_retention_days: float | None = 365
+    # Observations of a device further apart than this start a new interval, i.e. it left and came back
+    max_gap_seconds: int = 60 * 60
+    # Number of observations compacted per transaction
+    chunk_size: int = 5_000
+
+
+@dataclass
+class CompactionResult:
+    observations_compacted: int = 0
+    intervals_created: int = 0
+    intervals_extended: int = 0
+    intervals_pruned: int = 0
+    duration: float = 0.0
+
+
+class RetentionEngine:
+    """
+    Keeps the presence history bounded. Observations are kept as they are for `raw_retention_days`, after
+    which they are compacted into per-device presence intervals (when the device arrived and left) and
+    deleted. Compaction is incremental, each run carries on from the oldest observation still left, so it
+    can be run as a small job between scheduled scans.
+    """
+
+    def __init__(self, policy: RetentionPolicy | None = None) -> None:
+        self.policy: RetentionPolicy = policy or RetentionPolicy()
+        self._intervals: EntityStatements = compile_statements("presence_intervals", PresenceInterval)
+        self._observations: EntityStatements = compile_statements("observations", Observation)
+        self._connection: DatabaseConnector = DatabaseConnector()
+        self._connection.connect()
+
+    def compact(self, now: int | None = None, max_chunks: int | None = None) -> CompactionResult:
+        """
+        Compact observations older than the raw retention period and prune expired intervals
+        :param now: the current time in seconds since the epoch, defaults to now
+        :param max_chunks: stop after compacting this many chunks, None compacts everything that is due
+        :return: what was compacted
+        """
+        started: float = time.perf_counter()
+        now = int(time.time()) if now is None else now
+        cutoff: int = now - int(self.policy.raw_retention_days * SECONDS_IN_A_DAY)
+        result = CompactionResult()
+
+        chunks: int = 0
+        while max_chunks is None or chunks < max_chunks:
+            compacted: int = self._compact_chunk(cutoff, result)
+            chunks += 1
+            if compacted < self.policy.chunk_size:
+                break
+
+        if self.policy.interval_retention_days is not None:
+            expiry: int = now - int(self.policy.interval_retention_days * SECONDS_IN_A_DAY)
+            with self._connection.transaction() as connection:
+                result.intervals_pruned = connection.execute(
+                    "DELETE FROM presence_intervals WHERE left_at < ?;", (expiry,)
+                ).rowcount
+
+        if result.observations_compacted or result.intervals_pruned:
+            # Hand the pages freed by the deletes back to the file system
+            self._connection.find_all("PRAGMA incremental_vacuum;")
+
+        result.duration = time.perf_counter() - started
+        Logger().debug(f"Compacted presence history: {result}")
+        return result
+
+    def history(self, device_id: int, since: int) -> list[PresenceInterval]:
+        """
+        Get when a known device was on the network, combining compacted intervals with recent observations
+        :param device_id: id of the device
+        :param since: only include presence after this time, in seconds since the epoch
+        :return: the intervals the device was present for, oldest first
+        """
+        intervals: list[PresenceInterval] = [
+            PresenceInterval.from_row(row)
+            for row in self._connection.find_all(SELECT_DEVICE_INTERVALS, (device_id, since))
+        ]
+        # Recent observations are collapsed the same way compaction would, continuing the newest interval
+        persisted: int = len(intervals)
+        for row in self._connection.find_all(SELECT_DEVICE_OBSERVATIONS, (device_id, since)):
+            observation: Observation = Observation.from_row(row)
+            extended: PresenceInterval | None = self._extend(intervals[-1] if intervals else None, observation)
+            if extended is None:
+                intervals.append(self._start(f"device:{device_id}", observation))
+            else:
+                intervals[-1] = extended
+        Logger().debug(f"Found {persisted} compacted and {len(intervals) - persisted} recent intervals")
+        return intervals
+
+    def _compact_chunk(self, cutoff: int, result: CompactionResult) -> int:
+        with self._connection.transaction() as connection:
+            rows = connection.execute(SELECT_DUE_OBSERVATIONS, (cutoff, self.policy.chunk_size)).fetchall()
+            if not rows:
+                return 0
+
+            created: list[PresenceInterval] = []
+            extended: dict[int, PresenceInterval] = {}
+            # Latest interval per device key, with its position in `created` if it is new
+            latest: dict[str, tuple[PresenceInterval | None, int | None]] = {}
+            for row in rows:
+                observation: Observation = Observation.from_row(row)
+                key: str = presence_key(
+                    observation.device_id, observation.mac_addr, observation.ip_addr, observation.hostname
+                )
+                if key not in latest:
+                    latest[key] = (self._latest_interval(connection, key), None)
+                interval, position = latest[key]
+
+                merged: PresenceInterval | None = self._extend(interval, observation)
+                if merged is None:
+                    created.append(self._start(key, observation))
+                    latest[key] = (created[-1], len(created) - 1)
+                elif position is not None:
+                    created[position] = merged
+                    latest[key] = (merged, position)
+                else:
+                    extended[merged.id] = merged
+                    latest[key] = (merged, None)
+
+            connection.executemany(self._intervals.insert, (interval.to_row() for interval in created))
+            connection.executemany(
+                self._intervals.update, (interval.to_row()[1:] + (interval.id,) for interval in extended.values())
+            )
+            connection.executemany(self._observations.delete, ((row[0],) for row in rows))
+
+        result.observations_compacted += len(rows)
+        result.intervals_created += len(created)
+        result.intervals_extended += len(extended)
+        return len(rows)
+
+    def _latest_interval(self, connection: Connection, key: str) -> PresenceInterval | None:
+        row = connection.execute(SELECT_LATEST_INTERVAL, (key,)).fetchone()
+        return PresenceInterval.from_row(row) if row is not None else None
+
+    def _extend(self, interval: PresenceInterval | None, observation: Observation) -> PresenceInterval | None:
+        """
+        Extend the interval with the observation
+        :param interval: the latest interval of the device, if there is one
+        :param observation: the next observation of the device
+        :return: the extended interval, or None if the device left in between and a new interval should start
+        """
+        if interval is None or observation.observed_at - interval.left_at > self.policy.max_gap_seconds:
+            return None
+        return replace(
+            interval,
+            ip_addr=observation.ip_addr,
+            hostname=observation.hostname or interval.hostname,
+            left_at=max(interval.left_at, observation.observed_at),
+            observation_count=interval.observation_count + 1,
+        )
+
+    @staticmethod
+    def _start(key: str, observation: Observation) -> PresenceInterval:
+        return PresenceInterval(
+            id=None,
+            device_key=key,
+            device_id=observation.device_id,
+            ip_addr=observation.ip_addr,
+            hostname=observation.hostname,
+            arrived_at=observation.observed_at,
+            left_at=observation.observed_at,
+            observation_count=1,
+        )
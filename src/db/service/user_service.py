@@ -6,8 +6,8 @@ class UserService(EntityService):
     def __init__(self):
         super().__init__("users", User)
 
-    def create(self, entity: User) -> None:
-        super().create(entity)
+    def create(self, entity: User) -> int:
+        return super().create(entity)
 
     def read(self, _id: int) -> User | None:
         return super().read(_id)
@@ -0,0 +1,195 @@
+from __future__ import annotations
+
+import asyncio
+import errno
+import ipaddress
+import socket
+import time
+from dataclasses import dataclass, field
+from functools import cache
+from typing import Callable, Iterator, TYPE_CHECKING
+
+from src.data.nmapdevice import NmapDevice, OperatingSystem, Port, Service
+from src.util.logger import Logger
+from src.util.progress_service import ProgressService
+
+if TYPE_CHECKING:
+    from rich.progress import TaskID
+
+# The ports nmap scans with -F, its 100 most common TCP ports
+TOP_PORTS: list[int] = [
+    7, 9, 13, 21, 22, 23, 25, 26, 37, 53, 79, 80, 81, 88, 106, 110, 111, 113, 119, 135,
+    139, 143, 144, 179, 199, 389, 427, 443, 444, 445, 465, 513, 514, 515, 543, 544, 548, 554, 587, 631,
+    646, 873, 990, 993, 995, 1025, 1026, 1027, 1028, 1029, 1110, 1433, 1720, 1723, 1755, 1900, 2000, 2001, 2049, 2121,
+    2717, 3000, 3128, 3306, 3389, 3986, 4899, 5000, 5009, 5051, 5060, 5101, 5190, 5357, 5432, 5631, 5666, 5800, 5900,
+    6000, 6001, 6646, 7070, 8000, 8008, 8009, 8080, 8081, 8443, 8888, 9100, 9999, 10000, 32768, 49152, 49153, 49154,
+    49155, 49156, 49157,
+]  # fmt: skip
+
+
+class RateLimiter:
+    """
+    Spaces out connection attempts so no more than `rate` are started per second
+    """
+
+    def __init__(self, rate: float | None) -> None:
+        self.interval: float = 1 / rate if rate else 0.0
+        self._next: float = 0.0
+
+    async def wait(self) -> None:
+        if not self.interval:
+            return
+        now: float = time.monotonic()
+        # Reserve the next slot before sleeping, so concurrent callers queue up behind each other
+        start: float = max(now, self._next)
+        self._next = start + self.interval
+        if start > now:
+            await asyncio.sleep(start - now)
+
+
+@dataclass
+class HostScan:
+    """
+    A device being scanned, ports are probed in order so it is finished once every port has been answered
+    """
+
+    device: NmapDevice
+    family: int
+    task_id: TaskID
+    remaining: int
+    open_ports: set[int] = field(default_factory=set)
+
+
+class ConnectScanner:
+    """
+    Port scans hosts with plain TCP connects from a single asyncio event loop, as a light alternative to running
+    nmap for every host. A fixed number of workers take the next port of the next host as soon as they are free,
+    so a host with unanswered ports doesn't hold up the rest, and never more than `max_sockets` are open at once.
+    A port is open when the connect succeeds within the timeout. Services and operating systems can't be
+    detected, so ports are named from the system services database and the OS is left unknown, in the same
+    `NmapDevice` as the nmap port scan produces.
+    """
+
+    def __init__(
+        self,
+        ports: list[int] | None = None,
+        max_sockets: int = 256,
+        timeout: float = 1.0,
+        rate: float | None = None,
+    ) -> None:
+        """
+        :param ports: ports to scan on every host, defaults to the 100 most common
+        :param max_sockets: maximum number of connects in flight at once
+        :param timeout: seconds to wait for each connect before treating the port as closed
+        :param rate: maximum number of connects started per second, None for no limit
+        """
+        self.ports: list[int] = ports if ports is not None else TOP_PORTS
+        self.max_sockets = max_sockets
+        self.timeout = timeout
+        self.rate = rate
+
+    def scan(
+        self, devices: list[NmapDevice], on_device: Callable[[NmapDevice], None] | None = None
+    ) -> list[NmapDevice]:
+        """
+        Scan the ports of every device
+        :param devices: devices found by host discovery
+        :param on_device: called with each scanned device as soon as its scan finishes, on the calling thread
+        :return: the scanned devices, in the order they finished
+        """
+        with ProgressService().track(len(devices)):
+            return asyncio.run(self.scan_async(devices, on_device))
+
+    async def scan_async(
+        self, devices: list[NmapDevice], on_device: Callable[[NmapDevice], None] | None = None
+    ) -> list[NmapDevice]:
+        limiter = RateLimiter(self.rate)
+        scanned: list[NmapDevice] = []
+        # Shared by every worker, the event loop only runs one of them at a time
+        probes: Iterator[tuple[HostScan, int]] = self.probes(devices)
+
+        async def worker() -> None:
+            for host_scan, port in probes:
+                await limiter.wait()
+                if await self.probe(host_scan.device.ip_addr, port, host_scan.family):
+                    host_scan.open_ports.add(port)
+                host_scan.remaining -= 1
+                if host_scan.remaining == 0:
+                    ProgressService().progress.complete(host_scan.task_id)
+                    device: NmapDevice = self.scanned_device(host_scan)
+                    scanned.append(device)
+                    if on_device is not None:
+                        on_device(device)
+
+        await asyncio.gather(*(worker() for _ in range(min(self.max_sockets, len(devices) * len(self.ports)))))
+        return scanned
+
+    def probes(self, devices: list[NmapDevice]) -> Iterator[tuple[HostScan, int]]:
+        """
+        Every port of every device, a device is only started once the workers get to its first port
+        :param devices: devices to scan
+        :return: the device and port of each connect to make
+        """
+        for device in devices:
+            family: int = socket.AF_INET6 if ipaddress.ip_address(device.ip_addr).version == 6 else socket.AF_INET
+            task_id: TaskID = ProgressService().progress.start(f"connect scan {device.ip_addr}")
+            host_scan = HostScan(device=device, family=family, task_id=task_id, remaining=len(self.ports))
+            for port in self.ports:
+                yield host_scan, port
+
+    def scanned_device(self, host_scan: HostScan) -> NmapDevice:
+        """
+        Build the device from the ports found open
+        :param host_scan: the finished scan of the device
+        :return: a device with the open ports, like the one nmap's port scan produces
+        """
+        Logger().debug(f"Connect scan of {host_scan.device.ip_addr} found {len(host_scan.open_ports)} open ports")
+        return NmapDevice(
+            hostname=host_scan.device.hostname,
+            ip_addr=host_scan.device.ip_addr,
+            mac_addr=None,
+            os=OperatingSystem(name="(Unknown)", vendor="(Unknown)", family="(Unknown)"),
+            ports=[
+                Port(id=str(port), protocol="tcp", service=service_for(port))
+                for port in dict.fromkeys(self.ports)
+                if port in host_scan.open_ports
+            ],
+        )
+
+    async def probe(self, ip_addr: str, port: int, family: int) -> bool:
+        """
+        Connect to a port, the connect is started directly on a non-blocking socket rather than through
+        `loop.sock_connect`, which resolves the address again for every port and costs more than the connect
+        :return: True if the connect succeeded within the timeout
+        """
+        with socket.socket(family, socket.SOCK_STREAM) as sock:
+            sock.setblocking(False)
+            error: int = sock.connect_ex((ip_addr, port))
+            if error != errno.EINPROGRESS:
+                # Answered straight away, as connects to the local machine can be
+                return error == 0
+            loop: asyncio.AbstractEventLoop = asyncio.get_running_loop()
+            writable: asyncio.Future = loop.create_future()
+            loop.add_writer(sock.fileno(), lambda: writable.done() or writable.set_result(None))
+            try:
+                async with asyncio.timeout(self.timeout):
+                    await writable
+            except TimeoutError:
+                return False
+            finally:
+                loop.remove_writer(sock.fileno())
+            return sock.getsockopt(socket.SOL_SOCKET, socket.SO_ERROR) == 0
+
+
+@cache
+def service_for(port: int) -> Service:
+    """
+    Name the service usually found on a port from the system services database
+    :param port: the TCP port
+    :return: the service, "unknown" if the port isn't in the database
+    """
+    try:
+        name: str = socket.getservbyport(port, "tcp")
+    except OSError:
+        name = "unknown"
+    return Service(name=name, product="", os_type="")
@@ -1,16 +1,19 @@
+from __future__ import annotations
+
 import os
 import subprocess
 from concurrent.futures import ThreadPoolExecutor
-from typing import Iterator
-
-import rich
-from rich.progress import TaskID
+from typing import Iterator, TYPE_CHECKING
 
 from src.data.command_result import CommandResult
-from src.data.executor_callback_events import ExecutorCallbackEvents
 from src.output.typer_output_builder import TyperOutputBuilder
+from src.util.display import Display
 from src.util.logger import Logger
-from src.util.progress_service import ProgressService
+
+if TYPE_CHECKING:
+    from rich.progress import TaskID
+
+    from src.data.executor_callback_events import ExecutorCallbackEvents
 
 
 class DefaultExecutor:
@@ -34,6 +37,7 @@ class DefaultExecutor:
         """
         self.output_sudo_warning(command)
         result = None
+        timed_out: bool = False
         try:
             Logger().debug(
                 f"Executing command: {command} with timeout: {self.timeout} and privileged: {running_as_sudo()}"
@@ -47,14 +51,15 @@ class DefaultExecutor:
                 timeout=self.timeout,
             )
         except subprocess.CalledProcessError as e:
-            rich.print(
+            Display().console.print(
                 TyperOutputBuilder()
                 .apply_bold_red(f" error occurred whilst executing nmap command, error: {e} ")
                 .build()
             )
         except (TimeoutError, subprocess.TimeoutExpired):
+            timed_out = True
             if not self.timeout_warning:
-                rich.print(
+                Display().console.print(
                     TyperOutputBuilder()
                     .add_exclamation_mark()
                     .apply_bold_red(
@@ -65,11 +70,11 @@ class DefaultExecutor:
                 self.timeout_warning = True
 
         Logger().debug("Creating command result.... ")
-        return CommandResult.create_command_result(result, command)
+        return CommandResult.create_command_result(result, command, timed_out)
 
     def output_sudo_warning(self, command):
-        if self.warn_about_sudo and not running_as_sudo() and "-PE" in command:
-            rich.print(
+        if self.warn_about_sudo and not running_as_sudo() and "-PE" in command and "--privileged" not in command:
+            Display().console.print(
                 TyperOutputBuilder()
                 .add_exclamation_mark()
                 .apply_bold_red("Warning: ")
@@ -99,8 +104,10 @@ class DefaultExecutor:
         :return: A list of results corresponding to the execution of each command.
         :rtype: list[CommandResult]
         """
+        from src.util.progress_service import ProgressService
+
         self.output_sudo_warning(commands[0])
-        with ProgressService().progress:
+        with ProgressService().track(len(commands)):
             with ThreadPoolExecutor(max_workers=20) as executor:
                 results: Iterator[CommandResult] = executor.map(
                     lambda args: self.async_execute(*args), [(command, events) for command in commands]
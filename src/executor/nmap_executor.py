@@ -1,64 +1,132 @@
 from __future__ import annotations
 
 import datetime
-
-from rich.progress import Progress, TextColumn, SpinnerColumn
+import tempfile
+from contextlib import contextmanager
+from dataclasses import replace
+from typing import Iterator, TYPE_CHECKING
 
 from src.data.command_result import CommandResult
-from src.data.executor_callback_events import ExecutorCallbackEvents
 from src.executor.default_executor import DefaultExecutor, running_as_sudo
 from src.output.typer_output_builder import TyperOutputBuilder
+from src.util.display import Display
 from src.util.logger import Logger
+from src.data.timing_template import TimingTemplate
+from src.util.host_range import IPNetwork, target_network
 from src.util.nmap_command_builder import NmapCommandBuilder, AvailableNmapFlags
+from src.util.timing_profile import NetworkStats, TimingProfile, choose_profile, network_size
+
+if TYPE_CHECKING:
+    from src.data.executor_callback_events import ExecutorCallbackEvents
+    from src.util.exclusions import ExclusionIndex
+    from src.util.nmap_capabilities import NmapCapabilities
+
+# Most exclusions passed with --exclude, more are written to a file for --excludefile to keep the command short
+MAX_EXCLUDED_ON_COMMAND_LINE = 32
 
 
-class NmapExecutor:
+class NmapExecutor:  # pylint: disable=too-many-instance-attributes
     """
     Uses DefaultExecutor to execute nmap commands
     """
 
-    def __init__(self, host: str, cidr: str, timeout: float = 120) -> None:
+    def __init__(
+        self,
+        host: str,
+        cidr: str,
+        timeout: float = 120,
+        capabilities: NmapCapabilities | None = None,
+        timing: TimingTemplate = TimingTemplate.AUTO,
+        network: NetworkStats | None = None,
+        exclusions: ExclusionIndex | None = None,
+        nmap: str = "nmap",
+    ) -> None:
         """
         Executor for nmap commands will provide a network scan
         :param host: list of hosts to execute scans on
         :param cidr: ip range to execute scans on
         :param timeout: timeout of command execution in seconds
+        :param capabilities: what the installed nmap can do, if it has been probed
+        :param timing: timing template to force, or auto to pick the timing for the size and history of the network
+        :param network: what previous runs measured on the network, if it has been scanned before
+        :param exclusions: addresses nmap must never send anything to
+        :param nmap: name or path of the nmap binary to run
         """
         self.host = host
         self.cidr = cidr
         self.timeout = timeout
         self.executor = DefaultExecutor(timeout=self.timeout)
         self.privileged = running_as_sudo()
-        self.builder = NmapCommandBuilder(host, cidr, self.privileged)
+        # Without root, nmap can still send raw packets if the binary has CAP_NET_RAW, but has to be told to
+        self.raw_packets = not self.privileged and capabilities is not None and capabilities.cap_net_raw
+        self.nmap = nmap
+        # Already root when privileged, so commands aren't run through sudo, which containers often don't have
+        self.builder = NmapCommandBuilder(host, cidr, nmap=nmap).enable_privileged(self.raw_packets)
+        self.timing = timing
+        self.network = network
+        self.discovery_profile: TimingProfile = choose_profile(
+            "discovery", network_size(cidr, 128 if ":" in host else 32), network, timing
+        )
 
-    def execute_version_command(self) -> CommandResult:
-        """
-        Executes a version command using the provided builder and executor.
+        self.exclusions = exclusions
+        self.excluded: list[str] = excluded_within(exclusions, target_network(host, cidr)) if exclusions else []
 
-        This method constructs a version command through the `builder`
-        object and executes the command to perform host discovery using
-        the `executor`. The result of the command execution is returned
-        as a `CommandResult` object.
+    @contextmanager
+    def excluding(self) -> Iterator[NmapCommandBuilder]:
+        """
+        The builder for host discovery, excluding the excluded addresses in the network scanned. Many exclusions
+        are written to a file that only lasts as long as the context.
+        :return: the builder
+        """
+        if len(self.excluded) <= MAX_EXCLUDED_ON_COMMAND_LINE:
+            yield self.builder.enable_exclude(self.excluded)
+            return
+        with tempfile.NamedTemporaryFile("w", prefix="whos_home-exclude-", suffix=".txt", encoding="UTF-8") as file:
+            file.write("\n".join(self.excluded))
+            file.flush()
+            yield self.builder.enable_exclude_file(file.name)
+        self.builder.enable_exclude_file(None)
 
-        :return: The result of the version command execution.
-        :rtype: CommandResult
+    def port_scan_profile(self, scan_type: str) -> TimingProfile:
+        """
+        Timing for the port scan of a single host
+        :param scan_type: "general", "extended" or "full"
+        :return: the timing profile
         """
-        command: str = self.builder.build_version_command()
-        return self.executor.execute(command)
+        profile: TimingProfile = choose_profile(scan_type, 1, self.network, self.timing)
+        if profile.host_timeout is not None:
+            # nmap gives up on the host before the command is killed, so the command still finishes cleanly
+            profile = replace(profile, host_timeout=max(1, min(profile.host_timeout, int(self.timeout) - 5)))
+        return profile
 
     def execute_icmp_host_discovery(self) -> CommandResult:
         """
         Execute a host discovery scan using nmap
         :return: result of command execution
         """
-        command: str = (
-            self.builder.enable_service_scan()
-            .enable_exclude_ports()
-            .enable_aggressive_timing()
-            .enable_icmp_ping()
-            .enable_xml_to_stdout()
-            .build()
-        )
+        with self.excluding() as builder:
+            command: str = (
+                builder.enable_exclude_ports()
+                .enable_timing_profile(self.discovery_profile)
+                .enable_icmp_ping()
+                .enable_no_dns()
+                .enable_xml_to_stdout()
+                .build()
+            )
+            return self.execute_with_spinner(command)
+
+    def execute_with_spinner(self, command: str) -> CommandResult:
+        """
+        Execute a command, with a spinner showing the command while it runs. Nothing is rendered, or imported
+        for rendering, when the display isn't live.
+        :param command: the command to execute
+        :return: result of command execution
+        """
+        if not Display().live:
+            return self.executor.execute(command)
+
+        from rich.progress import Progress, TextColumn, SpinnerColumn
+
         with Progress(
             TextColumn(" "),
             SpinnerColumn(style="magenta", spinner_name="aesthetic"),
@@ -82,48 +150,42 @@ class NmapExecutor:
         Execute an arp host discovery scan using nmap
         :return: result of command execution
         """
-        command: str = (
-            self.builder.enable_service_scan()
-            .enable_exclude_ports()
-            .enable_aggressive_timing()
-            .enable_arp_ping()
-            .enable_xml_to_stdout()
-            .build()
-        )
-        return self.executor.execute(command)
+        with self.excluding() as builder:
+            command: str = (
+                builder.enable_exclude_ports()
+                .enable_timing_profile(self.discovery_profile)
+                .enable_arp_ping()
+                .enable_no_dns()
+                .enable_xml_to_stdout()
+                .build()
+            )
+            return self.executor.execute(command)
 
     def execute_arp_icmp_host_discovery(self) -> CommandResult:
         """
         Execute an arp and icmp host discovery scan using nmap
         :return: result of command execution
         """
-        command: str = (
-            self.builder.enable_exclude_ports()
-            .enable_aggressive_timing()
-            .enable_icmp_ping()
-            .enable_arp_ping()
-            .enable_xml_to_stdout()
-            .build()
-        )
-        with Progress(
-            TextColumn(" "),
-            SpinnerColumn(style="magenta", spinner_name="aesthetic"),
-            TextColumn("[progress.description]{task.description}"),
-            transient=True,
-        ) as progress:
-            progress.add_task(
-                description=TyperOutputBuilder()
-                .apply_bold_magenta(" Running: ")
-                .apply_bold_cyan(command)
-                .apply_bold_magenta(" at: ")
-                .apply_bold_cyan(datetime.datetime.now().time().strftime("%H:%M:%S"))
-                .apply_bold_magenta(" .......")
-                .build(),
-                total=None,
+        with self.excluding() as builder:
+            command: str = (
+                builder.enable_exclude_ports()
+                .enable_timing_profile(self.discovery_profile)
+                .enable_icmp_ping()
+                .enable_arp_ping()
+                .enable_no_dns()
+                .enable_xml_to_stdout()
+                .build()
             )
-            return self.executor.execute(command)
+            return self.execute_with_spinner(command)
 
-    def execute_general_port_scan(self, ips: list[str], events: ExecutorCallbackEvents) -> list[CommandResult]:
+    def execute_general_port_scan(
+        self,
+        ips: list[str],
+        events: ExecutorCallbackEvents,
+        fingerprinted: set[str] | None = None,
+        exclude_ports: str | None = None,
+        os_detection: bool = True,
+    ) -> list[CommandResult]:
         """
         Executes a general port scan on a list of provided IP addresses.
 
@@ -139,18 +201,27 @@ class NmapExecutor:
         :type ips: list[str]
         :param events: Callback events for the execution process.
         :type events: ExecutorCallbackEvents
+        :param fingerprinted: IP addresses whose OS and services are already known, scanned without OS detection
+            and with lighter version detection.
+        :type fingerprinted: set[str] | None
+        :param exclude_ports: Ports already scanned, left out of the scan.
+        :type exclude_ports: str | None
+        :param os_detection: Whether to detect the OS, which can be skipped when it was already detected.
+        :type os_detection: bool
         :return: A list of `CommandResult` objects containing the results of the scan.
         :rtype: list[CommandResult]
         """
         Logger().debug(f"Executing general port scan on {ips}")
+        profile: TimingProfile = self.port_scan_profile("general")
         commands: list[str] = list(
             map(
-                lambda ip: NmapCommandBuilder(ip, self.cidr)
+                lambda ip: NmapCommandBuilder(ip, self.cidr, nmap=self.nmap)
+                .enable_privileged(self.raw_packets)
                 .enable_flag(AvailableNmapFlags.COMMON_PORTS)
-                .enable_service_scan()
-                .enable_aggressive_timing()
+                .enable_fingerprinting(ip not in (fingerprinted or set()), os_detection)
+                .set_excluded_ports(exclude_ports)
+                .enable_timing_profile(profile)
                 .enable_skip_host_discovery()
-                .enable_os_detection()
                 .enable_xml_to_stdout()
                 .build_without_cidr(),
                 ips,
@@ -159,22 +230,35 @@ class NmapExecutor:
 
         return self.executor.async_pooled_execute(commands, events)
 
-    def execute_extended_port_scan(self, ips: list[str], events: ExecutorCallbackEvents) -> list[CommandResult]:
+    def execute_extended_port_scan(
+        self,
+        ips: list[str],
+        events: ExecutorCallbackEvents,
+        fingerprinted: set[str] | None = None,
+        exclude_ports: str | None = None,
+        os_detection: bool = True,
+    ) -> list[CommandResult]:
         """
         Executes an enhanced port scan on a list of provided IP addresses.
         :param ips:
         :param events:
+        :param fingerprinted: ip addresses whose OS and services are already known, scanned without OS detection
+            and with lighter version detection
+        :param exclude_ports: ports already scanned, left out of the scan
+        :param os_detection: whether to detect the OS, which can be skipped when it was already detected
         :return:
         """
         Logger().debug(f"Executing general port scan on {ips}")
 
+        profile: TimingProfile = self.port_scan_profile("extended")
         commands: list[str] = list(
             map(
-                lambda ip: NmapCommandBuilder(ip, self.cidr)
-                .enable_service_scan()
-                .enable_aggressive_timing()
+                lambda ip: NmapCommandBuilder(ip, self.cidr, nmap=self.nmap)
+                .enable_privileged(self.raw_packets)
+                .enable_fingerprinting(ip not in (fingerprinted or set()), os_detection)
+                .set_excluded_ports(exclude_ports)
+                .enable_timing_profile(profile)
                 .enable_skip_host_discovery()
-                .enable_os_detection()
                 .enable_xml_to_stdout()
                 .build_without_cidr(),
                 ips,
@@ -183,23 +267,36 @@ class NmapExecutor:
 
         return self.executor.async_pooled_execute(commands, events)
 
-    def execute_full_port_scan(self, ips: list[str], events: ExecutorCallbackEvents) -> list[CommandResult]:
+    def execute_full_port_scan(
+        self,
+        ips: list[str],
+        events: ExecutorCallbackEvents,
+        fingerprinted: set[str] | None = None,
+        exclude_ports: str | None = None,
+        os_detection: bool = True,
+    ) -> list[CommandResult]:
         """
         Executes a full port scan on a list of provided IP addresses.
         :param ips:
         :param events:
+        :param fingerprinted: ip addresses whose OS and services are already known, scanned without OS detection
+            and with lighter version detection
+        :param exclude_ports: ports already scanned, left out of the scan
+        :param os_detection: whether to detect the OS, which can be skipped when it was already detected
         :return:
         """
         Logger().debug(f"Executing full port scan on {ips}")
 
+        profile: TimingProfile = self.port_scan_profile("full")
         commands: list[str] = list(
             map(
-                lambda ip: NmapCommandBuilder(ip, self.cidr)
-                .enable_service_scan()
+                lambda ip: NmapCommandBuilder(ip, self.cidr, nmap=self.nmap)
+                .enable_privileged(self.raw_packets)
+                .enable_fingerprinting(ip not in (fingerprinted or set()), os_detection)
+                .set_excluded_ports(exclude_ports)
                 .enable_full_port_scan()
-                .enable_aggressive_timing()
+                .enable_timing_profile(profile)
                 .enable_skip_host_discovery()
-                .enable_os_detection()
                 .enable_xml_to_stdout()
                 .build_without_cidr(),
                 ips,
@@ -207,3 +304,14 @@ class NmapExecutor:
         )
 
         return self.executor.async_pooled_execute(commands, events)
+
+
+def excluded_within(exclusions: ExclusionIndex, network: IPNetwork | None) -> list[str]:
+    """
+    The exclusions to pass to nmap for a scan, only those inside the network scanned
+    :param exclusions: every address excluded
+    :param network: the network scanned, None when scanning a hostname, which could be anywhere
+    :return: the excluded networks, e.g. ["192.168.1.7/32", "192.168.1.64/27"]
+    """
+    excluded: Iterator[IPNetwork] = iter(exclusions) if network is None else exclusions.within(network)
+    return [str(excluded_network) for excluded_network in excluded]
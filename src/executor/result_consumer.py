@@ -0,0 +1,101 @@
+from __future__ import annotations
+
+import queue
+import threading
+import time
+from dataclasses import dataclass
+from typing import Callable
+
+from src.data.command_result import CommandResult
+from src.util.logger import Logger
+
+
+@dataclass
+class ConsumerMetrics:
+    """
+    Metrics for the `ResultConsumer`, times are in seconds
+    """
+
+    submitted: int = 0
+    handled: int = 0
+    failed: int = 0
+    max_queue_depth: int = 0
+    # Time spent in `submit`, i.e. how long a worker thread is held up by a result
+    total_submit_time: float = 0.0
+    total_handle_time: float = 0.0
+
+    @property
+    def mean_submit_time(self) -> float:
+        return self.total_submit_time / self.submitted if self.submitted else 0.0
+
+
+_STOP = object()
+
+
+class ResultConsumer:
+    """
+    Handles the results of commands run on a thread pool from a single thread. Workers only `submit` the
+    `CommandResult` and go straight back to running commands, while the consumer parses, renders and saves
+    the results one at a time, in the order they finished. As the only thread doing this, it never fights
+    the workers for the console. `close` handles everything still queued before returning.
+    """
+
+    def __init__(self, handler: Callable[[CommandResult], None]) -> None:
+        """
+        :param handler: called with each result on the consumer thread
+        """
+        self.handler = handler
+        self.metrics = ConsumerMetrics()
+        self._queue: queue.SimpleQueue = queue.SimpleQueue()
+        self._thread: threading.Thread | None = None
+        self._metrics_lock = threading.Lock()
+
+    def start(self) -> ResultConsumer:
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="result-consumer", daemon=True)
+            self._thread.start()
+        return self
+
+    def submit(self, command_result: CommandResult) -> None:
+        """
+        Queue a result to be handled on the consumer thread, never blocks
+        :param command_result: the result of a command
+        :return: nothing
+        """
+        started: float = time.perf_counter()
+        self._queue.put(command_result)
+        depth: int = self._queue.qsize()
+        with self._metrics_lock:
+            self.metrics.submitted += 1
+            self.metrics.max_queue_depth = max(self.metrics.max_queue_depth, depth)
+            self.metrics.total_submit_time += time.perf_counter() - started
+
+    def close(self) -> ConsumerMetrics:
+        """
+        Handle every result that is queued and stop the consumer thread
+        :return: the final metrics of the consumer
+        """
+        if self._thread is not None:
+            self._queue.put(_STOP)
+            self._thread.join()
+            self._thread = None
+        Logger().debug(f"Result consumer closed with metrics: {self.metrics}")
+        return self.metrics
+
+    def __enter__(self) -> ResultConsumer:
+        return self.start()
+
+    def __exit__(self, *_) -> None:
+        self.close()
+
+    def _run(self) -> None:
+        while (command_result := self._queue.get()) is not _STOP:
+            started: float = time.perf_counter()
+            try:
+                self.handler(command_result)
+                self.metrics.handled += 1
+            except Exception as e:  # pylint: disable=broad-exception-caught
+                # One bad result shouldn't stop the results after it from being shown
+                self.metrics.failed += 1
+                Logger().debug(f"Failed to handle result of: {command_result.command}, error: {e}")
+            self.metrics.total_handle_time += time.perf_counter() - started
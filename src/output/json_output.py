@@ -0,0 +1,209 @@
+from __future__ import annotations
+
+import json
+import sys
+import threading
+from enum import Enum
+from typing import Any, TYPE_CHECKING
+
+from src.data.nmapdevice import NmapDevice, OperatingSystem, Port
+from src.util.device_diff import DeviceDiff
+from src.util.mac_vendors import MacVendors
+
+if TYPE_CHECKING:
+    from src.util.nmap_capabilities import NmapCapabilities
+    from src.util.phase_timings import PhaseTimings
+
+
+class OutputFormat(str, Enum):
+    """
+    Formats the results can be output in
+    """
+
+    TEXT = "text"
+
+    JSON = "json"  # a single json array once everything has finished
+
+    JSONL = "jsonl"  # a json object per line, written as soon as each result is known
+
+
+class JsonOutput:
+    """
+    Singleton class for writing results as json to stdout, for other programs to consume
+    """
+
+    _instance = None
+    _format = OutputFormat.TEXT
+    _lock = threading.Lock()
+    _pending: list[dict[str, Any]] = []
+
+    def __new__(cls, *args, **kwargs):
+        if not cls._instance:
+            cls._instance = super(JsonOutput, cls).__new__(cls, *args, **kwargs)
+        return cls._instance
+
+    def set_format(self, output_format: OutputFormat) -> None:
+        JsonOutput._format = output_format
+
+    @property
+    def enabled(self) -> bool:
+        return self._format != OutputFormat.TEXT
+
+    def emit(self, record: dict[str, Any]) -> None:
+        """
+        Output a record, written straight away as a line of jsonl or held until `finish` for json
+        :param record: the record to output
+        :return: nothing, only outputs
+        """
+        with self._lock:
+            if self._format == OutputFormat.JSONL:
+                sys.stdout.write(json.dumps(record, ensure_ascii=False) + "\n")
+                sys.stdout.flush()
+            else:
+                self._pending.append(record)
+
+    def finish(self) -> None:
+        """
+        Write out the records held for json output
+        :return: nothing, only outputs
+        """
+        with self._lock:
+            if self._format == OutputFormat.JSON:
+                sys.stdout.write(json.dumps(self._pending, ensure_ascii=False) + "\n")
+                sys.stdout.flush()
+            self._pending.clear()
+
+
+def output_devices(devices: list[NmapDevice], hosts_up: int, total_hosts: int | str) -> None:
+    """
+    Output the devices found by host discovery as json, a record per host followed by a summary
+    :param devices: the devices found
+    :param hosts_up: number of hosts nmap found up
+    :param total_hosts: number of hosts nmap scanned
+    :return: nothing, only outputs
+    """
+    for device in devices:
+        JsonOutput().emit(device_to_record(device, "host"))
+    JsonOutput().emit({"type": "summary", "hosts_up": int(hosts_up), "total_hosts": int(total_hosts)})
+
+
+def output_port_scan(device: NmapDevice) -> None:
+    """
+    Output the result of the port scan of a single device as json
+    :param device: the device from the port scan
+    :return: nothing, only outputs
+    """
+    JsonOutput().emit(device_to_record(device, "port_scan"))
+
+
+def output_hostname(device: NmapDevice) -> None:
+    """
+    Output a hostname that was resolved after the devices were output as json
+    :param device: the device, with its hostname filled in
+    :return: nothing, only outputs
+    """
+    JsonOutput().emit({"type": "hostname", "ip_addr": device.ip_addr, "hostname": device.hostname})
+
+
+def output_phase_timings(timings: PhaseTimings) -> None:
+    """
+    Output how long each phase of the scan took as json
+    :param timings: the timings of the phases
+    :return: nothing, only outputs
+    """
+    JsonOutput().emit(
+        {
+            "type": "timings",
+            "phases": dict(timings.phases),
+            "total": timings.total,
+            **({"details": dict(timings.details)} if timings.details else {}),
+        }
+    )
+
+
+def output_diff(device_diff: DeviceDiff) -> None:
+    """
+    Output what changed since the previous scan as json, a record per change
+    :param device_diff: the changes since the previous scan
+    :return: nothing, only outputs
+    """
+    for device in device_diff.arrived:
+        JsonOutput().emit(device_to_record(device, "arrived"))
+    for device in device_diff.departed:
+        JsonOutput().emit(device_to_record(device, "departed"))
+    for change in device_diff.ip_changed:
+        JsonOutput().emit(device_to_record(change.device, "ip_changed") | {"previous_ip_addr": change.previous_ip_addr})
+    for change in device_diff.ports_changed:
+        JsonOutput().emit(
+            {
+                "type": "ports_changed",
+                "ip_addr": change.device.ip_addr,
+                "opened": [port_to_record(port) for port in change.opened],
+                "closed": [port_to_record(port) for port in change.closed],
+            }
+        )
+
+
+def output_nmap_capabilities(capabilities: NmapCapabilities, privileged: bool) -> None:
+    """
+    Output the nmap version and capabilities found by the capability probe as json
+    :param capabilities: what the installed nmap can do
+    :param privileged: whether running as root
+    :return: nothing, only outputs
+    """
+    JsonOutput().emit(
+        {
+            "type": "check",
+            "nmap_version": capabilities.version,
+            "nmap_path": capabilities.path,
+            "features": capabilities.features,
+            "raw_packets": capabilities.installed and (privileged or capabilities.cap_net_raw),
+        }
+    )
+
+
+def device_to_record(device: NmapDevice, record_type: str) -> dict[str, Any]:
+    """
+    Convert a device to a json serializable record, without going through the rich formatted messages
+    :param device: the device to convert
+    :param record_type: what produced the record, e.g. host or port_scan
+    :return: the record
+    """
+    mac_addr, vendor = split_mac_and_vendor(device.mac_addr)
+    return {
+        "type": record_type,
+        "ip_addr": device.ip_addr,
+        "mac_addr": mac_addr,
+        # MAC addresses that didn't come from nmap, e.g. from the db, have no vendor attached
+        "vendor": vendor or MacVendors().lookup(mac_addr),
+        "hostname": device.hostname,
+        "os": os_to_record(device.os),
+        "ports": [port_to_record(port) for port in device.ports] if isinstance(device.ports, list) else None,
+    }
+
+
+def os_to_record(operating_system: OperatingSystem | None) -> dict[str, str] | None:
+    if operating_system is None:
+        return None
+    return {"name": operating_system.name, "vendor": operating_system.vendor, "family": operating_system.family}
+
+
+def port_to_record(port: Port) -> dict[str, Any]:
+    return {
+        "id": port.id,
+        "protocol": port.protocol,
+        "service": {"name": port.service.name, "product": port.service.product, "os_type": port.service.os_type},
+    }
+
+
+def split_mac_and_vendor(mac_addr: str | None) -> tuple[str | None, str | None]:
+    """
+    Split the "MAC | Vendor" string found on a device
+    :param mac_addr: the mac address string of the device
+    :return: the MAC address and the vendor, either can be None
+    """
+    if mac_addr is None:
+        return None, None
+    mac, _, vendor = mac_addr.partition(" | ")
+    vendor = vendor.strip()
+    return mac.strip(), vendor if vendor and vendor != "(Unknown Vendor)" else None
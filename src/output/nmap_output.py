@@ -1,26 +1,227 @@
-import re
+from typing import Any
 
 from rich import print as rprint
 
-from src.data.command_result import CommandResult
 from src.data.nmapdevice import NmapDevice, Port
 from src.data.scan_result import ScanResult
-from src.output.typer_output_builder import TyperOutputBuilder
+from src.output.typer_output_builder import OutputTemplate, Slot, TyperOutputBuilder
+from src.util.device_diff import DeviceDiff
 from src.util.logger import Logger
+from src.util.nmap_capabilities import NmapCapabilities
+from src.util.phase_timings import PhaseTimings
 
 
-def format_and_output_from_check(command_result: CommandResult) -> None:
+def ip_message_builder(ip_addr: Any) -> TyperOutputBuilder:
     """
-    Check nmap version, and if its person return a
-    :param command_result: result of command execution
+    Build the part of a device line with the ip address
+    :param ip_addr: the padded ip address, or a slot for it
+    :return: the builder of the message
+    """
+    return (
+        TyperOutputBuilder()
+        .apply_bold_magenta()
+        .add_square()
+        .clear_formatting()
+        .apply_bold_magenta(message=" Found ip address: ")
+        .apply_bold_cyan()
+        .add(ip_addr)
+        .add(" ")
+    )
+
+
+def mac_addr_message_builder(mac_addr: Any) -> TyperOutputBuilder:
+    """
+    Build the part of a device line with the mac address
+    :param mac_addr: the padded mac address, or a slot for it
+    :return: the builder of the message
+    """
+    return TyperOutputBuilder().apply_bold_magenta(message="and mac address: ").apply_bold_cyan().add(mac_addr).add(" ")
+
+
+def hostname_message_builder(hostname: Any) -> TyperOutputBuilder:
+    """
+    Build the part of a device line with the hostname
+    :param hostname: the hostname, or a slot for it
+    :return: the builder of the message
+    """
+    return TyperOutputBuilder().apply_bold_magenta(message="for hostname: ").apply_bold_cyan().add(hostname)
+
+
+# Messages written for every device or port are compiled once, and only have their slots filled in per message
+IP_TEMPLATE: OutputTemplate = ip_message_builder(Slot("ip_addr")).compile()
+MAC_ADDR_TEMPLATE: OutputTemplate = mac_addr_message_builder(Slot("mac_addr", "<{width}")).compile()
+HOSTNAME_TEMPLATE: OutputTemplate = hostname_message_builder(Slot("hostname")).compile()
+DEVICE_LINE_TEMPLATE: OutputTemplate = IP_TEMPLATE + MAC_ADDR_TEMPLATE + HOSTNAME_TEMPLATE
+DEVICE_LINE_WITHOUT_MAC_TEMPLATE: OutputTemplate = IP_TEMPLATE + HOSTNAME_TEMPLATE
+PORT_INFO_TEMPLATE: OutputTemplate = (
+    TyperOutputBuilder()
+    .add("  ")
+    .apply_bold_cyan()
+    .add_square()
+    .add(" ")
+    .clear_formatting()
+    .apply_bold_cyan()
+    .add_slot("port", "<10")
+    .compile()
+)
+OS_INFO_TEMPLATE: OutputTemplate = (
+    TyperOutputBuilder()
+    .add("  ")
+    .apply_bold_red()
+    .add_square()
+    .add(" ")
+    .clear_formatting()
+    .apply_bold_red()
+    .add_slot("name")
+    .add(" | ")
+    .add_slot("vendor")
+    .add(" | ")
+    .add_slot("family")
+    .add(" ")
+    .compile()
+)
+PORT_SUMMARY_TEMPLATE: OutputTemplate = (
+    TyperOutputBuilder()
+    .add("\n")
+    .apply_bold_magenta()
+    .add_square()
+    .add(" Found the following information about:")
+    .clear_formatting()
+    .apply_bold_cyan()
+    .add(" ")
+    .add_slot("ip_addr")
+    .add(" (")
+    .add_slot("hostname")
+    .add(")")
+    .compile()
+)
+ARRIVED_TEMPLATE: OutputTemplate = (
+    TyperOutputBuilder().apply_bold_green(" [+] Arrived: ").apply_bold_cyan().add_slot("device").compile()
+)
+DEPARTED_TEMPLATE: OutputTemplate = (
+    TyperOutputBuilder().apply_bold_red(" [-] Left: ").apply_bold_cyan().add_slot("device").compile()
+)
+IP_CHANGED_TEMPLATE: OutputTemplate = (
+    TyperOutputBuilder()
+    .apply_bold_magenta(" [~] Changed ip address: ")
+    .apply_bold_cyan()
+    .add_slot("previous_ip_addr")
+    .add(" -> ")
+    .add_slot("device")
+    .compile()
+)
+PORTS_OPENED_TEMPLATE: OutputTemplate = (
+    TyperOutputBuilder()
+    .apply_bold_green()
+    .add(" [+] Opened ports on ")
+    .add_slot("ip_addr")
+    .add(": ")
+    .clear_formatting()
+    .apply_bold_cyan()
+    .add_slot("ports")
+    .compile()
+)
+PORTS_CLOSED_TEMPLATE: OutputTemplate = (
+    TyperOutputBuilder()
+    .apply_bold_red()
+    .add(" [-] Closed ports on ")
+    .add_slot("ip_addr")
+    .add(": ")
+    .clear_formatting()
+    .apply_bold_cyan()
+    .add_slot("ports")
+    .compile()
+)
+HOSTNAME_RESOLVED_TEMPLATE: OutputTemplate = (
+    TyperOutputBuilder()
+    .apply_bold_magenta(" [+] Resolved hostname of ")
+    .apply_bold_cyan()
+    .add_slot("ip_addr")
+    .apply_bold_magenta(": ")
+    .apply_bold_cyan()
+    .add_slot("hostname")
+    .compile()
+)
+PHASE_TIMING_TEMPLATE: OutputTemplate = (
+    TyperOutputBuilder()
+    .apply_bold_magenta()
+    .add_slot("phase")
+    .add(": ")
+    .apply_bold_cyan()
+    .add_slot("seconds", ".2f")
+    .add("s")
+    .compile()
+)
+PHASE_DETAIL_TEMPLATE: OutputTemplate = (
+    TyperOutputBuilder().apply_bold_magenta().add_slot("name").add(": ").apply_bold_cyan().add_slot("detail").compile()
+)
+UNIQUE_DEVICES_TEMPLATE: OutputTemplate = (
+    TyperOutputBuilder()
+    .add_check_mark()
+    .apply_bold_magenta(message="Scan suggests that you have: ")
+    .apply_bold_cyan()
+    .add_slot("unique_devices")
+    .clear_formatting()
+    .apply_bold_magenta(message=" unique devices on the network. ")
+    .compile()
+)
+HOST_TOTALS_TEMPLATE: OutputTemplate = (
+    TyperOutputBuilder()
+    .add_check_mark()
+    .apply_bold_magenta(message="It also found ")
+    .apply_bold_cyan()
+    .add_slot("hosts_up")
+    .clear_formatting()
+    .apply_bold_magenta(message=" hosts up after scanning a total of ")
+    .apply_bold_cyan()
+    .add_slot("total_hosts")
+    .clear_formatting()
+    .apply_bold_magenta(message=" hosts")
+    .compile()
+)
+RESULT_SUMMARY_MESSAGE: str = (
+    TyperOutputBuilder().add_satellite().apply_bold_magenta(message=" Hosts found on your network: ").build()
+)
+POST_SCAN_MESSAGE: str = TyperOutputBuilder().apply_bold_magenta(message=" [~] Scan complete!").build()
+
+
+def format_and_output_capabilities(capabilities: NmapCapabilities, privileged: bool) -> None:
+    """
+    Output the nmap version found by the capability probe, and whether scans can send raw packets
+    :param capabilities: what the installed nmap can do
+    :param privileged: whether running as root
     :return: nothing just output message containing nmap version
     """
-    Logger().debug("Checking for valid nmap installation.... ")
-    nmap_version_pattern: str = r"Nmap version \d+\.\d+"
-    version_found: re.Match[str] = re.search(nmap_version_pattern, command_result.stdout)
+    format_and_output_nmap_version(capabilities.version)
+    if not capabilities.installed:
+        return
+    if privileged or capabilities.cap_net_raw:
+        rprint(
+            TyperOutputBuilder()
+            .add_check_mark()
+            .apply_bold_magenta(" Raw packets available through: ")
+            .apply_bold_cyan("root" if privileged else "CAP_NET_RAW")
+            .apply_bold_magenta(", using ICMP and ARP host discovery")
+            .build()
+            + "\n"
+        )
+    else:
+        rprint(
+            TyperOutputBuilder()
+            .add_exclamation_mark()
+            .apply_bold_red(" Raw packets unavailable, using an unprivileged ICMP ping sweep for host discovery")
+            .build()
+            + "\n"
+        )
+
 
-    if version_found:
-        version = version_found.group().replace("Nmap version", "").strip()
+def format_and_output_nmap_version(version: str | None) -> None:
+    """
+    Output the nmap version, or an error if no valid nmap installation was found
+    :param version: the nmap version, None if it could not be found
+    :return: nothing just output message containing nmap version
+    """
+    if version:
         output_message: str = (
             TyperOutputBuilder()
             .add_check_mark()
@@ -47,11 +248,12 @@ def format_and_output(scan_result: ScanResult, devices: list[NmapDevice]) -> Non
     :return: nothing, will just print
     """
     Logger().debug("Looping through devices to output.... ")
-    rprint(get_result_summary_message())
-    for device in devices:
-        rprint(get_ip_and_mac_message(device, devices))
+    # Written to the console in one go, rather than a print per device
     rprint(
-        "\n"
+        get_result_summary_message()
+        + "\n"
+        + render_device_table(devices)
+        + "\n"
         + get_unique_devices_message(devices)
         + "\n"
         + get_host_totals_message(scan_result)
@@ -66,8 +268,16 @@ def format_and_output_from_port_scan(scan_result: ScanResult) -> None:
     :param scan_result: result from the scan
     :return: nothing only outputs to the user
     """
+    format_and_output_port_scan_device(scan_result.get_device())
+
+
+def format_and_output_port_scan_device(device_from_port_scan: NmapDevice) -> None:
+    """
+    Format and output the ports and any OS information found by the port scan of a device
+    :param device_from_port_scan: the device from the port scan
+    :return: nothing only outputs to the user
+    """
     Logger().debug("Outputting port scan results.... ")
-    device_from_port_scan: NmapDevice = scan_result.get_device()
     if (
         isinstance(device_from_port_scan.ports, list)
         and device_from_port_scan.ports
@@ -80,24 +290,80 @@ def format_and_output_from_port_scan(scan_result: ScanResult) -> None:
             rprint("\n".join(build_port_info_message(port) for port in device_from_port_scan.ports))
 
 
+def format_and_output_hostname(device: NmapDevice) -> None:
+    """
+    Output a hostname that was resolved after the devices were output
+    :param device: the device, with its hostname filled in
+    :return: nothing only outputs to the user
+    """
+    rprint(HOSTNAME_RESOLVED_TEMPLATE.render(ip_addr=device.ip_addr, hostname=device.hostname))
+
+
+def format_and_output_phase_timings(timings: PhaseTimings) -> None:
+    """
+    Output how long each phase of the scan took
+    :param timings: the timings of the phases
+    :return: nothing only outputs to the user
+    """
+    phases: list[str] = [
+        PHASE_TIMING_TEMPLATE.render(phase=phase, seconds=seconds) for phase, seconds in timings.phases.items()
+    ]
+    phases.append(PHASE_TIMING_TEMPLATE.render(phase="total", seconds=timings.total))
+    phases.extend(PHASE_DETAIL_TEMPLATE.render(name=name, detail=detail) for name, detail in timings.details.items())
+    rprint(TyperOutputBuilder().apply_bold_magenta(" [~] Timings: ").build() + " | ".join(phases))
+
+
+def format_and_output_diff(device_diff: DeviceDiff) -> None:
+    """
+    Output only what changed since the previous scan, instead of every device
+    :param device_diff: the changes since the previous scan
+    :return: nothing, only outputs to the user
+    """
+    Logger().debug(f"Outputting changes since the previous scan: {device_diff}")
+    messages: list[str] = build_diff_messages(device_diff)
+    if messages:
+        rprint("\n".join(messages))
+
+
+def build_diff_messages(device_diff: DeviceDiff) -> list[str]:
+    """
+    Build a message for each change since the previous scan
+    :param device_diff: the changes since the previous scan
+    :return: the messages to be printed, arrivals first
+    """
+    messages: list[str] = [ARRIVED_TEMPLATE.render(device=describe_device(device)) for device in device_diff.arrived]
+    messages.extend(DEPARTED_TEMPLATE.render(device=describe_device(device)) for device in device_diff.departed)
+    messages.extend(
+        IP_CHANGED_TEMPLATE.render(previous_ip_addr=change.previous_ip_addr, device=describe_device(change.device))
+        for change in device_diff.ip_changed
+    )
+    for change in device_diff.ports_changed:
+        if change.opened:
+            messages.append(
+                PORTS_OPENED_TEMPLATE.render(ip_addr=change.device.ip_addr, ports=describe_ports(change.opened))
+            )
+        if change.closed:
+            messages.append(
+                PORTS_CLOSED_TEMPLATE.render(ip_addr=change.device.ip_addr, ports=describe_ports(change.closed))
+            )
+    return messages
+
+
+def describe_device(device: NmapDevice) -> str:
+    return f"{device.ip_addr} | {device.mac_addr or "(Unknown MAC)"} | {check_hostname_is_none(device.hostname)}"
+
+
+def describe_ports(ports: list[Port]) -> str:
+    return ", ".join(f"{port.id}/{port.protocol} {port.service.name}" for port in ports)
+
+
 def build_port_info_message(port: Port) -> str:
     """
     Build the port info message to be printed to the user
     :param port: port to get the info from
     :return: str message to be printed to the user
     """
-    return (
-        TyperOutputBuilder()
-        .add("  ")
-        .apply_bold_cyan()
-        .add_square()
-        .add(" ")
-        .clear_formatting()
-        .apply_bold_cyan(
-            message="{:<10}".format(f"{port.id}/{port.protocol} {port.service.name} {port.service.product}")
-        )
-        .build()
-    )
+    return PORT_INFO_TEMPLATE.render(port=f"{port.id}/{port.protocol} {port.service.name} {port.service.product}")
 
 
 def build_os_info_message(device_from_port_scan: NmapDevice) -> str:
@@ -106,19 +372,9 @@ def build_os_info_message(device_from_port_scan: NmapDevice) -> str:
     :param device_from_port_scan: device to get the os info from
     :return: str message to be printed to the user
     """
-    return (
-        TyperOutputBuilder()
-        .add("  ")
-        .apply_bold_red()
-        .add_square()
-        .add(" ")
-        .clear_formatting()
-        .apply_bold_red(
-            message=f"{device_from_port_scan.os.name} | "
-            f"{device_from_port_scan.os.vendor} | "
-            f"{device_from_port_scan.os.family} "
-        )
-        .build()
+    operating_system = device_from_port_scan.os
+    return OS_INFO_TEMPLATE.render(
+        name=operating_system.name, vendor=operating_system.vendor, family=operating_system.family
     )
 
 
@@ -136,17 +392,8 @@ def contains_os_info(device_from_port_scan: NmapDevice) -> bool:
 
 
 def build_port_summary_message(device_from_port_scan):
-    return (
-        TyperOutputBuilder()
-        .add("\n")
-        .apply_bold_magenta()
-        .add_square()
-        .add(" Found the following information about:")
-        .clear_formatting()
-        .apply_bold_cyan(
-            message=f" {device_from_port_scan.ip_addr} ({check_hostname_is_none(device_from_port_scan.hostname)})"
-        )
-        .build()
+    return PORT_SUMMARY_TEMPLATE.render(
+        ip_addr=device_from_port_scan.ip_addr, hostname=check_hostname_is_none(device_from_port_scan.hostname)
     )
 
 
@@ -155,7 +402,7 @@ def get_result_summary_message() -> str:
     Output the summary message before printing any results from the scan
     :return: nothing, only outputs to the user
     """
-    return TyperOutputBuilder().add_satellite().apply_bold_magenta(message=" Hosts found on your network: ").build()
+    return RESULT_SUMMARY_MESSAGE
 
 
 def check_hostname_is_none(hostname: str | None) -> str:
@@ -175,16 +422,18 @@ def build_ip_message(device: NmapDevice) -> str:
     :param device: found from the scan
     :return: string message to be printed to the user
     """
-    formatted_ip_addr = device.ip_addr + " " * (3 - len(device.ip_addr.split(".")[3]))
-    return (
-        TyperOutputBuilder()
-        .apply_bold_magenta()
-        .add_square()
-        .clear_formatting()
-        .apply_bold_magenta(message=" Found ip address: ")
-        .apply_bold_cyan(message=f"{formatted_ip_addr} ")
-        .build()
-    )
+    return IP_TEMPLATE.render(ip_addr=format_ip_addr(device.ip_addr))
+
+
+def format_ip_addr(ip_addr: str) -> str:
+    """
+    Pad an ip address so that the columns after it line up, to a full last octet, or a full last group of an IPv6
+    address
+    :param ip_addr: the ip address to pad
+    :return: the padded ip address
+    """
+    separator, width = (":", 4) if ":" in ip_addr else (".", 3)
+    return ip_addr + " " * max(width - len(ip_addr.rpartition(separator)[2]), 0)
 
 
 def build_post_scan_message() -> str:
@@ -192,7 +441,7 @@ def build_post_scan_message() -> str:
     Build the post-scan message to be printed to the user
     :return: str message to be printed to the user
     """
-    return TyperOutputBuilder().apply_bold_magenta(message=" [~] Scan complete!").build()
+    return POST_SCAN_MESSAGE
 
 
 def build_mac_addr_message(device: NmapDevice, max_mac_length: int) -> str | None:
@@ -203,13 +452,8 @@ def build_mac_addr_message(device: NmapDevice, max_mac_length: int) -> str | Non
     :return: string containing the mac address message
     """
     if device.mac_addr is not None:
-        formatted_mac_addr = f"{device.mac_addr:<{max_mac_length}}"  # Dynamically pad to max length
-        return (
-            TyperOutputBuilder()
-            .apply_bold_magenta(message="and mac address: ")
-            .apply_bold_cyan(message=f"{formatted_mac_addr} ")
-            .build()
-        )
+        # Dynamically pad to max length
+        return MAC_ADDR_TEMPLATE.render(mac_addr=device.mac_addr, width=max_mac_length)
     return None
 
 
@@ -222,6 +466,36 @@ def get_max_mac_length(devices: list[NmapDevice]) -> int:
     return max((len(device.mac_addr) for device in devices if device.mac_addr is not None), default=0)
 
 
+def render_device_table(devices: list[NmapDevice]) -> str:
+    """
+    Render a line for each device in a single pass, the column widths are worked out once up front
+    :param devices: devices to render
+    :return: the str message to be printed, with a line per device
+    """
+    max_mac_length: int = get_max_mac_length(devices)
+    return "".join(build_device_line(device, max_mac_length) + "\n" for device in devices)
+
+
+def build_device_line(device: NmapDevice, max_mac_length: int) -> str:
+    """
+    Build the line containing the ip address, mac address and host name of a device
+    :param device: the device to build the line for
+    :param max_mac_length: width of the mac address column
+    :return: the str message to be printed
+    """
+    # Warning: The spacing is extremely finicky. Change at your own risk.
+    if device.mac_addr is None:
+        return DEVICE_LINE_WITHOUT_MAC_TEMPLATE.render(
+            ip_addr=format_ip_addr(device.ip_addr), hostname=check_hostname_is_none(device.hostname)
+        )
+    return DEVICE_LINE_TEMPLATE.render(
+        ip_addr=format_ip_addr(device.ip_addr),
+        mac_addr=device.mac_addr,
+        width=max_mac_length,
+        hostname=check_hostname_is_none(device.hostname),
+    )
+
+
 def get_ip_and_mac_message(device: NmapDevice, devices: list[NmapDevice]) -> str:
     """
     Get the message that contains the ip address, mac address and host name
@@ -229,24 +503,7 @@ def get_ip_and_mac_message(device: NmapDevice, devices: list[NmapDevice]) -> str
     :param device: the device being iterated over
     :return: the str message to be printed
     """
-    # Warning: The spacing is extremely finicky. Change at your own risk.
-    mac_addr_message: str = build_mac_addr_message(device, get_max_mac_length(devices))
-    if mac_addr_message:
-        return (
-            TyperOutputBuilder()
-            .add(build_ip_message(device))
-            .add(mac_addr_message)
-            .apply_bold_magenta(message="for hostname: ")
-            .apply_bold_cyan(message=check_hostname_is_none(device.hostname))
-            .build()
-        )
-    return (
-        TyperOutputBuilder()
-        .add(build_ip_message(device))
-        .apply_bold_magenta(message="for hostname: ")
-        .apply_bold_cyan(message=check_hostname_is_none(device.hostname))
-        .build()
-    )
+    return build_device_line(device, get_max_mac_length(devices))
 
 
 def get_number_of_unique_devices(devices: list[NmapDevice]) -> int:
@@ -265,14 +522,7 @@ def get_unique_devices_message(devices: list[NmapDevice]) -> str:
     :param devices: list of devices to check how many are unique
     :return: the str message to be printed
     """
-    return (
-        TyperOutputBuilder()
-        .add_check_mark()
-        .apply_bold_magenta(message="Scan suggests that you have: ")
-        .apply_bold_cyan(message=get_number_of_unique_devices(devices))
-        .apply_bold_magenta(message=" unique devices on the network. ")
-        .build()
-    )
+    return UNIQUE_DEVICES_TEMPLATE.render(unique_devices=get_number_of_unique_devices(devices))
 
 
 def get_host_totals_message(scan_result: ScanResult) -> str:
@@ -283,13 +533,4 @@ def get_host_totals_message(scan_result: ScanResult) -> str:
     """
     hosts_up: int = scan_result.get_hosts_up_from_runstats()
     total_hosts_scanned: str = scan_result.get_total_hosts_from_runstats()
-    return (
-        TyperOutputBuilder()
-        .add_check_mark()
-        .apply_bold_magenta(message="It also found ")
-        .apply_bold_cyan(message=hosts_up)
-        .apply_bold_magenta(message=" hosts up after scanning a total of ")
-        .apply_bold_cyan(message=total_hosts_scanned)
-        .apply_bold_magenta(message=" hosts")
-        .build()
-    ) + "\n"
+    return HOST_TOTALS_TEMPLATE.render(hosts_up=hosts_up, total_hosts=total_hosts_scanned) + "\n"
@@ -1,9 +1,40 @@
 from __future__ import annotations
 
+from dataclasses import dataclass
 from typing import Any
 
 
-class TyperOutputBuilder:
+@dataclass(frozen=True)
+class Slot:
+    """
+    A placeholder in a message that is filled in when an `OutputTemplate` is rendered
+    """
+
+    name: str
+    # Format spec for the value, can refer to other slots, e.g. "<{width}" to pad to a width given when rendering
+    format_spec: str = ""
+
+    def __str__(self) -> str:
+        return f"{{{self.name}:{self.format_spec}}}" if self.format_spec else f"{{{self.name}}}"
+
+
+@dataclass(frozen=True)
+class OutputTemplate:
+    """
+    A message compiled once by `TyperOutputBuilder.compile`, with slots to fill in for each message rendered.
+    Rendering is a single `str.format_map`, so nothing of the builder is recreated per message.
+    """
+
+    format_string: str
+
+    def render(self, **values: Any) -> str:
+        return self.format_string.format_map(values)
+
+    def __add__(self, other: OutputTemplate) -> OutputTemplate:
+        return OutputTemplate(self.format_string + other.format_string)
+
+
+class TyperOutputBuilder:  # pylint: disable=too-many-public-methods
     class _Format:
         def __init__(self, format_str: str = "", is_exit: bool = False) -> None:
             self.format: str = format_str
@@ -92,10 +123,27 @@ class TyperOutputBuilder:
         return self
 
     def add(self, message: Any) -> TyperOutputBuilder:
-        self.__instructions.append(str(message))
+        self.__instructions.append(message if isinstance(message, Slot) else str(message))
         return self
 
+    def add_slot(self, name: str, format_spec: str = "") -> TyperOutputBuilder:
+        return self.add(Slot(name, format_spec))
+
     def build(self) -> str:
         if self.__current_formatting is not None:
             self.clear_formatting()
         return "".join(str(i) for i in self.__instructions)
+
+    def compile(self) -> OutputTemplate:
+        """
+        Compile the message into a template, any braces in the message itself are escaped so only slots are filled
+        :return: the template, rendered with a value for each slot
+        """
+        if self.__current_formatting is not None:
+            self.clear_formatting()
+        return OutputTemplate(
+            "".join(
+                str(i) if isinstance(i, Slot) else str(i).replace("{", "{{").replace("}", "}}")
+                for i in self.__instructions
+            )
+        )
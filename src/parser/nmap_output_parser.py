@@ -18,14 +18,18 @@ class NmapOutputParser:
         :param command_result:
         """
         self.command_result = command_result
+        self._parsed: OrderedDict[str, Any] | None = None
 
     def parse(self) -> OrderedDict[str, Any]:
         """
         Parse the xml output and return an OrderedDict
         :return: an ordered dict from the xml output
         """
-        xml_output: str = self.command_result.stdout
-        return xmltodict.parse(xml_output)
+        # Parsed once, every getter reads from the same parse
+        if self._parsed is None:
+            xml_output: str = self.command_result.stdout
+            self._parsed = xmltodict.parse(xml_output)
+        return self._parsed
 
     def create_scan_result(self) -> ScanResult:
         """
@@ -34,7 +38,9 @@ class NmapOutputParser:
         """
         Logger().debug("Creating scan result from xml output.... ")
         Logger().debug(f"Parsing nmap output from stdout:\n{self.parse()} ")
-        return ScanResult(run_stats=self.get_runstats(), hosts=self.get_hosts())
+        return ScanResult(
+            run_stats=self.get_runstats(), hosts=self.get_hosts(), scan_info=self.parse()["nmaprun"].get("scaninfo")
+        )
 
     def get_runstats(self) -> OrderedDict[str, Any]:
         """
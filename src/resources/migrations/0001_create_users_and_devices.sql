@@ -7,5 +7,5 @@ CREATE TABLE devices (
   id INTEGER PRIMARY KEY AUTOINCREMENT,
   device_name VARCHAR(128) NOT NULL,
   owned_by INTEGER,
-  FOREIGN KEY (owned_by) REFERENCES devices(id)
+  FOREIGN KEY (owned_by) REFERENCES users(id)
 );
@@ -0,0 +1,5 @@
+ALTER TABLE devices ADD COLUMN mac_addr VARCHAR(17);
+ALTER TABLE devices ADD COLUMN ip_addr VARCHAR(45);
+ALTER TABLE devices ADD COLUMN hostname VARCHAR(255);
+
+CREATE INDEX idx_devices_mac_addr ON devices (mac_addr);
@@ -0,0 +1,12 @@
+CREATE TABLE observations (
+  id INTEGER PRIMARY KEY AUTOINCREMENT,
+  device_id INTEGER,
+  mac_addr VARCHAR(17),
+  ip_addr VARCHAR(45) NOT NULL,
+  hostname VARCHAR(255),
+  observed_at INTEGER NOT NULL,
+  FOREIGN KEY (device_id) REFERENCES devices(id)
+);
+
+CREATE INDEX idx_observations_observed_at ON observations (observed_at);
+CREATE INDEX idx_observations_device_id ON observations (device_id, observed_at);
@@ -0,0 +1,15 @@
+CREATE TABLE presence_intervals (
+  id INTEGER PRIMARY KEY AUTOINCREMENT,
+  device_key VARCHAR(255) NOT NULL,
+  device_id INTEGER,
+  ip_addr VARCHAR(45) NOT NULL,
+  hostname VARCHAR(255),
+  arrived_at INTEGER NOT NULL,
+  left_at INTEGER NOT NULL,
+  observation_count INTEGER NOT NULL,
+  FOREIGN KEY (device_id) REFERENCES devices(id)
+);
+
+CREATE INDEX idx_presence_intervals_device_key ON presence_intervals (device_key, left_at);
+CREATE INDEX idx_presence_intervals_device_id ON presence_intervals (device_id, left_at);
+CREATE INDEX idx_presence_intervals_left_at ON presence_intervals (left_at);
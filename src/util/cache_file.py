@@ -0,0 +1,41 @@
+from __future__ import annotations
+
+import json
+import os
+import tempfile
+from pathlib import Path
+
+
+def cache_dir() -> Path:
+    """
+    Find the directory the caches are kept in, under $XDG_CACHE_HOME or ~/.cache
+    :return: the directory, which might not exist yet
+    """
+    return Path(os.environ.get("XDG_CACHE_HOME") or Path.home() / ".cache") / "whos_home"
+
+
+def write_json_atomically(path: Path, data: object) -> None:
+    """
+    Write a cache as json to a temporary file of its own next to it, then rename that over the cache. A run
+    reading the cache never sees half of it, and runs writing it at once, e.g. a scheduled and a manual run,
+    never write the same temporary file, the last one to finish replaces the cache.
+    :param path: the cache
+    :param data: what to write, anything json can encode
+    :return: None
+    :raises OSError: when the cache can't be written
+    """
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with tempfile.NamedTemporaryFile(
+        "w", encoding="UTF-8", dir=path.parent, prefix=f".{path.name}.", suffix=".tmp", delete=False
+    ) as temporary:
+        try:
+            json.dump(data, temporary)
+        except BaseException:
+            temporary.close()
+            os.unlink(temporary.name)
+            raise
+    try:
+        os.replace(temporary.name, path)
+    except OSError:
+        os.unlink(temporary.name)
+        raise
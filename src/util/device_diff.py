@@ -0,0 +1,153 @@
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+
+from src.data.nmapdevice import NmapDevice, Port
+from src.util.mac_address import normalize_mac
+
+
+@dataclass
+class IpChange:
+    device: NmapDevice
+    previous_ip_addr: str
+
+
+@dataclass
+class PortChange:
+    device: NmapDevice
+    opened: list[Port] = field(default_factory=list)
+    closed: list[Port] = field(default_factory=list)
+
+
+@dataclass
+class DeviceDiff:
+    """
+    What changed on the network since the previous scan
+    """
+
+    # There was no previous scan to compare against, so everything is new
+    first_scan: bool = False
+    arrived: list[NmapDevice] = field(default_factory=list)
+    departed: list[NmapDevice] = field(default_factory=list)
+    ip_changed: list[IpChange] = field(default_factory=list)
+    ports_changed: list[PortChange] = field(default_factory=list)
+
+    @property
+    def has_changes(self) -> bool:
+        return bool(self.arrived or self.departed or self.ip_changed or self.ports_changed)
+
+
+PortKey = tuple[str, str]
+
+
+class DeviceDiffer:
+    """
+    Singleton class that remembers the devices found by the previous scan, so each scheduled scan can be
+    compared against the one before it. Devices are keyed by MAC address, or by ip address when no MAC
+    address was found, and each has a fingerprint of its ip address and open ports. Only devices whose
+    fingerprint changed are compared in detail, so a diff is linear in the number of devices.
+    """
+
+    _instance = None
+    _initialized = False
+
+    def __new__(cls, *args, **kwargs):
+        if cls._instance is None:
+            cls._instance = super(DeviceDiffer, cls).__new__(cls, *args, **kwargs)
+        return cls._instance
+
+    def __init__(self) -> None:
+        if DeviceDiffer._initialized:
+            return
+        DeviceDiffer._initialized = True
+        # Previous discovery per scope, e.g. per host/cidr scanned, keyed by device
+        self._hosts: dict[str, dict[str, tuple[int, NmapDevice]]] = {}
+        # Previous port scan per ip address
+        self._ports: dict[str, tuple[int, dict[PortKey, Port]]] = {}
+
+    def diff(self, devices: list[NmapDevice], scope: str = "") -> DeviceDiff:
+        """
+        Compare the devices found by host discovery with the previous discovery of the same scope
+        :param devices: the devices found
+        :param scope: what was scanned, so scans of different networks are not compared with each other
+        :return: the changes, `first_scan` is set when there was nothing to compare against
+        """
+        current: dict[str, tuple[int, NmapDevice]] = {
+            device_key(device): (fingerprint(device), device) for device in devices
+        }
+        previous: dict[str, tuple[int, NmapDevice]] | None = self._hosts.get(scope)
+        self._hosts[scope] = current
+        if previous is None:
+            return DeviceDiff(first_scan=True)
+
+        device_diff = DeviceDiff()
+        for key, (current_fingerprint, device) in current.items():
+            if key not in previous:
+                device_diff.arrived.append(device)
+                continue
+            previous_fingerprint, previous_device = previous[key]
+            if current_fingerprint == previous_fingerprint:
+                continue
+            if device.ip_addr != previous_device.ip_addr:
+                device_diff.ip_changed.append(IpChange(device, previous_device.ip_addr))
+            port_change: PortChange | None = compare_ports(device, port_map(previous_device), port_map(device))
+            if port_change is not None:
+                device_diff.ports_changed.append(port_change)
+        device_diff.departed.extend(device for key, (_, device) in previous.items() if key not in current)
+        return device_diff
+
+    def diff_ports(self, device: NmapDevice) -> DeviceDiff:
+        """
+        Compare the ports found by the port scan of a device with its previous port scan. Port scans can't see
+        MAC addresses, so these are keyed by ip address.
+        :param device: the device from the port scan
+        :return: the changes, `first_scan` is set when the device has not been port scanned before
+        """
+        ports: dict[PortKey, Port] = port_map(device)
+        current_fingerprint: int = hash(frozenset(ports))
+        previous: tuple[int, dict[PortKey, Port]] | None = self._ports.get(device.ip_addr)
+        self._ports[device.ip_addr] = (current_fingerprint, ports)
+        if previous is None:
+            return DeviceDiff(first_scan=True)
+        if previous[0] == current_fingerprint:
+            return DeviceDiff()
+        port_change: PortChange | None = compare_ports(device, previous[1], ports)
+        return DeviceDiff(ports_changed=[port_change] if port_change is not None else [])
+
+    def reset(self) -> None:
+        """
+        Forget every previous scan
+        :return: nothing
+        """
+        self._hosts.clear()
+        self._ports.clear()
+
+
+def device_key(device: NmapDevice) -> str:
+    """
+    Key a device by its MAC address, which stays the same when its ip address changes
+    :param device: the device to key
+    :return: the normalized MAC address, or the ip address if there is no MAC address
+    """
+    return normalize_mac(device.mac_addr) or device.ip_addr
+
+
+def port_map(device: NmapDevice) -> dict[PortKey, Port]:
+    if not isinstance(device.ports, list):
+        return {}
+    return {(port.id, port.protocol): port for port in device.ports}
+
+
+def fingerprint(device: NmapDevice) -> int:
+    """
+    Hash everything about a device that a diff reports on, equal fingerprints mean nothing changed
+    :param device: the device
+    :return: the fingerprint
+    """
+    return hash((device.ip_addr, frozenset(port_map(device))))
+
+
+def compare_ports(device: NmapDevice, previous: dict[PortKey, Port], current: dict[PortKey, Port]) -> PortChange | None:
+    opened: list[Port] = [port for key, port in current.items() if key not in previous]
+    closed: list[Port] = [port for key, port in previous.items() if key not in current]
+    return PortChange(device, opened, closed) if opened or closed else None
@@ -0,0 +1,50 @@
+from __future__ import annotations
+
+from src.data.nmapdevice import NmapDevice
+from src.util.logger import Logger
+from src.util.mac_address import normalize_mac
+
+
+class DeviceMerger:
+    """
+    The devices already found by a run, so a device found again by a later scan of the same run, e.g. through a
+    hostname that resolves into a network already scanned, is only output, diffed and port scanned once. Devices
+    are the same when their ip addresses are, what one scan found and the other didn't, such as the MAC address
+    only seen by an ARP ping, is merged into the first. Devices with the same MAC address but different ip
+    addresses are kept apart, as a router answering ARP for the hosts behind it gives them all its MAC address.
+    """
+
+    def __init__(self) -> None:
+        self._devices: dict[str, NmapDevice] = {}
+
+    def merge(self, devices: list[NmapDevice]) -> list[NmapDevice]:
+        """
+        Merge the devices found by a scan into those found before
+        :param devices: the devices found
+        :return: the devices that weren't found before, in the order they were found
+        """
+        found: list[NmapDevice] = []
+        for device in devices:
+            previous: NmapDevice | None = self._devices.get(device.ip_addr)
+            if previous is None:
+                self._devices[device.ip_addr] = device
+                found.append(device)
+            else:
+                merge_device(previous, device)
+        return found
+
+
+def merge_device(device: NmapDevice, other: NmapDevice) -> NmapDevice:
+    """
+    Fill in what a device is missing from another scan of the same ip address
+    :param device: the device, updated in place
+    :param other: the same device from the other scan
+    :return: the device
+    """
+    if device.mac_addr and other.mac_addr and normalize_mac(device.mac_addr) != normalize_mac(other.mac_addr):
+        Logger().debug(f"{device.ip_addr} answered with {device.mac_addr} and {other.mac_addr}, keeping the first")
+    device.hostname = device.hostname or other.hostname
+    device.mac_addr = device.mac_addr or other.mac_addr
+    device.os = device.os or other.os
+    device.ports = device.ports or other.ports
+    return device
@@ -0,0 +1,62 @@
+from __future__ import annotations
+
+from rich.console import Console
+
+
+class Display:
+    """
+    Singleton class for where and how messages are displayed to the user
+    """
+
+    _instance = None
+    _machine_output = False
+    _headless = False
+    _stdout_console: Console | None = None
+    _stderr_console: Console | None = None
+
+    def __new__(cls, *args, **kwargs):
+        if not cls._instance:
+            cls._instance = super(Display, cls).__new__(cls, *args, **kwargs)
+        return cls._instance
+
+    def enable_machine_output(self) -> None:
+        """
+        Results are being written to stdout for another program to read, so messages meant for the user are
+        sent to stderr instead, and nothing is rendered live
+        """
+        Display._machine_output = True
+
+    def enable_headless(self) -> None:
+        """
+        Nobody is watching the output, e.g. when run from cron or systemd, so nothing is rendered live. Spinners
+        and the timer bar redraw on a background thread several times a second, which is wasted CPU without a TTY
+        """
+        Display._headless = True
+
+    @property
+    def machine_output(self) -> bool:
+        return self._machine_output
+
+    @property
+    def headless(self) -> bool:
+        return self._headless
+
+    @property
+    def live(self) -> bool:
+        """
+        Whether live displays such as progress spinners should be rendered
+        """
+        return not (self._machine_output or self._headless)
+
+    @property
+    def console(self) -> Console:
+        """
+        The console to print messages meant for the user to
+        """
+        if self._machine_output:
+            if Display._stderr_console is None:
+                Display._stderr_console = Console(stderr=True)
+            return Display._stderr_console
+        if Display._stdout_console is None:
+            Display._stdout_console = Console()
+        return Display._stdout_console
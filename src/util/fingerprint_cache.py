@@ -0,0 +1,147 @@
+from __future__ import annotations
+
+import json
+import time
+from dataclasses import asdict, dataclass, replace
+from pathlib import Path
+from typing import Callable
+
+from src.data.nmapdevice import NmapDevice, OperatingSystem, Port, Service
+from src.util.cache_file import cache_dir, write_json_atomically
+from src.util.device_diff import port_map
+from src.util.logger import Logger
+from src.util.mac_address import normalize_mac
+
+CACHE_PATH: Path = cache_dir() / "fingerprints.json"
+
+
+@dataclass
+class Fingerprint:
+    """
+    What OS detection and full version detection found on a device, for one type of port scan
+    """
+
+    os: OperatingSystem
+    # Services found on the open ports, keyed by port/protocol, e.g. 22/tcp
+    services: dict[str, Service]
+    scanned: float
+
+    def matches(self, device: NmapDevice) -> bool:
+        """
+        Check the open ports are still the ones the fingerprint was taken with
+        :param device: the device from a port scan
+        :return: True if the same ports are open
+        """
+        return set(self.services) == {port_key(port) for port in port_map(device).values()}
+
+
+class FingerprintCache:
+    """
+    OS and service fingerprints of devices, keyed by MAC address and the type of port scan, which decides the
+    ports scanned. -O and a full -sV are the slowest part of a port scan, but rarely find anything new, so a
+    device with a fresh fingerprint is scanned without -O and with --version-light. When the scan finds the same
+    open ports as the fingerprint, the fingerprinted OS and services are merged into its result. When the ports
+    changed, the fingerprint is dropped, so the next scan fingerprints the device again.
+    """
+
+    def __init__(
+        self,
+        cache_path: Path = CACHE_PATH,
+        max_age: float = 7 * 24 * 60 * 60,
+        clock: Callable[[], float] = time.time,
+    ) -> None:
+        """
+        :param cache_path: file the fingerprints are kept in between runs
+        :param max_age: seconds a fingerprint is used for before the device is fingerprinted again, 0 to never
+            use one
+        :param clock: wall clock, fingerprints have to age between runs
+        """
+        self.cache_path = cache_path
+        self.max_age = max_age
+        self._clock = clock
+        self._fingerprints: dict[str, Fingerprint] = read_cache(cache_path)
+        # Cache key of each ip address being scanned, and whether it is being scanned without fingerprinting
+        self._scans: dict[str, tuple[str, bool]] = {}
+
+    def plan(self, devices: list[NmapDevice], scan_type: str) -> set[str]:
+        """
+        Find the devices that have a fresh fingerprint for a scan, only devices with a MAC address can have one
+        :param devices: the devices about to be port scanned
+        :param scan_type: "general", "extended" or "full"
+        :return: the ip addresses of the devices that can be scanned without fingerprinting
+        """
+        now: float = self._clock()
+        fingerprinted: set[str] = set()
+        for device in devices:
+            mac_addr: str | None = normalize_mac(device.mac_addr)
+            if mac_addr is None:
+                continue
+            key: str = f"{mac_addr}/{scan_type}"
+            fingerprint: Fingerprint | None = self._fingerprints.get(key)
+            fresh: bool = fingerprint is not None and now - fingerprint.scanned < self.max_age
+            self._scans[device.ip_addr] = (key, fresh)
+            if fresh:
+                fingerprinted.add(device.ip_addr)
+        Logger().debug(f"Skipping fingerprinting of {len(fingerprinted)} of {len(devices)} devices for {scan_type}")
+        return fingerprinted
+
+    def update(self, device: NmapDevice) -> NmapDevice:
+        """
+        Merge the fingerprint into a device scanned without fingerprinting, or keep the fingerprint of a device
+        that was fingerprinted
+        :param device: the device from the port scan
+        :return: the device, with the fingerprinted OS and services if its open ports haven't changed
+        """
+        scan: tuple[str, bool] | None = self._scans.get(device.ip_addr)
+        if scan is None:
+            return device
+        key, fingerprinted = scan
+        if not fingerprinted:
+            self._fingerprints[key] = Fingerprint(
+                os=device.os or OperatingSystem(name="(Unknown)", vendor="(Unknown)", family="(Unknown)"),
+                services={port_key(port): port.service for port in port_map(device).values()},
+                scanned=self._clock(),
+            )
+            return device
+        fingerprint: Fingerprint = self._fingerprints[key]
+        if not fingerprint.matches(device):
+            Logger().debug(f"Open ports of {device.ip_addr} changed, it will be fingerprinted again next scan")
+            del self._fingerprints[key]
+            return device
+        return replace(
+            device,
+            os=fingerprint.os,
+            ports=[replace(port, service=fingerprint.services[port_key(port)]) for port in port_map(device).values()],
+        )
+
+    def save(self) -> None:
+        write_cache(self.cache_path, self._fingerprints, self._clock() - self.max_age)
+
+
+def port_key(port: Port) -> str:
+    return f"{port.id}/{port.protocol}"
+
+
+def read_cache(cache_path: Path) -> dict[str, Fingerprint]:
+    try:
+        return {
+            key: Fingerprint(
+                os=OperatingSystem(**fingerprint["os"]),
+                services={port: Service(**service) for port, service in fingerprint["services"].items()},
+                scanned=fingerprint["scanned"],
+            )
+            for key, fingerprint in json.loads(cache_path.read_text(encoding="UTF-8")).items()
+        }
+    except (OSError, ValueError, TypeError, KeyError, AttributeError):
+        return {}
+
+
+def write_cache(cache_path: Path, fingerprints: dict[str, Fingerprint], oldest: float) -> None:
+    # Stale fingerprints are dropped, so devices that have left don't stay in the cache forever
+    entries: dict[str, dict] = {
+        key: asdict(fingerprint) for key, fingerprint in fingerprints.items() if fingerprint.scanned > oldest
+    }
+    try:
+        write_json_atomically(cache_path, entries)
+    except OSError as e:
+        Logger().debug(f"Failed to cache fingerprints in {cache_path}: {e}")
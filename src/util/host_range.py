@@ -0,0 +1,149 @@
+from __future__ import annotations
+
+import ipaddress
+import re
+from typing import Iterable, Iterator
+
+IPNetwork = ipaddress.IPv4Network | ipaddress.IPv6Network
+
+# Largest block given to a single nmap run, a /16 of IPv4. Bigger blocks are split as they are scanned, so a /8
+# is 256 runs that each report back rather than one run that holds every result until it finishes.
+MAX_SHARD_ADDRESSES = 2**16
+
+# Most nmap runs a scan can be split into, a /4 of IPv4 or a /100 of IPv6. Shards are the same size for either
+# version, so a single IPv6 /64 would be 2^48 runs that never finish.
+MAX_SHARDS = 4096
+
+
+def parse_targets(host_range: str) -> Iterator[IPNetwork]:
+    """
+    Parse a list of ranges, networks and addresses separated by commas or spaces, e.g.
+    "10.0.0.5-10.0.3.200, 192.168.1.0/24 fd00::1-fd00::ff". The last part of an IPv4 range can be just the last
+    octet, as in nmap, e.g. 192.168.1.10-20.
+    :param host_range: the ranges
+    :return: the networks covering each range, in the order given
+    :raises ValueError: when a range isn't valid
+    """
+    for target in re.split(r"[\s,]+", host_range.strip()):
+        if target:
+            yield from parse_target(target)
+
+
+def parse_target(target: str) -> Iterator[IPNetwork]:
+    """
+    Parse a single range, network or address
+    :param target: e.g. 10.0.0.5-10.0.3.200, 10.0.0.0/8 or 10.0.0.1
+    :return: the fewest networks covering the range
+    :raises ValueError: when the range isn't valid
+    """
+    if "-" not in target:
+        # Host bits are allowed, as with the host and cidr, so 192.168.1.10/24 is the whole /24
+        yield ipaddress.ip_network(target, strict=False)
+        return
+    start_text, _, end_text = target.partition("-")
+    start: ipaddress.IPv4Address | ipaddress.IPv6Address = ipaddress.ip_address(start_text)
+    if start.version == 4 and end_text.isdigit():
+        end_text = f"{start_text.rpartition(".")[0]}.{end_text}"
+    end: ipaddress.IPv4Address | ipaddress.IPv6Address = ipaddress.ip_address(end_text)
+    if start.version != end.version:
+        raise ValueError(f"{target} mixes IPv4 and IPv6 addresses")
+    if start > end:
+        raise ValueError(f"{target} ends before it starts")
+    yield from ipaddress.summarize_address_range(start, end)
+
+
+def coalesce(networks: Iterable[IPNetwork]) -> list[IPNetwork]:
+    """
+    Merge networks into the fewest networks that cover the same addresses, overlapping and adjacent networks
+    are merged, so every address is in exactly one of them. Only the networks are held, never their addresses.
+    :param networks: the networks, of either version
+    :return: the IPv4 networks in order, then the IPv6 networks in order
+    """
+    by_version: dict[int, list[IPNetwork]] = {4: [], 6: []}
+    for network in networks:
+        by_version[network.version].append(network)
+    return [network for version in (4, 6) for network in ipaddress.collapse_addresses(by_version[version])]
+
+
+def shards(networks: Iterable[IPNetwork], max_addresses: int = MAX_SHARD_ADDRESSES) -> Iterator[IPNetwork]:
+    """
+    Split networks bigger than a shard into shards, lazily, so a /8 is never held as 256 networks either
+    :param networks: the networks
+    :param max_addresses: the most addresses in a shard, a power of two
+    :return: the shards, in order
+    """
+    shard_bits: int = max_addresses.bit_length() - 1
+    for network in networks:
+        if network.num_addresses > max_addresses:
+            yield from network.subnets(new_prefix=network.max_prefixlen - shard_bits)
+        else:
+            yield network
+
+
+def count_shards(networks: Iterable[IPNetwork], max_addresses: int = MAX_SHARD_ADDRESSES) -> int:
+    """
+    Count the nmap runs networks are scanned with, without splitting them
+    :param networks: the networks, already merged
+    :param max_addresses: the most addresses scanned by a single run
+    :return: the number of shards
+    """
+    return sum(-(-network.num_addresses // max_addresses) for network in networks)
+
+
+def check_shard_count(
+    networks: Iterable[IPNetwork], max_shards: int = MAX_SHARDS, max_addresses: int = MAX_SHARD_ADDRESSES
+) -> list[IPNetwork]:
+    """
+    Check networks can be scanned in a sane number of nmap runs
+    :param networks: the networks, in any order
+    :param max_shards: the most runs allowed
+    :param max_addresses: the most addresses scanned by a single run
+    :return: the networks, merged
+    :raises ValueError: when they would take more runs than allowed
+    """
+    merged: list[IPNetwork] = coalesce(networks)
+    shard_count: int = count_shards(merged, max_addresses)
+    if shard_count > max_shards:
+        raise ValueError(
+            f"{", ".join(str(network) for network in merged[:3])}{", ..." if len(merged) > 3 else ""} would take "
+            f"{shard_count} nmap runs of {max_addresses} addresses, at most {max_shards} are allowed"
+        )
+    return merged
+
+
+def expand_host_range(host_range: str, max_addresses: int = MAX_SHARD_ADDRESSES) -> Iterator[tuple[str, str]]:
+    """
+    Turn a list of ranges into the host and cidr of each nmap run that covers them
+    :param host_range: the ranges, as taken by `parse_targets`
+    :param max_addresses: the most addresses scanned by a single run
+    :return: the address and prefix length of each block, e.g. ("10.0.0.0", "16")
+    :raises ValueError: when a range isn't valid
+    """
+    return expand_networks(parse_targets(host_range), max_addresses)
+
+
+def expand_networks(
+    networks: Iterable[IPNetwork], max_addresses: int = MAX_SHARD_ADDRESSES
+) -> Iterator[tuple[str, str]]:
+    """
+    Turn networks into the host and cidr of each nmap run that covers them, overlapping networks are merged first
+    so no address is scanned twice
+    :param networks: the networks, in any order
+    :param max_addresses: the most addresses scanned by a single run
+    :return: the address and prefix length of each block, e.g. ("10.0.0.0", "16")
+    """
+    for shard in shards(coalesce(networks), max_addresses):
+        yield str(shard.network_address), str(shard.prefixlen)
+
+
+def target_network(host: str, cidr: str) -> IPNetwork | None:
+    """
+    The network a host and cidr scan covers
+    :param host: the address scanned, host bits are allowed
+    :param cidr: the prefix length
+    :return: the network, or None when the host is a hostname or the cidr isn't valid for it
+    """
+    try:
+        return ipaddress.ip_network(f"{host}/{cidr}", strict=False)
+    except ValueError:
+        return None
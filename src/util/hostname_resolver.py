@@ -0,0 +1,200 @@
+from __future__ import annotations
+
+import json
+import queue
+import socket
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FuturesTimeoutError, as_completed
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable
+
+from src.data.nmapdevice import NmapDevice
+from src.util.cache_file import cache_dir, write_json_atomically
+from src.util.logger import Logger
+
+CACHE_PATH: Path = cache_dir() / "hostnames.json"
+
+
+@dataclass
+class CachedHostname:
+    # None when the address has no PTR record, so it isn't looked up again until this expires either
+    hostname: str | None
+    expires: float
+
+
+def reverse_lookup(ip_addr: str) -> str | None:
+    """
+    Look up the PTR record of an address with the system resolver
+    :param ip_addr: the address
+    :return: the hostname, or None if the address has no hostname
+    :raises OSError: when the lookup failed, e.g. the DNS server didn't answer, so shouldn't be cached
+    """
+    try:
+        return socket.gethostbyaddr(ip_addr)[0]
+    except socket.herror:
+        return None
+
+
+class HostnameResolver:  # pylint: disable=too-many-instance-attributes
+    """
+    Resolves the hostnames of discovered devices separately from host discovery, which runs nmap with -n so
+    the sweep doesn't wait on DNS. Lookups run concurrently on a thread pool and fill in `NmapDevice.hostname`
+    as each one answers. Answers, including addresses without a hostname, are cached with a TTL on disk, so
+    scheduled scans only look up addresses that are new or have expired.
+    """
+
+    def __init__(
+        self,
+        lookup: Callable[[str], str | None] = reverse_lookup,
+        cache_path: Path = CACHE_PATH,
+        ttl: float = 60 * 60,
+        negative_ttl: float = 5 * 60,
+        max_workers: int = 32,
+        timeout: float = 3.0,
+        clock: Callable[[], float] = time.time,
+    ) -> None:
+        """
+        :param lookup: looks up the hostname of an address, returns None when there isn't one and raises OSError
+            when the lookup fails
+        :param cache_path: file the cache is kept in between runs
+        :param ttl: seconds to cache a hostname for
+        :param negative_ttl: seconds to remember an address has no hostname for
+        :param max_workers: maximum number of lookups at once
+        :param timeout: seconds to wait for all the lookups, any still unanswered are left without a hostname
+        :param clock: wall clock, cache expiry has to carry over between runs
+        """
+        self.lookup = lookup
+        self.cache_path = cache_path
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.max_workers = max_workers
+        self.timeout = timeout
+        self._clock = clock
+        self._cache: dict[str, CachedHostname] = read_cache(cache_path)
+
+    def resolve(
+        self, devices: list[NmapDevice], on_resolved: Callable[[NmapDevice], None] | None = None
+    ) -> list[NmapDevice]:
+        """
+        Fill in the hostnames of devices that don't have one, from the cache or by looking them up
+        :param devices: the devices, updated in place
+        :param on_resolved: called with each device as its hostname is filled in
+        :return: the devices
+        """
+        unresolved: dict[str, list[NmapDevice]] = self._fill_cached(devices, on_resolved)
+        Logger().debug(f"Resolving {len(unresolved)} hostnames of {len(devices)} devices")
+        if unresolved:
+            self._lookup_all(unresolved, on_resolved)
+            write_cache(self.cache_path, self._cache, self._clock())
+        return devices
+
+    def start(self, devices: list[NmapDevice]) -> HostnameLookups:
+        """
+        Look up the hostnames of devices in the background, so scanning can carry on while DNS answers
+        :param devices: the devices, updated in place as their hostnames are found
+        :return: the lookups, to join once the rest of the scan is done
+        """
+        return HostnameLookups(self, devices)
+
+    def fill_cached(self, devices: list[NmapDevice]) -> list[NmapDevice]:
+        """
+        Fill in only the hostnames that are cached, which never waits on DNS
+        :param devices: the devices, updated in place
+        :return: the devices that still need looking up
+        """
+        return [device for waiting in self._fill_cached(devices, None).values() for device in waiting]
+
+    def _fill_cached(
+        self, devices: list[NmapDevice], on_resolved: Callable[[NmapDevice], None] | None
+    ) -> dict[str, list[NmapDevice]]:
+        now: float = self._clock()
+        unresolved: dict[str, list[NmapDevice]] = {}
+        for device in devices:
+            if device.hostname is not None or not device.ip_addr:
+                continue
+            cached: CachedHostname | None = self._cache.get(device.ip_addr)
+            if cached is not None and cached.expires > now:
+                self._fill(device, cached.hostname, on_resolved)
+            else:
+                unresolved.setdefault(device.ip_addr, []).append(device)
+        return unresolved
+
+    def _lookup_all(
+        self, unresolved: dict[str, list[NmapDevice]], on_resolved: Callable[[NmapDevice], None] | None
+    ) -> None:
+        pool = ThreadPoolExecutor(max_workers=min(self.max_workers, len(unresolved)), thread_name_prefix="resolver")
+        futures: dict[Future, str] = {pool.submit(self.lookup, ip_addr): ip_addr for ip_addr in unresolved}
+        try:
+            for future in as_completed(futures, timeout=self.timeout):
+                ip_addr: str = futures[future]
+                try:
+                    hostname: str | None = future.result()
+                except OSError as e:
+                    # Most likely a DNS server that didn't answer, so worth trying again next run
+                    Logger().debug(f"Failed to resolve the hostname of {ip_addr}: {e}")
+                    continue
+                ttl: float = self.ttl if hostname is not None else self.negative_ttl
+                self._cache[ip_addr] = CachedHostname(hostname, self._clock() + ttl)
+                for device in unresolved[ip_addr]:
+                    self._fill(device, hostname, on_resolved)
+        except FuturesTimeoutError:
+            Logger().debug(f"Gave up on resolving hostnames after {self.timeout} seconds")
+        finally:
+            # Lookups still running are left to finish on their own, they can't be interrupted
+            pool.shutdown(wait=False, cancel_futures=True)
+
+    @staticmethod
+    def _fill(device: NmapDevice, hostname: str | None, on_resolved: Callable[[NmapDevice], None] | None) -> None:
+        if hostname is None:
+            return
+        device.hostname = hostname
+        if on_resolved is not None:
+            on_resolved(device)
+
+
+class HostnameLookups:
+    """
+    Lookups running on a background thread. The devices resolved are queued rather than output as they are found,
+    so whatever outputs them can do it from its own thread, after the lookups have been joined.
+    """
+
+    def __init__(self, resolver: HostnameResolver, devices: list[NmapDevice]) -> None:
+        self._resolved: queue.SimpleQueue[NmapDevice] = queue.SimpleQueue()
+        self._thread = threading.Thread(
+            target=resolver.resolve, args=(devices, self._resolved.put), name="hostname-lookups", daemon=True
+        )
+        self._thread.start()
+
+    def join(self) -> list[NmapDevice]:
+        """
+        Wait for the lookups to finish, which the resolver's timeout bounds
+        :return: the devices whose hostnames were found, in the order they were found
+        """
+        self._thread.join()
+        resolved: list[NmapDevice] = []
+        while not self._resolved.empty():
+            resolved.append(self._resolved.get())
+        return resolved
+
+
+def read_cache(cache_path: Path) -> dict[str, CachedHostname]:
+    try:
+        return {
+            ip_addr: CachedHostname(hostname, expires)
+            for ip_addr, (hostname, expires) in json.loads(cache_path.read_text(encoding="UTF-8")).items()
+        }
+    except (OSError, ValueError, TypeError):
+        return {}
+
+
+def write_cache(cache_path: Path, cache: dict[str, CachedHostname], now: float) -> None:
+    # Expired entries are dropped, so the cache only grows with the addresses seen recently
+    entries: dict[str, tuple[str | None, float]] = {
+        ip_addr: (cached.hostname, cached.expires) for ip_addr, cached in cache.items() if cached.expires > now
+    }
+    try:
+        write_json_atomically(cache_path, entries)
+    except OSError as e:
+        Logger().debug(f"Failed to cache hostnames in {cache_path}: {e}")
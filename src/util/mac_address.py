@@ -0,0 +1,31 @@
+HEX_DIGITS: frozenset[str] = frozenset("0123456789ABCDEF")
+
+
+def normalize_mac(mac_addr: str | None) -> str | None:
+    """
+    Normalize a MAC address into upper case, colon separated octets. Accepts the formatted
+    "AA:BB:CC:DD:EE:FF | Vendor" strings found on an NmapDevice as well as bare addresses
+    separated by colons, dashes or dots.
+    :param mac_addr: the MAC address to normalize
+    :return: the normalized MAC address, or None if it is missing or not a valid MAC address
+    """
+    digits: str | None = mac_digits(mac_addr)
+    if digits is None:
+        return None
+    return ":".join(digits[i : i + 2] for i in range(0, 12, 2))
+
+
+def mac_digits(mac_addr: str | None) -> str | None:
+    """
+    The hex digits of a MAC address, without the vendor nmap adds or any separators
+    :param mac_addr: the MAC address, in any of the forms `normalize_mac` accepts
+    :return: the twelve upper case hex digits, or None if it is missing or not a valid MAC address
+    """
+    if not mac_addr:
+        return None
+    digits: str = mac_addr.split("|", 1)[0].strip().upper()
+    for separator in (":", "-", ".", " "):
+        digits = digits.replace(separator, "")
+    if len(digits) != 12 or not HEX_DIGITS.issuperset(digits):
+        return None
+    return digits
@@ -0,0 +1,138 @@
+from __future__ import annotations
+
+import gzip
+import os
+import shutil
+import sys
+from array import array
+from bisect import bisect_left
+from pathlib import Path
+from typing import Iterable, Iterator
+
+from src.util.logger import Logger
+from src.util.mac_address import HEX_DIGITS, mac_digits
+
+# Generated from the IEEE registries by generate_mac_prefixes.py
+BUNDLED_PREFIXES: Path = Path(__file__).parent.parent / "resources" / "oui" / "mac-prefixes.gz"
+
+# Hex digits in an MA-S, MA-M and MA-L assignment, the longest prefix that matches names the vendor
+PREFIX_LENGTHS: tuple[int, ...] = (9, 7, 6)
+
+
+class OuiIndex:
+    """
+    Vendors of MAC address prefixes, kept as a sorted array of prefixes per prefix length with the vendors in a
+    parallel list. A lookup is a binary search per prefix length, and the prefixes take 8 bytes each rather
+    than a string and a dict entry each.
+    """
+
+    def __init__(self, entries: Iterable[tuple[str, str]]) -> None:
+        """
+        :param entries: hex prefixes and their vendors, a later entry for the same prefix replaces an earlier one
+        """
+        by_length: dict[int, dict[int, str]] = {length: {} for length in PREFIX_LENGTHS}
+        for prefix, vendor in entries:
+            if len(prefix) in by_length:
+                # Interned, as most vendors have many prefixes
+                by_length[len(prefix)][int(prefix, 16)] = sys.intern(vendor)
+        self._prefixes: dict[int, array] = {}
+        self._vendors: dict[int, list[str]] = {}
+        for length, vendors in by_length.items():
+            if vendors:
+                keys: list[int] = sorted(vendors)
+                self._prefixes[length] = array("Q", keys)
+                self._vendors[length] = [vendors[key] for key in keys]
+
+    def __len__(self) -> int:
+        return sum(len(prefixes) for prefixes in self._prefixes.values())
+
+    def lookup(self, mac_addr: str | None) -> str | None:
+        """
+        Find the vendor of a MAC address
+        :param mac_addr: the MAC address, separated by colons, dashes or dots
+        :return: the vendor, or None if the prefix isn't assigned or the address isn't valid
+        """
+        digits: str | None = mac_digits(mac_addr)
+        if digits is None:
+            return None
+        address: int = int(digits, 16)
+        for length, prefixes in self._prefixes.items():
+            key: int = address >> 4 * (12 - length)
+            i: int = bisect_left(prefixes, key)
+            if i < len(prefixes) and prefixes[i] == key:
+                return self._vendors[length][i]
+        return None
+
+
+class MacVendors:
+    """
+    Singleton class that finds the vendor of a MAC address, from the bundled IEEE MA-L, MA-M and MA-S registries
+    with nmap's nmap-mac-prefixes over them when it can be found. The tables are only loaded on the first lookup.
+    """
+
+    _instance = None
+    _index: OuiIndex | None = None
+
+    def __new__(cls, *args, **kwargs):
+        if cls._instance is None:
+            cls._instance = super(MacVendors, cls).__new__(cls, *args, **kwargs)
+        return cls._instance
+
+    def lookup(self, mac_addr: str | None) -> str | None:
+        """
+        Find the vendor of a MAC address
+        :param mac_addr: the MAC address
+        :return: the vendor, or None if it isn't known
+        """
+        if MacVendors._index is None:
+            MacVendors._index = load_index()
+        return MacVendors._index.lookup(mac_addr)
+
+
+def load_index() -> OuiIndex:
+    """
+    Load the bundled table, then nmap's over it when it is installed, so a vendor known to both is named the
+    way nmap names it and a vendor nmap doesn't know yet still has a name
+    :return: the index of every prefix found
+    """
+    paths: list[Path] = [BUNDLED_PREFIXES]
+    nmap_prefixes: Path | None = find_nmap_prefixes()
+    if nmap_prefixes is not None:
+        paths.append(nmap_prefixes)
+    index = OuiIndex(entry for path in paths for entry in read_prefixes(path))
+    Logger().debug(f"Loaded {len(index)} MAC address prefixes from: {[str(path) for path in paths]}")
+    return index
+
+
+def find_nmap_prefixes() -> Path | None:
+    """
+    Find the nmap-mac-prefixes installed with nmap, in the places nmap itself looks for its data files
+    :return: the path, or None if it wasn't found
+    """
+    candidates: list[Path] = []
+    if os.environ.get("NMAPDIR"):
+        candidates.append(Path(os.environ["NMAPDIR"]))
+    nmap: str | None = shutil.which("nmap")
+    if nmap is not None:
+        candidates.append(Path(os.path.realpath(nmap)).parent.parent / "share" / "nmap")
+    candidates.extend([Path("/usr/local/share/nmap"), Path("/usr/share/nmap")])
+    return next((path / "nmap-mac-prefixes" for path in candidates if (path / "nmap-mac-prefixes").is_file()), None)
+
+
+def read_prefixes(path: Path) -> Iterator[tuple[str, str]]:
+    """
+    Read a table in the format of nmap-mac-prefixes, a hex prefix and the vendor per line
+    :param path: the table, gzipped when it ends in .gz
+    :return: the prefixes and their vendors
+    """
+    try:
+        opener = gzip.open if path.suffix == ".gz" else open
+        with opener(path, "rt", encoding="UTF-8", errors="replace") as lines:
+            for line in lines:
+                if line.startswith("#"):
+                    continue
+                prefix, _, vendor = line.strip().partition(" ")
+                if prefix and vendor and HEX_DIGITS.issuperset(prefix.upper()):
+                    yield prefix.upper(), vendor.strip()
+    except (OSError, EOFError) as e:
+        Logger().debug(f"Failed to read MAC address prefixes from {path}: {e}")
@@ -0,0 +1,130 @@
+from __future__ import annotations
+
+import json
+import os
+import re
+import shutil
+import struct
+import subprocess
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+
+from src.util.cache_file import cache_dir, write_json_atomically
+from src.util.logger import Logger
+
+CACHE_PATH: Path = cache_dir() / "nmap.json"
+
+# From linux/capability.h, the capability bit for raw sockets and the flag for file capabilities being effective
+CAP_NET_RAW = 13
+VFS_CAP_FLAGS_EFFECTIVE = 0x000001
+
+
+@dataclass
+class NmapCapabilities:
+    """
+    What the installed nmap binary can do, cached on disk until the binary changes
+    """
+
+    path: str | None
+    # Modification time of the binary when it was probed, a new install or upgrade changes it
+    mtime: float | None = None
+    version: str | None = None
+    # Libraries and features nmap was compiled with, e.g. libpcap, openssl, ipv6
+    features: list[str] = field(default_factory=list)
+    # The binary has the CAP_NET_RAW file capability, so can send raw packets without root
+    cap_net_raw: bool = False
+
+    @property
+    def installed(self) -> bool:
+        return self.path is not None and self.version is not None
+
+
+def probe_nmap(nmap: str = "nmap", cache_path: Path = CACHE_PATH) -> NmapCapabilities:
+    """
+    Find out what the nmap binary on the path can do. The result is cached against the path and modification time
+    of the binary, so nmap is only run again when it has been reinstalled or upgraded.
+    :param nmap: name or path of the nmap binary
+    :param cache_path: file the result is cached in
+    :return: the capabilities of nmap, `installed` is False when it can't be found or run
+    """
+    found: str | None = shutil.which(nmap)
+    if found is None:
+        Logger().debug(f"Could not find {nmap} on the path")
+        return NmapCapabilities(path=None)
+    path: str = os.path.realpath(found)
+    mtime: float = os.stat(path).st_mtime
+
+    cached: NmapCapabilities | None = read_cache(cache_path)
+    if cached is not None and cached.path == path and cached.mtime == mtime:
+        Logger().debug(f"Using cached nmap capabilities: {cached}")
+        return cached
+
+    Logger().debug(f"Probing nmap capabilities of: {path}")
+    try:
+        completed = subprocess.run([path, "--version"], capture_output=True, text=True, check=True, timeout=10)
+    except (OSError, subprocess.SubprocessError) as e:
+        Logger().debug(f"Failed to run {path} --version: {e}")
+        return NmapCapabilities(path=path, mtime=mtime, cap_net_raw=has_cap_net_raw(path))
+
+    capabilities = NmapCapabilities(
+        path=path,
+        mtime=mtime,
+        version=find_nmap_version(completed.stdout),
+        features=find_compiled_features(completed.stdout),
+        cap_net_raw=has_cap_net_raw(path),
+    )
+    write_cache(cache_path, capabilities)
+    return capabilities
+
+
+def find_nmap_version(stdout: str) -> str | None:
+    """
+    Find the nmap version in the output of nmap --version
+    :param stdout: output of the version command
+    :return: the version, e.g. 7.95, or None if it was not found
+    """
+    version_found: re.Match[str] | None = re.search(r"Nmap version \d+\.\d+", stdout)
+    return version_found.group().replace("Nmap version", "").strip() if version_found else None
+
+
+def find_compiled_features(stdout: str) -> list[str]:
+    """
+    Find what nmap was compiled with in the output of nmap --version
+    :param stdout: output of the version command
+    :return: the names of the libraries and features without their versions, e.g. ["libpcap", "ipv6"]
+    """
+    compiled_with: re.Match[str] | None = re.search(r"^Compiled with:(.*)$", stdout, re.MULTILINE)
+    if compiled_with is None:
+        return []
+    return [re.sub(r"-\d[\w.]*$", "", feature) for feature in compiled_with.group(1).split()]
+
+
+def has_cap_net_raw(path: str) -> bool:
+    """
+    Check the file capabilities of a binary for an effective CAP_NET_RAW, e.g. after `setcap cap_net_raw+eip`
+    :param path: path of the binary
+    :return: True if the binary can open raw sockets without root
+    """
+    try:
+        data: bytes = os.getxattr(path, "security.capability")
+    except (OSError, AttributeError):
+        # No capabilities set, or not on Linux
+        return False
+    if len(data) < 8:
+        return False
+    magic_etc, permitted = struct.unpack_from("<II", data)
+    return bool(magic_etc & VFS_CAP_FLAGS_EFFECTIVE) and bool(permitted & (1 << CAP_NET_RAW))
+
+
+def read_cache(cache_path: Path) -> NmapCapabilities | None:
+    try:
+        return NmapCapabilities(**json.loads(cache_path.read_text(encoding="UTF-8")))
+    except (OSError, ValueError, TypeError):
+        return None
+
+
+def write_cache(cache_path: Path, capabilities: NmapCapabilities) -> None:
+    try:
+        write_json_atomically(cache_path, asdict(capabilities))
+    except OSError as e:
+        Logger().debug(f"Failed to cache nmap capabilities in {cache_path}: {e}")
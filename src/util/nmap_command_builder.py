@@ -1,6 +1,13 @@
 from __future__ import annotations
 
+import shlex
 from enum import Enum
+from typing import TYPE_CHECKING
+
+from src.data.timing_template import TimingTemplate
+
+if TYPE_CHECKING:
+    from src.util.timing_profile import TimingProfile
 
 
 class AvailableNmapFlags(Enum):
@@ -22,6 +29,8 @@ class AvailableNmapFlags(Enum):
 
     NORMAL_TIMING = "-T3"
 
+    FAST_TIMING = "-T4"  # -T4: nmap's aggressive template, -T5 is its insane template
+
     XML_OUTPUT_TO_STDOUT = "-oX -"  # xml output to terminal
 
     ICMP_PING = "-PE -PP -PM"  # -PE/PP/PM: ICMP echo, timestamp, and netmask request discovery probes
@@ -36,13 +45,33 @@ class AvailableNmapFlags(Enum):
 
     OUTPUT_TO_XML_FILE = "-oX"
 
+    PRIVILEGED = "--privileged"  # --privileged: send raw packets without root, when nmap has CAP_NET_RAW
+
+    NO_DNS = "-n"  # -n: never do reverse DNS resolution, hostnames are resolved separately after discovery
+
+    VERSION_LIGHT = "--version-light"  # --version-light: only the likeliest version probes, much faster than -sV
+
+    IPV6 = "-6"  # -6: scan IPv6 addresses, nmap only takes IPv6 targets with it
+
+
+TIMING_FLAGS: dict[TimingTemplate, AvailableNmapFlags] = {
+    TimingTemplate.NORMAL: AvailableNmapFlags.NORMAL_TIMING,
+    TimingTemplate.AGGRESSIVE: AvailableNmapFlags.FAST_TIMING,
+    TimingTemplate.INSANE: AvailableNmapFlags.AGGRESSIVE_TIMING,
+}
+
 
-class NmapCommandBuilder:
-    def __init__(self, host: str, cidr: str, sudo: bool = False) -> None:
+class NmapCommandBuilder:  # pylint: disable=too-many-public-methods
+    def __init__(self, host: str, cidr: str, nmap: str = "nmap") -> None:
         self.host = host
         self.cidr = cidr
-        self.sudo = sudo
+        # Name or path of the nmap binary, e.g. a stand-in that replays recorded scans
+        self.nmap = nmap
         self.enabled_flags = set()
+        if ":" in host:
+            self.enable_flag(AvailableNmapFlags.IPV6)
+        # Options that take a value, e.g. --max-retries 2, in the order they were set
+        self.options: dict[str, str] = {}
 
     def disable_all_flags(self) -> NmapCommandBuilder:
         """
@@ -75,6 +104,28 @@ class NmapCommandBuilder:
     def enable_service_scan(self) -> NmapCommandBuilder:
         return self.enable_flag(AvailableNmapFlags.SERVICE_SCAN)
 
+    def enable_fingerprinting(self, full: bool = True, os_detection: bool = True) -> NmapCommandBuilder:
+        """
+        Detect the services on the open ports, and the OS
+        :param full: False to skip OS detection and only run the likeliest version probes, for a device whose
+            fingerprint is already known
+        :param os_detection: False to skip OS detection, for a device whose OS was already detected
+        :return: NmapCommandBuilder
+        """
+        return (
+            self.enable_service_scan()
+            .set_flag(AvailableNmapFlags.OS_DETECTION, full and os_detection)
+            .set_flag(AvailableNmapFlags.VERSION_LIGHT, not full)
+        )
+
+    def set_excluded_ports(self, ports: str | None) -> NmapCommandBuilder:
+        """
+        Leave ports out of a port scan, whichever way the ports scanned are chosen
+        :param ports: the ports as taken by --exclude-ports, e.g. "1,3-4,6-7", None to leave none out
+        :return: NmapCommandBuilder
+        """
+        return self.set_option("--exclude-ports", ports)
+
     def enable_aggressive(self) -> NmapCommandBuilder:
         """
         If you are going to use this, the code needs to handle port scanning, or this throws errors
@@ -100,17 +151,63 @@ class NmapCommandBuilder:
     def enable_output_to_xml_file(self) -> NmapCommandBuilder:
         return self.enable_flag(AvailableNmapFlags.OUTPUT_TO_XML_FILE)
 
-    def set_sudo(self) -> NmapCommandBuilder:
-        self.sudo = True
+    def enable_privileged(self, is_enabled: bool = True) -> NmapCommandBuilder:
+        return self.set_flag(AvailableNmapFlags.PRIVILEGED, is_enabled)
+
+    def enable_no_dns(self) -> NmapCommandBuilder:
+        return self.enable_flag(AvailableNmapFlags.NO_DNS)
+
+    def set_option(self, option: str, value: str | None) -> NmapCommandBuilder:
+        """
+        Set an option that takes a value, or clear it
+        :param option: the option, e.g. --max-retries
+        :param value: its value, None to leave the option out
+        :return: NmapCommandBuilder
+        """
+        if value is None:
+            self.options.pop(option, None)
+        else:
+            self.options[option] = value
+        return self
+
+    def enable_timing_profile(self, profile: TimingProfile) -> NmapCommandBuilder:
+        """
+        Use the timing template and options of a profile, in place of any timing set before
+        :param profile: the timing profile
+        :return: NmapCommandBuilder
+        """
+        for flag in TIMING_FLAGS.values():
+            self.disable_flag(flag)
+        for option in ("--max-retries", "--host-timeout", "--min-rate", "--min-hostgroup"):
+            self.set_option(option, None)
+        self.enable_flag(TIMING_FLAGS[profile.template])
+        for option, value in profile.options.items():
+            self.set_option(option, value)
         return self
 
+    def enable_exclude(self, targets: list[str]) -> NmapCommandBuilder:
+        """
+        Exclude addresses from the scan, nmap won't send them anything
+        :param targets: the excluded networks and addresses, none to exclude nothing
+        :return: NmapCommandBuilder
+        """
+        return self.set_option("--exclude", ",".join(targets) if targets else None)
+
+    def enable_exclude_file(self, path: str | None) -> NmapCommandBuilder:
+        """
+        Exclude the addresses listed in a file from the scan, for more than fit on the command line
+        :param path: the file, one network or address per line, None to exclude nothing
+        :return: NmapCommandBuilder
+        """
+        return self.set_option("--excludefile", shlex.quote(path) if path is not None else None)
+
     def build(self) -> str:
-        flags = " ".join(flag.value for flag in self.enabled_flags)
-        return f"{"sudo" if self.sudo else ""} nmap {flags} {self.host}/{self.cidr}"
+        flags = self._build_flags()
+        return f"{shlex.quote(self.nmap)} {flags} {self.host}/{self.cidr}"
 
     def build_without_cidr(self) -> str:
-        flags = " ".join(flag.value for flag in self.enabled_flags)
-        return f"{"sudo" if self.sudo else ""} nmap {flags} {self.host}"
+        flags = self._build_flags()
+        return f"{shlex.quote(self.nmap)} {flags} {self.host}"
 
-    def build_version_command(self) -> str:
-        return f"{"sudo" if self.sudo else ""} nmap --version"
+    def _build_flags(self) -> str:
+        return " ".join([*(flag.value for flag in self.enabled_flags), *(f"{o} {v}" for o, v in self.options.items())])
@@ -0,0 +1,42 @@
+from __future__ import annotations
+
+import time
+from contextlib import contextmanager
+from typing import Callable, Iterator
+
+from src.util.logger import Logger
+
+
+class PhaseTimings:
+    """
+    How long each phase of a scan took, in seconds, in the order the phases first ran. A phase that runs more
+    than once, e.g. a port scan of each type, adds up.
+    """
+
+    def __init__(self, clock: Callable[[], float] = time.perf_counter, details: dict[str, str] | None = None) -> None:
+        """
+        :param clock: clock used to time the phases, in seconds
+        :param details: what the phases ran with that explains their timings, e.g. the nmap timing options
+        """
+        self._clock = clock
+        self.phases: dict[str, float] = {}
+        self.details: dict[str, str] = details or {}
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        """
+        Time the code run in the context as a phase
+        :param name: name of the phase, e.g. sweep
+        :return: context to run the phase in
+        """
+        started: float = self._clock()
+        try:
+            yield
+        finally:
+            elapsed: float = self._clock() - started
+            self.phases[name] = self.phases.get(name, 0.0) + elapsed
+            Logger().debug(f"Phase {name} took {elapsed:.3f}s")
+
+    @property
+    def total(self) -> float:
+        return sum(self.phases.values())
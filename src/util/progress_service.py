@@ -1,4 +1,9 @@
-from rich.progress import Progress, TextColumn, SpinnerColumn
+from contextlib import AbstractContextManager, nullcontext
+
+from rich.live import Live
+
+from src.util.display import Display
+from src.util.scan_progress import ScanProgress
 
 
 class ProgressService:
@@ -7,14 +12,22 @@ class ProgressService:
     """
 
     _instance = None
-    progress: Progress | None
+    progress: ScanProgress
 
     def __new__(cls, *args, **kwargs):
         if not cls._instance:
             cls._instance = super(ProgressService, cls).__new__(cls, *args, **kwargs)
-            cls._instance.progress = Progress(
-                TextColumn(" "),
-                SpinnerColumn(style="magenta", spinner_name="aesthetic"),
-                TextColumn("[progress.description]{task.description}"),
-            )
+            cls._instance.progress = ScanProgress()
         return cls._instance
+
+    def track(self, commands: int) -> AbstractContextManager:
+        """
+        Start tracking a new fan out of commands, displaying its progress live while the context is open
+        :param commands: number of commands that are about to be run
+        :return: context to run the commands in
+        """
+        self.progress = ScanProgress()
+        self.progress.add_commands(commands)
+        if not Display().live:
+            return nullcontext()
+        return Live(self.progress, console=Display().console, refresh_per_second=4, transient=True)
@@ -0,0 +1,116 @@
+from __future__ import annotations
+
+from dataclasses import replace
+from typing import Iterator
+
+from src.data.nmapdevice import NmapDevice
+from src.util.device_diff import port_map
+
+
+class ProgressivePortScan:
+    """
+    Runs the port scans requested together as stages of one scan, the top 100 ports, then the rest of the top
+    1000, then the rest of 1-65535, so no port is probed twice and the whole scan sends as many probes as a
+    full scan alone. Each stage excludes the ports nmap reported scanning in the stages before it, and the ports
+    each stage finds are merged into one view per device. A stage's results are output as soon as they come in,
+    so the common ports are shown first, but only the complete view is diffed and saved.
+    """
+
+    def __init__(self) -> None:
+        self.scanned_ports: set[int] = set()
+        # Whether the stage running is the last one, whose devices are complete
+        self.final: bool = False
+        # Ports the stage running leaves out, as taken by nmap's --exclude-ports
+        self.exclude_ports: str | None = None
+        # Only the first stage detects the OS, the later ones only look for more ports
+        self.os_detection: bool = True
+        self._devices: dict[str, NmapDevice] = {}
+
+    def start_stage(self, final: bool) -> ProgressivePortScan:
+        """
+        Start the next stage, leaving out every port scanned by the stages before
+        :param final: whether it is the last stage
+        :return: the progressive scan
+        """
+        self.final = final
+        self.exclude_ports = format_port_ranges(self.scanned_ports) if self.scanned_ports else None
+        self.os_detection = not self._devices
+        return self
+
+    def add_scanned_ports(self, services: str | None) -> None:
+        """
+        Record the ports a stage scanned
+        :param services: the ports as nmap lists them in its scaninfo, e.g. "1,3-4,6-7"
+        :return: None
+        """
+        if services:
+            self.scanned_ports.update(parse_port_ranges(services))
+
+    def merge(self, device: NmapDevice) -> NmapDevice:
+        """
+        Merge the ports a stage found on a device into those found by the stages before
+        :param device: the device from the port scan of the stage
+        :return: the device with every port found so far, and the OS found by the first stage that found one
+        """
+        previous: NmapDevice | None = self._devices.get(device.ip_addr)
+        if previous is not None:
+            # Later stages skip OS detection, so the OS found first is kept
+            known_os: bool = previous.os is not None and previous.os.name != "(Unknown)"
+            device = replace(
+                device,
+                hostname=device.hostname or previous.hostname,
+                os=previous.os if known_os else device.os,
+                ports=list({**port_map(previous), **port_map(device)}.values()),
+            )
+        self._devices[device.ip_addr] = device
+        return device
+
+
+def port_scan_stages(
+    scan_types: dict[str, bool], progressive: bool = True
+) -> Iterator[tuple[str, ProgressivePortScan | None]]:
+    """
+    The port scans to run, in order, as stages of one progressive scan when more than one was requested
+    :param scan_types: whether each type of port scan was requested, in the order they run
+    :param progressive: whether to run them as stages, so no port is scanned twice
+    :return: each scan type requested, with the progressive scan started for its stage, or None
+    """
+    requested: list[str] = [scan_type for scan_type, is_requested in scan_types.items() if is_requested]
+    scan: ProgressivePortScan | None = ProgressivePortScan() if progressive and len(requested) > 1 else None
+    for scan_type in requested:
+        yield scan_type, scan.start_stage(final=scan_type == requested[-1]) if scan is not None else None
+
+
+def parse_port_ranges(ports: str) -> set[int]:
+    """
+    Parse a list of ports and ranges
+    :param ports: e.g. "1,3-4,6-7"
+    :return: every port listed
+    """
+    parsed: set[int] = set()
+    for part in ports.split(","):
+        start, _, end = part.strip().partition("-")
+        if start.isdigit() and (not end or end.isdigit()):
+            parsed.update(range(int(start), int(end or start) + 1))
+    return parsed
+
+
+def format_port_ranges(ports: set[int]) -> str:
+    """
+    List ports with consecutive ports as ranges, the way nmap takes them
+    :param ports: the ports
+    :return: e.g. "1,3-4,6-7"
+    """
+    ranges: list[str] = []
+    start: int | None = None
+    previous: int | None = None
+    for port in sorted(ports):
+        if previous is not None and port == previous + 1:
+            previous = port
+            continue
+        if start is not None:
+            ranges.append(str(start) if start == previous else f"{start}-{previous}")
+        start = previous = port
+    if start is not None:
+        ranges.append(str(start) if start == previous else f"{start}-{previous}")
+    return ",".join(ranges)
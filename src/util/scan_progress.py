@@ -0,0 +1,164 @@
+from __future__ import annotations
+
+import heapq
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Callable
+
+from rich.console import Group
+from rich.progress import TaskID
+
+from src.output.typer_output_builder import TyperOutputBuilder
+
+
+@dataclass
+class ProgressSnapshot:  # pylint: disable=too-many-instance-attributes
+    """
+    The state of a fan out of commands at a point in time, durations are in seconds
+    """
+
+    completed: int = 0
+    failed: int = 0
+    # Of the failed, the ones that ran out of time, which is what packet loss looks like
+    timed_out: int = 0
+    in_flight: int = 0
+    queued: int = 0
+    throughput: float = 0.0
+    eta: float | None = None
+    # The targets that have been running the longest, with how long they have been running for
+    slowest: list[tuple[str, float]] = field(default_factory=list)
+
+    @property
+    def measured(self) -> int:
+        """
+        The commands that finished or timed out, a command that failed for any other reason, such as nmap refusing
+        to run, says nothing about packet loss
+        """
+        return self.completed - self.failed + self.timed_out
+
+
+class ScanProgress:  # pylint: disable=too-many-instance-attributes
+    """
+    Aggregate progress of the commands run for a scan, e.g. a port scan per discovered host. Instead of a row
+    per command it shows the completed, in flight and queued counts, the throughput, an ETA and the slowest
+    targets still in flight, so rendering it costs the same whether there are ten targets or thousands.
+    """
+
+    def __init__(self, slowest: int = 5, clock: Callable[[], float] = time.monotonic) -> None:
+        """
+        :param slowest: number of in flight targets to show, slowest first
+        :param clock: clock used to time the commands, in seconds
+        """
+        self.slowest = slowest
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._total: int = 0
+        self._completed: int = 0
+        self._failed: int = 0
+        self._timed_out: int = 0
+        self._next_task_id: int = 0
+        self._in_flight: dict[TaskID, tuple[float, str]] = {}
+        self._started_at: float = clock()
+
+    def add_commands(self, count: int) -> None:
+        """
+        Queue up commands that are about to be run
+        :param count: number of commands
+        :return: nothing
+        """
+        with self._lock:
+            self._total += count
+
+    def start(self, command: str) -> TaskID:
+        """
+        Mark a command as started
+        :param command: the command, its last argument is shown as the target
+        :return: id to complete the command with
+        """
+        with self._lock:
+            task_id = TaskID(self._next_task_id)
+            self._next_task_id += 1
+            self._in_flight[task_id] = (self._clock(), command.split()[-1] if command.strip() else command)
+            # Commands run without being queued first still count towards the total
+            self._total = max(self._total, self._completed + len(self._in_flight))
+            return task_id
+
+    def complete(self, task_id: TaskID, success: bool = True, timed_out: bool = False) -> None:
+        """
+        Mark a command as finished
+        :param task_id: id returned when the command was started
+        :param success: whether the command succeeded
+        :param timed_out: whether the command, or nmap for a host, ran out of time
+        :return: nothing
+        """
+        with self._lock:
+            if self._in_flight.pop(task_id, None) is None:
+                return
+            self._completed += 1
+            if not success or timed_out:
+                self._failed += 1
+            if timed_out:
+                self._timed_out += 1
+
+    def snapshot(self) -> ProgressSnapshot:
+        """
+        Get the current progress, the cost depends on the number of commands in flight and not the total
+        :return: the current progress
+        """
+        with self._lock:
+            now: float = self._clock()
+            elapsed: float = now - self._started_at
+            throughput: float = self._completed / elapsed if elapsed > 0 else 0.0
+            remaining: int = self._total - self._completed
+            oldest: list[tuple[float, str]] = heapq.nsmallest(self.slowest, self._in_flight.values())
+            return ProgressSnapshot(
+                completed=self._completed,
+                failed=self._failed,
+                timed_out=self._timed_out,
+                in_flight=len(self._in_flight),
+                queued=remaining - len(self._in_flight),
+                throughput=throughput,
+                eta=remaining / throughput if throughput > 0 else None,
+                slowest=[(target, now - started) for started, target in oldest],
+            )
+
+    def __rich__(self) -> Group:
+        snapshot: ProgressSnapshot = self.snapshot()
+        summary: TyperOutputBuilder = (
+            TyperOutputBuilder()
+            .add_square()
+            .apply_bold_magenta(" Scanned: ")
+            .apply_bold_cyan(f"{snapshot.completed}/{snapshot.completed + snapshot.in_flight + snapshot.queued}")
+            .apply_bold_magenta(" in flight: ")
+            .apply_bold_cyan(str(snapshot.in_flight))
+            .apply_bold_magenta(" queued: ")
+            .apply_bold_cyan(str(snapshot.queued))
+        )
+        if snapshot.failed:
+            summary.apply_bold_magenta(" failed: ").apply_bold_red(str(snapshot.failed))
+        summary.apply_bold_magenta(" at ").apply_bold_cyan(f"{snapshot.throughput:.2f}")
+        summary.apply_bold_magenta(" targets/s, ETA: ")
+        summary.apply_bold_cyan(format_duration(snapshot.eta) if snapshot.eta is not None else "--:--")
+
+        lines: list[str] = [summary.build()]
+        lines.extend(
+            TyperOutputBuilder()
+            .apply_bold_magenta(f"      {target}")
+            .apply_cyan()
+            .add(f" running for {format_duration(running_for)}")
+            .build()
+            for target, running_for in snapshot.slowest
+        )
+        return Group(*lines)
+
+
+def format_duration(seconds: float) -> str:
+    """
+    Format a duration as minutes and seconds, or hours minutes and seconds when it is an hour or longer
+    :param seconds: the duration
+    :return: the formatted duration, e.g. 02:05 or 1:02:05
+    """
+    minutes, secs = divmod(int(seconds), 60)
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours}:{minutes:02d}:{secs:02d}" if hours else f"{minutes:02d}:{secs:02d}"
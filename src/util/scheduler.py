@@ -1,11 +1,11 @@
 import time
 from functools import partial
 
-import rich
 import schedule
 from rich.progress import Progress, BarColumn, TimeRemainingColumn, DownloadColumn, TaskProgressColumn
 
 from src.output.typer_output_builder import TyperOutputBuilder
+from src.util.display import Display
 
 
 class Scheduler:
@@ -27,50 +27,41 @@ class Scheduler:
         if not Scheduler._initialized:
             Scheduler._initialized = True
 
-    def schedule_task(
-        self, schedule_value: str, main_fn, *, host, cidr, port_scan, verbose, check, timeout, extended_port_scan
-    ):
+    def schedule_task(self, schedule_value: str, main_fn, **main_kwargs):
         """
         Schedules a task to execute a given function at a specified interval, defined
         by the schedule value. The function is executed with the provided parameters
         using Python's `schedule` library. The scheduling continues indefinitely,
-        and a visual timer bar is displayed during idle intervals.
+        and a visual timer bar is displayed during idle intervals, unless running headless.
 
         :param schedule_value: The scheduling interval, specified as a string
             (e.g., "1s" for 1 second, "2m" for 2 minutes). Specifies how often the
             task should be executed.
         :param main_fn: The main function is to be executed at the specified interval.
-        :param host: The host parameter to be passed to the `main_fn` function.
-        :param cidr: The CIDR parameter to be passed to the `main_fn` function.
-        :param port_scan: The port scanning option or parameter for the `main_fn`
-            function.
-        :param verbose: Flag indicating whether verbose output is enabled. Passed
-            to the `main_fn` function.
-        :param check: A parameter indicating the type or condition of checks to
-            perform. Passed to the `main_fn` function.
-        :param timeout: Time (in seconds or other units) to be passed to the
-            `main_fn` function for timeout purposes.
-        :param extended_port_scan: Flag or parameter indicating whether an extended
-            port scan is to be performed. Passed to the `main_fn` function.
+        :param main_kwargs: The options to pass to the `main_fn` function on every run,
+            such as the host, cidr, timeout and which scans to perform.
         :return: None
         """
 
-        schedule.every(self.get_schedule_value_in_seconds(schedule_value)).seconds.do(
-            partial(
-                main_fn,
-                host=host,
-                cidr=cidr,
-                port_scan=port_scan,
-                verbose=verbose,
-                check=check,
-                timeout=timeout,
-                extended_port_scan=extended_port_scan,
-            )
-        )
+        schedule.every(self.get_schedule_value_in_seconds(schedule_value)).seconds.do(partial(main_fn, **main_kwargs))
 
         while True:
             schedule.run_pending()
-            self.show_timer_bar(self.get_schedule_value_in_seconds(schedule_value))
+            if Display().live:
+                self.show_timer_bar(self.get_schedule_value_in_seconds(schedule_value))
+            else:
+                self.wait_for_next_run()
+
+    @staticmethod
+    def schedule_job(job, interval_seconds: int):
+        """
+        Schedules a background job, such as db maintenance, to run alongside the scheduled scans. It is run
+        by the same loop as the scans, in between them, so `schedule_task` must be called afterwards.
+        :param job: the function to run, called without any arguments
+        :param interval_seconds: how often to run the job, in seconds
+        :return: None
+        """
+        schedule.every(interval_seconds).seconds.do(job)
 
     def get_schedule_value_in_seconds(self, schedule_value: str) -> int | None:
         """
@@ -79,7 +70,7 @@ class Scheduler:
         :return: the value in seconds or nothing
         """
         if schedule_value not in self._available_schedules:
-            rich.print(
+            Display().console.print(
                 TyperOutputBuilder()
                 .add_exclamation_mark()
                 .apply_bold_red(f"Invalid schedule '{schedule_value}', must be one of: {self._available_schedules}")
@@ -93,6 +84,15 @@ class Scheduler:
             return int(schedule_value.replace("h", "")) * 60 * 60
         return None
 
+    @staticmethod
+    def wait_for_next_run() -> None:
+        """
+        Sleep until the next scheduled scan or job is due, without displaying anything
+        :return: None
+        """
+        idle_seconds: float | None = schedule.idle_seconds()
+        time.sleep(max(idle_seconds, 0) if idle_seconds is not None else 1)
+
     @staticmethod
     def show_timer_bar(duration_seconds: int, update_interval: float = 1.0):
         """
@@ -108,6 +108,7 @@ class Scheduler:
             "[progress.percentage]{task.percentage:>3.0f}%",
             TimeRemainingColumn(),
             transient=True,
+            disable=not Display().live,
         ) as progress:
             task = progress.add_task("[bold magenta] [+] Time before next scan begins:[/bold magenta]", total=steps)
             for _ in range(steps):
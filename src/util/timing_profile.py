@@ -0,0 +1,182 @@
+from __future__ import annotations
+
+import json
+import statistics
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+
+from src.data.timing_template import TimingTemplate
+from src.util.cache_file import cache_dir, write_json_atomically
+from src.util.logger import Logger
+from src.util.nmap_command_builder import TIMING_FLAGS
+
+CACHE_PATH: Path = cache_dir() / "networks.json"
+
+# Networks with a typical round trip above this are too slow for -T5, which gives up on a probe after 300ms
+SLOW_RTT_SECONDS = 0.1
+# Networks where more than this share of port scans fail or time out get more retries and longer timeouts
+LOSSY_FAILURE_RATE = 0.1
+# Largest discovery that still runs with -T5, a /24
+SMALL_NETWORK_HOSTS = 256
+MEDIUM_NETWORK_HOSTS = 4096
+# Seconds to give the port scan of a single host, before doubling on slow or lossy networks
+HOST_TIMEOUT_SECONDS: dict[str, int] = {"general": 60, "extended": 180, "full": 900}
+# Weight of the latest run in the smoothed history, like the smoothed round trip time of TCP
+SMOOTHING = 0.25
+
+
+@dataclass
+class NetworkStats:
+    """
+    What previous runs measured about a network, smoothed over the runs
+    """
+
+    # Typical round trip time of the hosts, in seconds
+    srtt: float | None = None
+    # Share of port scans that timed out, other failures such as a scan nmap refused to run aren't packet loss
+    failure_rate: float = 0.0
+    runs: int = 0
+
+    @property
+    def slow(self) -> bool:
+        return self.srtt is not None and self.srtt > SLOW_RTT_SECONDS
+
+    @property
+    def lossy(self) -> bool:
+        return self.failure_rate > LOSSY_FAILURE_RATE
+
+
+@dataclass
+class TimingProfile:
+    """
+    The timing options to run nmap with, None leaves an option to the timing template
+    """
+
+    template: TimingTemplate
+    max_retries: int | None = None
+    # Seconds
+    host_timeout: int | None = None
+    min_rate: int | None = None
+    min_hostgroup: int | None = None
+
+    @property
+    def options(self) -> dict[str, str]:
+        options: dict[str, int | str | None] = {
+            "--max-retries": self.max_retries,
+            "--host-timeout": f"{self.host_timeout}s" if self.host_timeout is not None else None,
+            "--min-rate": self.min_rate,
+            "--min-hostgroup": self.min_hostgroup,
+        }
+        return {option: str(value) for option, value in options.items() if value is not None}
+
+    def describe(self) -> str:
+        """
+        Describe the profile the way it is passed to nmap
+        :return: e.g. "-T4 --max-retries 2 --min-rate 300"
+        """
+        flags: list[str] = [TIMING_FLAGS[self.template].value]
+        flags.extend(f"{option} {value}" for option, value in self.options.items())
+        return " ".join(flags)
+
+
+def choose_profile(
+    scan_type: str, targets: int, stats: NetworkStats | None = None, template: TimingTemplate = TimingTemplate.AUTO
+) -> TimingProfile:
+    """
+    Pick the timing for a scan from the number of targets, the type of scan and what previous runs measured on
+    the network. Small, fast networks keep -T5, bigger ones trade it for -T4 with a minimum rate and host group
+    so nmap doesn't slow itself down, and slow or lossy networks get longer timeouts and more retries.
+    :param scan_type: "discovery", or the type of port scan: "general", "extended" or "full"
+    :param targets: number of addresses the command scans
+    :param stats: what previous runs measured on the network, if anything
+    :param template: a template to force, which is then used on its own
+    :return: the timing profile
+    """
+    if template != TimingTemplate.AUTO:
+        return TimingProfile(template=template)
+    stats = stats or NetworkStats()
+    if scan_type == "discovery":
+        return discovery_profile(targets, stats)
+    host_timeout: int = HOST_TIMEOUT_SECONDS.get(scan_type, HOST_TIMEOUT_SECONDS["general"])
+    return TimingProfile(
+        template=TimingTemplate.AGGRESSIVE if stats.slow or stats.lossy else TimingTemplate.INSANE,
+        max_retries=2 if stats.lossy else 1,
+        host_timeout=host_timeout * 2 if stats.slow or stats.lossy else host_timeout,
+    )
+
+
+def discovery_profile(targets: int, stats: NetworkStats) -> TimingProfile:
+    if targets <= SMALL_NETWORK_HOSTS:
+        return TimingProfile(
+            template=TimingTemplate.AGGRESSIVE if stats.slow else TimingTemplate.INSANE,
+            max_retries=2 if stats.lossy else 1,
+        )
+    return TimingProfile(
+        template=TimingTemplate.AGGRESSIVE,
+        max_retries=3 if stats.lossy else 2,
+        # Forcing a rate on a network that already drops packets only drops more
+        min_rate=None if stats.lossy else 300 if targets <= MEDIUM_NETWORK_HOSTS else 1000,
+        min_hostgroup=min(targets, 1024),
+    )
+
+
+def network_size(cidr: str, address_bits: int = 32) -> int:
+    """
+    Number of addresses covered by a prefix length
+    :param cidr: the prefix length, e.g. 24
+    :param address_bits: bits in an address, 32 for IPv4 and 128 for IPv6
+    :return: the number of addresses, 1 if the prefix length isn't a number
+    """
+    try:
+        prefix_length: int = int(cidr)
+    except ValueError:
+        return 1
+    return 2 ** (address_bits - min(max(prefix_length, 0), address_bits))
+
+
+@dataclass
+class NetworkHistory:
+    """
+    The `NetworkStats` of every network scanned, keyed by the host/cidr scanned and kept on disk between runs
+    """
+
+    cache_path: Path = CACHE_PATH
+    networks: dict[str, NetworkStats] = field(default_factory=dict)
+
+    @staticmethod
+    def load(cache_path: Path = CACHE_PATH) -> NetworkHistory:
+        try:
+            networks: dict = json.loads(cache_path.read_text(encoding="UTF-8"))
+            return NetworkHistory(cache_path, {scope: NetworkStats(**stats) for scope, stats in networks.items()})
+        except (OSError, ValueError, TypeError):
+            return NetworkHistory(cache_path)
+
+    def get(self, scope: str) -> NetworkStats | None:
+        return self.networks.get(scope)
+
+    def record(self, scope: str, rtts: list[float], completed: int = 0, timed_out: int = 0) -> NetworkHistory:
+        """
+        Fold what a run measured into the history of a network
+        :param scope: the network, as host/cidr
+        :param rtts: round trip times of the hosts found, in seconds
+        :param completed: number of port scans that finished or timed out
+        :param timed_out: number of those that timed out, on the command timeout or nmap's --host-timeout
+        :return: the history, to save
+        """
+        stats: NetworkStats = self.networks.setdefault(scope, NetworkStats())
+        if rtts:
+            rtt: float = statistics.median(rtts)
+            stats.srtt = rtt if stats.srtt is None else (1 - SMOOTHING) * stats.srtt + SMOOTHING * rtt
+        if completed:
+            failure_rate: float = timed_out / completed
+            stats.failure_rate = (
+                failure_rate if stats.runs == 0 else (1 - SMOOTHING) * stats.failure_rate + SMOOTHING * failure_rate
+            )
+        stats.runs += 1
+        return self
+
+    def save(self) -> None:
+        try:
+            write_json_atomically(self.cache_path, {scope: asdict(stats) for scope, stats in self.networks.items()})
+        except OSError as e:
+            Logger().debug(f"Failed to save the network history in {self.cache_path}: {e}")
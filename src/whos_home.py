@@ -1,19 +1,32 @@
+from __future__ import annotations
+
+import sys
 from functools import partial
-from typing import Annotated
+from itertools import chain
+from pathlib import Path
+from typing import Annotated, Iterable, Iterator, TYPE_CHECKING
 
-import schedule as scheduler
 import typer as t
 
-from src.data.command_result import CommandResult
-from src.data.nmapdevice import NmapDevice
-from src.data.executor_callback_events import ExecutorCallbackEvents
-from src.data.scan_result import ScanResult
-from src.executor.default_executor import running_as_sudo
-from src.executor.nmap_executor import NmapExecutor
-from src.output.nmap_output import format_and_output, format_and_output_from_check
-from src.parser.nmap_output_parser import NmapOutputParser
-from src.util.logger import Logger
-from src.util.scheduler import Scheduler
+from src.data.port_scanner import PortScanner
+from src.data.timing_template import TimingTemplate
+from src.output.json_output import JsonOutput, OutputFormat
+
+# Everything else is imported where it is used, so `--help` and option errors don't pay for the modules that
+# scanning, parsing, output and the db need. `benchmarks/startup_benchmark.py` measures the difference.
+if TYPE_CHECKING:
+    from src.data.nmapdevice import NmapDevice
+    from src.data.scan_result import ScanResult
+    from src.data.command_result import CommandResult
+    from src.db.service.observation_writer import ObservationWriter
+    from src.executor.nmap_executor import NmapExecutor
+    from src.util.nmap_capabilities import NmapCapabilities
+    from src.util.exclusions import ExclusionIndex
+    from src.util.hostname_resolver import HostnameLookups
+    from src.util.host_range import IPNetwork
+    from src.util.phase_timings import PhaseTimings
+    from src.util.progressive_scan import ProgressivePortScan
+    from src.util.scan_progress import ProgressSnapshot
 
 app: t.Typer = t.Typer()
 
@@ -25,92 +38,527 @@ app: t.Typer = t.Typer()
     short_help="Scan for details about your network",
 )
 def main(
-    host: Annotated[str, t.Argument(help="The host that you want to scan against.")],
+    host: Annotated[str, t.Argument(help="The host that you want to scan against.", show_default=False)] = "",
     cidr: Annotated[str, t.Option(help="The CIDR of the host that you want to scan against.")] = "24",
     schedule: Annotated[
-        str, t.Option(help="Run scans on a schedule of any of these values: 5m, 15m, 30m, 45m, 1h")
+        str,
+        t.Option(
+            help="Run scans on a schedule of any of these values: 5m, 15m, 30m, 45m, 1h", callback=validate_schedule
+        ),
+    ] = "",
+    host_range: Annotated[
+        str,
+        t.Option(
+            help="Run scans against ranges, networks and addresses, e.g. 10.0.0.5-10.0.3.200,192.168.1.0/24 or "
+            "fd00::1-fd00::ff. They are merged into the fewest networks that cover them, and scanned as well as "
+            "the host.",
+            callback=validate_host_range,
+        ),
+    ] = "",
+    exclude: Annotated[
+        str,
+        t.Option(
+            help="Never scan these ranges, networks and addresses, e.g. fragile devices such as PLCs and printers. "
+            "Taken in the same form as --host-range.",
+            callback=validate_targets,
+        ),
     ] = "",
-    host_range: Annotated[str, t.Option(help="Run scans against a range of IPs.")] = "",
-    only_icmp: Annotated[bool, t.Option(help="Run scans with just an ICMP packet")] = not running_as_sudo(),
+    exclude_file: Annotated[
+        Path | None,
+        t.Option(help="Never scan the ranges, networks and addresses in this file, any number per line."),
+    ] = None,
+    only_icmp: Annotated[
+        bool | None,
+        t.Option(help="Run scans with just an ICMP packet, the default when not running as root", show_default=False),
+    ] = None,
     only_arp: Annotated[bool, t.Option(help="Run scans with just an ARP packet")] = False,
-    icmp_and_arp: Annotated[bool, t.Option(help="Run scans with just an ICMP and ARP packet")] = running_as_sudo(),
+    icmp_and_arp: Annotated[
+        bool | None,
+        t.Option(
+            help="Run scans with just an ICMP and ARP packet, the default when running as root", show_default=False
+        ),
+    ] = None,
     port_scan: Annotated[bool, t.Option(help="Run a port scan against discovered hosts")] = False,
     verbose: Annotated[bool, t.Option(help="Verbose output when invoking nmap scans")] = False,
     check: Annotated[bool, t.Option(help="Check if nmap installation is working")] = False,
     timeout: Annotated[int, t.Option(help="Control the duration of the command execution")] = 60,
     extended_port_scan: Annotated[bool, t.Option(help="Scan more ports (1000) than the default port scan.")] = False,
     full_port_scan: Annotated[bool, t.Option(help="Scan all ports.")] = False,
+    persist: Annotated[bool, t.Option(help="Save the devices seen by each scan to the database.")] = False,
+    retention_days: Annotated[
+        float, t.Option(help="Days to keep every saved scan for, before compacting them into presence history.")
+    ] = 7,
+    output: Annotated[
+        OutputFormat, t.Option(help="Output format, json and jsonl are plain records for other programs to read.")
+    ] = OutputFormat.TEXT,
+    headless: Annotated[
+        bool,
+        t.Option(help="Don't render spinners or the timer bar, the default when the output is not a terminal."),
+    ] = False,
+    diff: Annotated[
+        bool, t.Option(help="Only show the devices and ports that changed since the previous scheduled scan.")
+    ] = False,
+    scanner: Annotated[
+        PortScanner,
+        t.Option(
+            help="Scanner for the port scan and full port scan, connect finds open ports with plain TCP connects "
+            "but can't detect services or the OS. The extended port scan always uses nmap."
+        ),
+    ] = PortScanner.NMAP,
+    progressive: Annotated[
+        bool,
+        t.Option(
+            help="When more than one nmap port scan is requested, run them as stages of one scan, each only "
+            "scanning the ports the stages before it didn't."
+        ),
+    ] = True,
+    fingerprint_max_age: Annotated[
+        float,
+        t.Option(
+            help="Days to reuse the OS and services found on a device for, port scans of devices fingerprinted "
+            "since skip OS detection and only run light version detection. 0 fingerprints every scan."
+        ),
+    ] = 7,
+    resolve_hostnames: Annotated[
+        bool,
+        t.Option(
+            help="Look up the hostnames of the devices found in the background, while they are port scanned. "
+            "--no-resolve-hostnames never waits on DNS.",
+        ),
+    ] = True,
+    nmap_path: Annotated[
+        str,
+        t.Option(
+            help="Name or path of the nmap binary to run, e.g. benchmarks/fake_nmap.py to replay recorded or "
+            "generated scans without a network.",
+            envvar="WHOS_HOME_NMAP",
+        ),
+    ] = "nmap",
+    timing: Annotated[
+        TimingTemplate,
+        t.Option(
+            help="nmap timing template to use for every scan, auto picks the timing from the size of the network "
+            "and how it responded to previous scans."
+        ),
+    ] = TimingTemplate.AUTO,
 ) -> None:
     """
     Discover hosts on the network using nmap
     """
-    hosts = parse_hosts(host)
-    for host in hosts:
-        executor: NmapExecutor = NmapExecutor(host=host, cidr=cidr, timeout=timeout)
-        result_from_host_discovery: CommandResult = execute_host_discovery_based_on_flag(
-            only_arp, only_icmp, icmp_and_arp, executor
-        )
+    from src.db.service.observation_writer import ObservationWriter
+    from src.executor.default_executor import running_as_sudo
+    from src.executor.nmap_executor import NmapExecutor
+    from src.parser.nmap_output_parser import NmapOutputParser
+    from src.util.device_merge import DeviceMerger
+    from src.util.logger import Logger
+    from src.util.nmap_capabilities import probe_nmap
+    from src.util.phase_timings import PhaseTimings
+    from src.util.timing_profile import NetworkHistory
+
+    if not host and not host_range:
+        raise t.BadParameter("Provide a host to scan, or ranges with --host-range", param_hint="HOST")
+
+    # Cached until nmap is reinstalled, so this only runs nmap the first time
+    capabilities: NmapCapabilities = probe_nmap(nmap_path)
+    # Worked out here rather than as option defaults, so they aren't worked out on every import. ICMP and ARP
+    # discovery finds more hosts, faster, but needs raw packets, either as root or through CAP_NET_RAW
+    raw_packets: bool = running_as_sudo() or capabilities.cap_net_raw
+    only_icmp = not raw_packets if only_icmp is None else only_icmp
+    icmp_and_arp = raw_packets if icmp_and_arp is None else icmp_and_arp
 
-        if schedule != "" or None:
-            Scheduler().schedule_task(
-                schedule_value=schedule,
-                main_fn=main,
-                host=host,
-                cidr=cidr,
+    configure_output(output, headless)
+    writer: ObservationWriter | None = ObservationWriter().start() if persist else None
+    # Round trip times and timed out port scans of the networks scanned before, to pick the timing of the next scan
+    network_history: NetworkHistory = NetworkHistory.load()
+    exclusions: ExclusionIndex = load_exclusions(exclude, exclude_file)
+    targets: list[tuple[str, str]] = list(scan_targets(host, cidr, host_range, exclusions))
+    # Devices found by the scans before, so one found again by an overlapping scan is only output once
+    device_merger = DeviceMerger()
+    try:
+        for target_host, target_cidr in targets:
+            scope: str = f"{target_host}/{target_cidr}"
+            executor: NmapExecutor = NmapExecutor(
+                host=target_host,
+                cidr=target_cidr,
                 timeout=timeout,
-                verbose=verbose,
-                check=check,
-                port_scan=port_scan,
-                extended_port_scan=extended_port_scan,
+                capabilities=capabilities,
+                timing=timing,
+                network=network_history.get(scope),
+                exclusions=exclusions,
+                nmap=nmap_path,
             )
+            timings = PhaseTimings(details={"discovery timing": executor.discovery_profile.describe()})
+            with timings.phase("sweep"):
+                result_from_host_discovery: CommandResult = execute_host_discovery_based_on_flag(
+                    only_arp, only_icmp, icmp_and_arp, executor
+                )
+
+            if verbose:
+                Logger().enable()
+
+            if check:
+                output_nmap_check(capabilities)
+
+            if result_from_host_discovery.success:
+                outputted_scan_result: ScanResult = NmapOutputParser(result_from_host_discovery).create_scan_result()
+                outputted_devices: list[NmapDevice] = device_merger.merge(outputted_scan_result.get_devices())
+                hostname_lookups: HostnameLookups | None = output_host_discovery_and_hostnames(
+                    outputted_scan_result, outputted_devices, diff, scope, timings, resolve_hostnames
+                )
+
+                if writer is not None:
+                    for device in outputted_devices:
+                        writer.submit(device)
+
+                completed, timed_out = perform_port_scans(
+                    {"general": port_scan, "extended": extended_port_scan, "full": full_port_scan},
+                    outputted_devices,
+                    executor,
+                    timings,
+                    writer,
+                    diff,
+                    scanner,
+                    fingerprint_max_age,
+                    progressive,
+                )
+                network_history.record(scope, outputted_scan_result.get_round_trip_times(), completed, timed_out).save()
+                output_resolved_hostnames(hostname_lookups, timings, writer)
+
+                if not diff:
+                    output_phase_timings(timings)
+    finally:
+        if writer is not None:
+            writer.close()
+        JsonOutput().finish()
+
+    if schedule:
+        # Every later pass is a run of its own over all of the targets, so it is given the options as they were
+        # passed rather than a single target
+        schedule_scans(
+            schedule,
+            host=host,
+            cidr=cidr,
+            host_range=host_range,
+            exclude=exclude,
+            exclude_file=exclude_file,
+            only_icmp=only_icmp,
+            only_arp=only_arp,
+            icmp_and_arp=icmp_and_arp,
+            timeout=timeout,
+            verbose=verbose,
+            check=check,
+            port_scan=port_scan,
+            extended_port_scan=extended_port_scan,
+            full_port_scan=full_port_scan,
+            persist=persist,
+            retention_days=retention_days,
+            output=output,
+            headless=headless,
+            diff=diff,
+            scanner=scanner,
+            timing=timing,
+            fingerprint_max_age=fingerprint_max_age,
+            progressive=progressive,
+            resolve_hostnames=resolve_hostnames,
+            nmap_path=nmap_path,
+        )
+
+
+def schedule_scans(schedule: str, **main_kwargs) -> None:
+    """
+    Run the scan again on a schedule, along with compacting the saved scans when they are being saved. Never returns.
+    :param schedule: how often to scan, e.g. 15m
+    :param main_kwargs: the options to run `main` with on every pass
+    :return: None
+    """
+    from src.util.scheduler import Scheduler
+
+    if main_kwargs["persist"]:
+        Scheduler().schedule_job(
+            partial(
+                compact_presence_history,
+                main_kwargs["retention_days"],
+                Scheduler().get_schedule_value_in_seconds(schedule),
+            ),
+            interval_seconds=60 * 60,
+        )
+    Scheduler().schedule_task(schedule_value=schedule, main_fn=main, **main_kwargs)
+
+
+def configure_output(output: OutputFormat, headless: bool) -> None:
+    """
+    Set up the output format, and whether spinners and the timer bar are rendered
+    :param output: the output format
+    :param headless: whether to render nothing live, which is also the case when the output is not a terminal
+    :return: None
+    """
+    from src.util.display import Display
 
-        if verbose:
-            Logger().enable()
+    JsonOutput().set_format(output)
+    if JsonOutput().enabled:
+        Display().enable_machine_output()
+    if headless or not sys.stdout.isatty():
+        Display().enable_headless()
 
-        if check:
-            results_from_check: CommandResult = executor.execute_version_command()
-            format_and_output_from_check(command_result=results_from_check)
 
-        if result_from_host_discovery.success:
-            parser: NmapOutputParser = NmapOutputParser(result_from_host_discovery)
-            outputted_scan_result: ScanResult = parser.create_scan_result()
-            outputted_devices: list[NmapDevice] = outputted_scan_result.get_devices()
-            format_and_output(scan_result=outputted_scan_result, devices=outputted_devices)
+def output_nmap_check(capabilities: NmapCapabilities) -> None:
+    """
+    Output the nmap version found by the capability probe, and whether host discovery can send raw packets
+    :param capabilities: what the installed nmap can do
+    :return: None
+    """
+    from src.executor.default_executor import running_as_sudo
+    from src.output.json_output import output_nmap_capabilities
+    from src.output.nmap_output import format_and_output_capabilities
+
+    if JsonOutput().enabled:
+        output_nmap_capabilities(capabilities, privileged=running_as_sudo())
+    else:
+        format_and_output_capabilities(capabilities, privileged=running_as_sudo())
+
+
+def output_host_discovery(scan_result: ScanResult, devices: list[NmapDevice], diff: bool, scope: str) -> None:
+    """
+    Output the devices found by host discovery, or only what changed since the previous scan in diff mode.
+    The first scan in diff mode has nothing to compare against, so outputs every device.
+    :param scan_result: the result of host discovery
+    :param devices: the devices found
+    :param diff: whether to only output the changes
+    :param scope: what was scanned, the previous scan of the same scope is compared against
+    :return: None
+    """
+    from src.output.json_output import output_devices, output_diff
+    from src.output.nmap_output import format_and_output, format_and_output_diff
+    from src.util.device_diff import DeviceDiff, DeviceDiffer
+
+    device_diff: DeviceDiff | None = DeviceDiffer().diff(devices, scope) if diff else None
+    if device_diff is not None and not device_diff.first_scan:
+        if JsonOutput().enabled:
+            output_diff(device_diff)
+        else:
+            format_and_output_diff(device_diff)
+    elif JsonOutput().enabled:
+        output_devices(
+            devices,
+            hosts_up=scan_result.get_hosts_up_from_runstats(),
+            total_hosts=scan_result.get_total_hosts_from_runstats(),
+        )
+    else:
+        format_and_output(scan_result=scan_result, devices=devices)
 
-            if port_scan:
-                perform_port_scan("general", outputted_devices, executor)
 
-            if extended_port_scan:
-                perform_port_scan("extended", outputted_devices, executor)
+def output_host_discovery_and_hostnames(
+    scan_result: ScanResult,
+    devices: list[NmapDevice],
+    diff: bool,
+    scope: str,
+    timings: PhaseTimings,
+    resolve_hostnames: bool = True,
+) -> HostnameLookups | None:
+    """
+    Output the devices found by the ping sweep straight away, with the hostnames that are cached, and start looking
+    up the rest in the background, so the port scans don't wait on DNS. In diff mode only the changes are output,
+    so the hostnames are looked up first.
+    :param scan_result: the result of host discovery
+    :param devices: the devices found
+    :param diff: whether to only output the changes
+    :param scope: what was scanned, the previous scan of the same scope is compared against
+    :param timings: the timings to add the output and hostname phases to
+    :param resolve_hostnames: whether to look up hostnames at all
+    :return: the lookups still running, to output with `output_resolved_hostnames`, or None
+    """
+    from src.util.hostname_resolver import HostnameResolver
+
+    resolver: HostnameResolver | None = HostnameResolver() if resolve_hostnames else None
+    if diff and resolver is not None:
+        with timings.phase("hostnames"):
+            resolver.resolve(devices)
+        resolver = None
+
+    with timings.phase("output"):
+        if resolver is not None:
+            resolver.fill_cached(devices)
+        output_host_discovery(scan_result, devices, diff, scope)
+    return resolver.start(devices) if resolver is not None else None
+
+
+def output_resolved_hostnames(
+    lookups: HostnameLookups | None, timings: PhaseTimings, writer: ObservationWriter | None
+) -> None:
+    """
+    Wait for the hostname lookups started after host discovery, and output the hostnames they found. They are
+    output here, on the main thread, rather than as they are found, so they never interleave with other output.
+    :param lookups: the lookups, None if none were started
+    :param timings: the timings to add the time spent waiting on the lookups to
+    :param writer: the writer to record the devices with their hostnames, if they are being saved
+    :return: None
+    """
+    from src.output.json_output import output_hostname
+    from src.output.nmap_output import format_and_output_hostname
+
+    if lookups is None:
+        return
+    with timings.phase("hostnames"):
+        resolved: list[NmapDevice] = lookups.join()
+    for device in resolved:
+        if JsonOutput().enabled:
+            output_hostname(device)
+        else:
+            format_and_output_hostname(device)
+        if writer is not None:
+            # Seen by discovery before its hostname was known, so recorded again with it
+            writer.submit(device)
+
+
+def output_phase_timings(timings: PhaseTimings) -> None:
+    """
+    Output how long each phase of the scan took
+    :param timings: the timings of the phases
+    :return: None
+    """
+    from src.output.json_output import output_phase_timings as output_json_phase_timings
+    from src.output.nmap_output import format_and_output_phase_timings
 
-            if full_port_scan:
-                perform_port_scan("full", outputted_devices, executor)
+    if JsonOutput().enabled:
+        output_json_phase_timings(timings)
+    else:
+        format_and_output_phase_timings(timings)
 
 
-def perform_port_scan(scan_type: str, devices: list, executor):
+def perform_port_scans(
+    scan_types: dict[str, bool],
+    devices: list[NmapDevice],
+    executor: NmapExecutor,
+    timings: PhaseTimings,
+    writer: ObservationWriter | None = None,
+    diff: bool = False,
+    scanner: PortScanner = PortScanner.NMAP,
+    fingerprint_max_age: float = 7,
+    progressive: bool = True,
+) -> tuple[int, int]:
+    """
+    Run each type of port scan requested against the devices, timing each one as a phase
+    :param scan_types: whether each type of port scan was requested, "general", "extended" and "full"
+    :param devices: the devices to scan
+    :param executor: the executor to use for the scans
+    :param timings: the timings to add a phase and the nmap timing used to for each scan
+    :param writer: the writer to record the devices seen with, if they are being saved
+    :param diff: only output the ports that changed since the previous port scan of each device
+    :param scanner: the scanner to use, the extended scan always uses nmap
+    :param fingerprint_max_age: days to reuse the OS and services found on a device for
+    :param progressive: run more than one nmap port scan as stages that never scan a port twice
+    :return: the number of port scans that finished or timed out, and how many of those timed out
+    """
+    from src.util.progress_service import ProgressService
+    from src.util.progressive_scan import port_scan_stages
+
+    if executor.exclusions:
+        # Discovery already skips them, this makes sure no port scan can reach one either
+        devices = [device for device in devices if not executor.exclusions.contains(device.ip_addr)]
+    progress: list[ProgressSnapshot] = []
+    # The connect scanner is fast enough on its own, and can't leave out the ports nmap scanned
+    for scan_type, stage in port_scan_stages(scan_types, progressive and scanner == PortScanner.NMAP):
+        with timings.phase(f"{scan_type} port scan"):
+            perform_port_scan(scan_type, devices, executor, writer, diff, scanner, fingerprint_max_age, stage)
+        timings.details[f"{scan_type} port scan timing"] = executor.port_scan_profile(scan_type).describe()
+        progress.append(ProgressService().progress.snapshot())
+    return sum(snapshot.measured for snapshot in progress), sum(snapshot.timed_out for snapshot in progress)
+
+
+def perform_port_scan(
+    scan_type: str,
+    devices: list,
+    executor,
+    writer: ObservationWriter | None = None,
+    diff: bool = False,
+    scanner: PortScanner = PortScanner.NMAP,
+    fingerprint_max_age: float = 7,
+    progressive: ProgressivePortScan | None = None,
+):
     """
     Performs a port scan on the devices using the specified scan type.
     :param scan_type: The type of scan to perform. Can be "general", "extended", or "full".
     :param devices: The devices to scan.
     :param executor: The executor to use for the scan.
+    :param writer: The writer to record the devices seen with, if they are being saved.
+    :param diff: Only output the ports that changed since the previous port scan of each device.
+    :param scanner: The scanner to use, the extended scan always uses nmap.
+    :param fingerprint_max_age: Days to reuse the OS and services found on a device for, instead of detecting them.
+    :param progressive: The progressive scan this is a stage of, if the port scans are run as one.
     :return: None
     """
+    from src.data.executor_callback_events import ExecutorCallbackEvents
+    from src.executor.result_consumer import ResultConsumer
+    from src.util.fingerprint_cache import FingerprintCache
+    from src.util.logger import Logger
+
     Logger().debug("Beginning port scan....")
-    ips: list[str] = [device.ip_addr for device in devices]
-    callbacks = ExecutorCallbackEvents(
-        ExecutorCallbackEvents.pre_execution_callback,
-        ExecutorCallbackEvents.post_execution_callback,
-    )
+    if scanner == PortScanner.CONNECT and scan_type in ("general", "full"):
+        perform_connect_scan(scan_type, devices, writer, diff)
+        return
 
-    scan_methods = {
+    scan_method = {
         "general": executor.execute_general_port_scan,
         "extended": executor.execute_extended_port_scan,
         "full": executor.execute_full_port_scan,
-    }
-
-    scan_method = scan_methods.get(scan_type)
+    }.get(scan_type)
     if scan_method:
-        scan_method(ips, callbacks)
+        # Devices fingerprinted recently are scanned without OS detection, with what was found then merged in
+        fingerprints = FingerprintCache(max_age=fingerprint_max_age * 24 * 60 * 60)
+        # Results are parsed, output and saved on a single consumer thread, in the order the scans finish
+        with ResultConsumer(
+            partial(
+                ExecutorCallbackEvents.handle_port_scan_result,
+                writer=writer,
+                diff=diff,
+                fingerprints=fingerprints,
+                progressive=progressive,
+            )
+        ) as consumer:
+            scan_method(
+                [device.ip_addr for device in devices],
+                ExecutorCallbackEvents(
+                    ExecutorCallbackEvents.pre_execution_callback,
+                    partial(ExecutorCallbackEvents.post_execution_callback, consumer=consumer),
+                ),
+                # A later stage scans other ports than the scan on its own, so is fingerprinted separately
+                fingerprints.plan(
+                    devices, scan_type if progressive is None or progressive.os_detection else f"remaining {scan_type}"
+                ),
+                progressive.exclude_ports if progressive is not None else None,
+                progressive is None or progressive.os_detection,
+            )
+        fingerprints.save()
+
+
+def perform_connect_scan(scan_type: str, devices: list, writer: ObservationWriter | None, diff: bool) -> None:
+    """
+    Port scan the devices with TCP connects, instead of running nmap for each of them
+    :param scan_type: The type of scan to perform. Can be "general" for the top 100 ports, or "full" for all ports.
+    :param devices: The devices to scan.
+    :param writer: The writer to record the devices seen with, if they are being saved.
+    :param diff: Only output the ports that changed since the previous port scan of each device.
+    :return: None
+    """
+    from src.data.executor_callback_events import ExecutorCallbackEvents
+    from src.executor.connect_scanner import ConnectScanner
+
+    connect_scanner = ConnectScanner(ports=list(range(1, 65536)) if scan_type == "full" else None)
+    connect_scanner.scan(devices, partial(ExecutorCallbackEvents.handle_port_scan_device, writer=writer, diff=diff))
+
+
+def compact_presence_history(retention_days: float, schedule_seconds: int) -> None:
+    """
+    Compact the saved scans that are older than the retention period into presence history. Runs a bounded
+    number of chunks each time, so it never holds up the next scheduled scan for long.
+    :param retention_days: days to keep every saved scan for
+    :param schedule_seconds: seconds between scheduled scans, a device missing from two scans in a row has left
+    :return: None
+    """
+    from src.db.service.retention_engine import RetentionEngine, RetentionPolicy
+
+    policy = RetentionPolicy(raw_retention_days=retention_days, max_gap_seconds=2 * schedule_seconds)
+    RetentionEngine(policy).compact(max_chunks=20)
 
 
 def execute_host_discovery_based_on_flag(
@@ -124,6 +572,8 @@ def execute_host_discovery_based_on_flag(
     :param icmp_and_arp: will run both ICMP and ARP scans
     :return: the command result after command execution
     """
+    from src.util.logger import Logger
+
     if only_arp and only_icmp or icmp_and_arp:
         Logger().debug("Running nmap with both arp and icmp...")
         return executor.execute_arp_icmp_host_discovery()
@@ -131,6 +581,126 @@ def execute_host_discovery_based_on_flag(
     return executor.execute_arp_host_discovery() if only_arp else executor.execute_icmp_host_discovery()
 
 
+def validate_schedule(schedule: str) -> str:
+    """
+    Check --schedule is one the scheduler knows, before the first pass rather than after it
+    :param schedule: the schedule given
+    :return: the schedule, unchanged
+    """
+    if schedule:
+        from src.util.scheduler import Scheduler
+
+        # Outputs the schedules it knows and exits on any other
+        Scheduler().get_schedule_value_in_seconds(schedule)
+    return schedule
+
+
+def validate_targets(targets: str) -> str:
+    """
+    Check every range in --host-range or --exclude parses, before anything is scanned
+    :param targets: the ranges given
+    :return: the ranges, unchanged
+    :raises typer.BadParameter: when a range isn't valid
+    """
+    if not targets:
+        return targets
+    from src.util.host_range import coalesce, parse_targets
+
+    try:
+        coalesce(parse_targets(targets))
+    except ValueError as e:
+        raise t.BadParameter(str(e)) from e
+    return targets
+
+
+def validate_host_range(host_range: str) -> str:
+    """
+    Check every range in --host-range parses, and that they can be scanned in a sane number of nmap runs
+    :param host_range: the ranges given
+    :return: the ranges, unchanged
+    :raises typer.BadParameter: when a range isn't valid or the ranges are too large to scan
+    """
+    if not host_range:
+        return host_range
+    from src.util.host_range import check_shard_count, parse_targets
+
+    try:
+        check_shard_count(parse_targets(host_range))
+    except ValueError as e:
+        raise t.BadParameter(str(e)) from e
+    return host_range
+
+
+def load_exclusions(exclude: str, exclude_file: Path | None) -> ExclusionIndex:
+    """
+    Build the index of every address excluded from scanning
+    :param exclude: the ranges given with --exclude
+    :param exclude_file: the file given with --exclude-file, if any
+    :return: the index
+    :raises typer.BadParameter: when the file can't be read or an exclusion in it isn't valid
+    """
+    from src.util.exclusions import load_exclusions as load_exclusion_index
+    from src.util.logger import Logger
+
+    try:
+        exclusions: ExclusionIndex = load_exclusion_index(exclude, exclude_file)
+    except (OSError, ValueError) as e:
+        raise t.BadParameter(str(e), param_hint="--exclude-file") from e
+    Logger().debug(f"Excluding {len(exclusions)} ranges of addresses from every scan")
+    return exclusions
+
+
+def scan_targets(
+    host: str, cidr: str, host_range: str, exclusions: ExclusionIndex | None = None
+) -> Iterator[tuple[str, str]]:
+    """
+    The host and cidr of each scan to run. The hosts given with the cidr and the ranges are merged into the fewest
+    networks that cover them, so overlapping hosts, e.g. 10.0.0.0 and 10.0.0.128 with a cidr of 24, are scanned
+    once as 10.0.0.0/24. Hostnames can't be merged, so are scanned as given, before the networks. The networks are
+    expanded as they are scanned, so a large range is never held in memory.
+    :param host: the hosts given, separated by spaces
+    :param cidr: the cidr to scan the hosts with
+    :param host_range: the ranges given, as taken by `src.util.host_range.parse_targets`
+    :param exclusions: addresses not to scan, blocks that are entirely excluded are skipped
+    :return: the host and cidr of each scan
+    :raises typer.BadParameter: when the networks would take too many nmap runs to scan
+    """
+    from src.util.host_range import IPNetwork, expand_networks, parse_targets, target_network
+    from src.util.logger import Logger
+
+    hostnames: list[str] = []
+    networks: list[IPNetwork] = []
+    for target in parse_hosts(host) if host else []:
+        network: IPNetwork | None = target_network(target, cidr)
+        if network is not None:
+            networks.append(network)
+        elif target:
+            hostnames.append(target)
+    # Checked before anything is scanned, a host with a small cidr can be as large as any range
+    networks = check_scan_size(chain(networks, parse_targets(host_range)))
+    yield from ((hostname, cidr) for hostname in hostnames)
+    for target_host, target_cidr in expand_networks(networks):
+        if exclusions and exclusions.covers(target_network(target_host, target_cidr)):
+            Logger().debug(f"Skipping {target_host}/{target_cidr}, every address in it is excluded")
+            continue
+        yield target_host, target_cidr
+
+
+def check_scan_size(networks: Iterable[IPNetwork]) -> list[IPNetwork]:
+    """
+    Check the networks to scan can be scanned in a sane number of nmap runs
+    :param networks: the networks of the hosts and the ranges given
+    :return: the networks, merged
+    :raises typer.BadParameter: when they would take too many runs
+    """
+    from src.util.host_range import check_shard_count
+
+    try:
+        return check_shard_count(networks)
+    except ValueError as e:
+        raise t.BadParameter(str(e), param_hint="HOST, --cidr or --host-range") from e
+
+
 def parse_hosts(host: str) -> list[str]:
     """
     Check the host given in the command line and return a list of hosts. If only one host is given, returns a list of one host. If there were multiple hosts, it will return a list of those hosts.
@@ -0,0 +1,105 @@
+import sqlite3
+
+import pytest
+
+from src.db import db_connector
+from src.db.db_connector import DatabaseConnector, available_migrations, SCHEMA_VERSION
+
+BASELINE_SCHEMA = """
+CREATE TABLE users (id INTEGER PRIMARY KEY AUTOINCREMENT, name VARCHAR(128) NOT NULL);
+CREATE TABLE devices (
+  id INTEGER PRIMARY KEY AUTOINCREMENT,
+  device_name VARCHAR(128) NOT NULL,
+  owned_by INTEGER,
+  FOREIGN KEY (owned_by) REFERENCES devices(id)
+);
+"""
+
+
+@pytest.fixture
+def db_path(tmp_path, monkeypatch):
+    path = str(tmp_path / "database.db")
+    monkeypatch.setattr("src.db.db_connector.DB_PATH", path)
+    return path
+
+
+@pytest.fixture
+def traced_statements(monkeypatch):
+    statements: list[str] = []
+    connect = sqlite3.connect
+
+    def traced_connect(*args, **kwargs):
+        connection = connect(*args, **kwargs)
+        connection.set_trace_callback(statements.append)
+        return connection
+
+    monkeypatch.setattr("src.db.db_connector.sqlite3.connect", traced_connect)
+    return statements
+
+
+def connect() -> DatabaseConnector:
+    connector = DatabaseConnector()
+    connector.connect()
+    return connector
+
+
+def test_schema_version_matches_newest_migration():
+    assert available_migrations()[-1][0] == SCHEMA_VERSION
+
+
+def test_new_database_is_migrated_to_latest_version(db_path):
+    connector = connect()
+
+    assert connector.find_one("PRAGMA user_version;")[0] == SCHEMA_VERSION
+    assert connector.find_one("PRAGMA auto_vacuum;")[0] == 2
+    tables = {row[0] for row in connector.find_all("SELECT name FROM sqlite_master WHERE type = 'table';")}
+    assert {"users", "devices", "observations", "presence_intervals"} <= tables
+
+
+def test_current_database_only_reads_user_version(db_path, traced_statements):
+    connect().close()
+    traced_statements.clear()
+
+    connect()
+
+    assert traced_statements == ["PRAGMA user_version;"]
+
+
+def test_baseline_database_is_upgraded_keeping_its_data(db_path):
+    with sqlite3.connect(db_path) as connection:
+        connection.executescript(BASELINE_SCHEMA)
+        connection.execute("INSERT INTO devices (device_name, owned_by) VALUES ('tv', NULL);")
+
+    connector = connect()
+
+    assert connector.find_one("PRAGMA user_version;")[0] == SCHEMA_VERSION
+    assert tuple(connector.find_one("SELECT device_name, mac_addr FROM devices;")) == ("tv", None)
+
+
+def test_failed_migration_is_rolled_back(db_path, tmp_path, monkeypatch):
+    migrations = tmp_path / "migrations"
+    migrations.mkdir()
+    (migrations / "0001_create_users.sql").write_text("CREATE TABLE users (id INTEGER PRIMARY KEY);\n")
+    (migrations / "0002_broken.sql").write_text("CREATE TABLE pets (id INTEGER PRIMARY KEY);\nNOT SQL;\n")
+    monkeypatch.setattr(db_connector, "MIGRATIONS_DIR", str(migrations))
+    monkeypatch.setattr(db_connector, "SCHEMA_VERSION", 2)
+
+    with pytest.raises(sqlite3.Error):
+        connect()
+
+    with sqlite3.connect(db_path) as connection:
+        assert connection.execute("PRAGMA user_version;").fetchone()[0] == 0
+        assert connection.execute("SELECT name FROM sqlite_master WHERE type = 'table';").fetchall() == []
+
+
+def test_transaction_is_rolled_back_when_the_block_raises(db_path):
+    connector = connect()
+
+    with pytest.raises(ValueError):
+        with connector.transaction() as connection:
+            connection.execute("INSERT INTO users (name) VALUES ('half done');")
+            raise ValueError("not a sqlite error")
+    # Commits, so would save the insert above if the transaction had been left open
+    connector.insert("INSERT INTO users (name) VALUES (?);", ("next",))
+
+    assert [row[0] for row in connector.find_all("SELECT name FROM users;")] == ["next"]
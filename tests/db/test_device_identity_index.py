@@ -0,0 +1,77 @@
+import pytest
+
+from src.data.nmapdevice import NmapDevice
+from src.db.data.device import Device
+from src.db.data.user import User
+from src.db.service.device_identity_index import DeviceIdentityIndex
+from src.db.service.device_service import DeviceService
+from src.db.service.user_service import UserService
+from src.util.mac_address import normalize_mac
+
+
+@pytest.fixture(autouse=True)
+def index(tmp_path, monkeypatch):
+    monkeypatch.setattr("src.db.db_connector.DB_PATH", str(tmp_path / "database.db"))
+    DeviceIdentityIndex().invalidate()
+    yield DeviceIdentityIndex()
+    DeviceIdentityIndex().invalidate()
+
+
+def scan_hit(ip_addr: str, mac_addr: str | None = None, hostname: str | None = None) -> NmapDevice:
+    return NmapDevice(hostname=hostname, ip_addr=ip_addr, mac_addr=mac_addr, os=None, ports=None)
+
+
+def test_normalize_mac():
+    assert normalize_mac("aa-bb-cc-dd-ee-ff") == "AA:BB:CC:DD:EE:FF"
+    assert normalize_mac("AA:BB:CC:DD:EE:FF | Apple") == "AA:BB:CC:DD:EE:FF"
+    assert normalize_mac("not a mac") is None
+    assert normalize_mac(None) is None
+
+
+def test_resolve_known_devices_and_owners(index):
+    owner_id = UserService().create(User(id=None, name="alice"))
+    DeviceService().create(Device(id=None, device_name="phone", owned_by=owner_id, mac_addr="AA:BB:CC:DD:EE:FF"))
+    DeviceService().create(Device(id=None, device_name="tv", owned_by=None, ip_addr="192.168.0.9", hostname="tv"))
+
+    phone, tv, unknown = index.resolve_all(
+        [
+            scan_hit("192.168.0.2", "aa:bb:cc:dd:ee:ff | Apple"),
+            scan_hit("192.168.0.9", hostname="tv"),
+            scan_hit("192.168.0.10", "11:22:33:44:55:66 | (Unknown Vendor)"),
+        ]
+    )
+
+    assert phone.device_name == "phone"
+    assert index.owner_of(phone).name == "alice"
+    assert tv.device_name == "tv"
+    assert index.owner_of(tv) is None
+    assert unknown is None
+
+
+def test_learn_writes_through_and_survives_reload(index):
+    learned = index.learn(scan_hit("192.168.0.2", "AA:BB:CC:DD:EE:FF | Apple", "laptop"))
+    moved = index.learn(scan_hit("192.168.0.3", "AA:BB:CC:DD:EE:FF | Apple", "laptop"))
+
+    assert learned.id == moved.id
+    assert len(index) == 1
+
+    index.invalidate()
+    assert DeviceService().read(learned.id).ip_addr == "192.168.0.3"
+    assert index.resolve(scan_hit("192.168.0.3", "AA:BB:CC:DD:EE:FF")).id == learned.id
+
+
+def test_learn_upgrades_device_first_seen_without_mac(index):
+    first = index.learn(scan_hit("192.168.0.4", hostname="printer"))
+    upgraded = index.learn(scan_hit("192.168.0.4", "AA:BB:CC:00:00:01 | HP", "printer"))
+
+    assert first.id == upgraded.id
+    assert upgraded.mac_addr == "AA:BB:CC:00:00:01"
+    assert index.resolve(scan_hit("192.168.0.99", "AA:BB:CC:00:00:01")).id == first.id
+
+
+def test_remove_invalidates_device(index):
+    device = index.learn(scan_hit("192.168.0.2", "AA:BB:CC:DD:EE:FF"))
+    index.remove(device.id)
+
+    assert index.resolve(scan_hit("192.168.0.2", "AA:BB:CC:DD:EE:FF")) is None
+    assert not DeviceService().exists(device.id)
@@ -0,0 +1,55 @@
+import pytest
+
+from src.db.data.device import Device
+from src.db.data.user import User
+from src.db.service.device_service import DeviceService
+from src.db.service.entity_service import compile_statements
+from src.db.service.user_service import UserService
+
+
+@pytest.fixture(autouse=True)
+def test_db(tmp_path, monkeypatch):
+    monkeypatch.setattr("src.db.db_connector.DB_PATH", str(tmp_path / "database.db"))
+
+
+def test_entity_to_row_and_dict_follow_field_order():
+    device = Device(id=1, device_name="laptop", owned_by=None)
+    assert Device.columns() == ("id", "device_name", "owned_by", "mac_addr", "ip_addr", "hostname")
+    assert device.to_row() == (1, "laptop", None, None, None, None)
+    assert device.to_dict()["device_name"] == "laptop"
+    assert Device.from_row(device.to_row()) == device
+
+
+def test_statements_are_compiled_once_per_entity_type():
+    assert compile_statements("users", User) is compile_statements("users", User)
+    assert compile_statements("users", User).update == "UPDATE users SET name = ? WHERE id = ?;"
+
+
+def test_create_and_read_user():
+    service = UserService()
+    assert service.create(User(id=None, name="alice")) == 1
+    assert service.read(1) == User(id=1, name="alice")
+    assert service.read(2) is None
+
+
+def test_update_sets_every_column():
+    users = UserService()
+    users.create(User(id=None, name="alice"))
+    devices = DeviceService()
+    devices.create(Device(id=None, device_name="phone", owned_by=None))
+
+    updated = devices.update(Device(id=1, device_name="alice's phone", owned_by=1))
+
+    assert updated is not None
+    assert devices.read(1) == Device(id=1, device_name="alice's phone", owned_by=1)
+    assert devices.update(Device(id=99, device_name="missing", owned_by=None)) is None
+
+
+def test_create_many_and_delete():
+    service = UserService()
+    service.create_many(User(id=None, name=f"user-{i}") for i in range(50))
+    assert len(service.read_all()) == 50
+
+    service.delete(1)
+    assert not service.exists(1)
+    assert service.exists(2)
@@ -0,0 +1,83 @@
+import threading
+import time
+
+import pytest
+
+from src.data.nmapdevice import NmapDevice
+from src.db.service.device_identity_index import DeviceIdentityIndex
+from src.db.service.device_service import DeviceService
+from src.db.service.observation_service import ObservationService
+from src.db.service.observation_writer import ObservationWriter
+
+
+@pytest.fixture(autouse=True)
+def test_db(tmp_path, monkeypatch):
+    monkeypatch.setattr("src.db.db_connector.DB_PATH", str(tmp_path / "database.db"))
+    DeviceIdentityIndex().invalidate()
+    yield
+    DeviceIdentityIndex().invalidate()
+
+
+def scan_hit(i: int, mac_addr: str | None = None) -> NmapDevice:
+    return NmapDevice(hostname=f"host-{i}", ip_addr=f"10.0.0.{i}", mac_addr=mac_addr, os=None, ports=None)
+
+
+def test_close_flushes_everything_queued():
+    writer = ObservationWriter(batch_size=4, flush_interval=60).start()
+    for i in range(10):
+        assert writer.submit(scan_hit(i, f"AA:BB:CC:DD:EE:{i:02X} | Vendor"), observed_at=1_000 + i)
+
+    metrics = writer.close()
+
+    observations = ObservationService().read_all()
+    assert len(observations) == 10
+    assert metrics.rows_written == 10
+    assert metrics.batches == 3
+    assert metrics.max_queue_depth >= 1
+    assert metrics.max_flush_latency >= metrics.mean_flush_latency > 0
+    assert {o.observed_at for o in observations} == set(range(1_000, 1_010))
+    assert len(DeviceService().read_all()) == 10
+
+
+def test_partial_batch_is_flushed_after_interval():
+    with ObservationWriter(batch_size=100, flush_interval=0.05) as writer:
+        writer.submit(scan_hit(1))
+        deadline = time.monotonic() + 5
+        while writer.metrics.rows_written == 0 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert writer.metrics.rows_written == 1
+
+
+def test_unlearned_hosts_are_recorded_without_creating_devices():
+    with ObservationWriter() as writer:
+        writer.submit(scan_hit(1), learn=False)
+
+    (observation,) = ObservationService().read_all()
+    assert observation.device_id is None
+    assert observation.ip_addr == "10.0.0.1"
+    assert DeviceService().read_all() == []
+
+
+def test_submit_drops_when_queue_stays_full():
+    # Never started, so nothing drains the queue
+    writer = ObservationWriter(max_queue_size=1, submit_timeout=0.01)
+    assert writer.submit(scan_hit(1))
+    assert not writer.submit(scan_hit(2))
+    assert writer.metrics.dropped == 1
+
+
+def test_submits_from_several_threads_count_every_dropped_observation():
+    writer = ObservationWriter(max_queue_size=1, submit_timeout=0)
+
+    def submit_many():
+        for i in range(500):
+            writer.submit(scan_hit(i))
+
+    submitters = [threading.Thread(target=submit_many) for _ in range(4)]
+    for submitter in submitters:
+        submitter.start()
+    for submitter in submitters:
+        submitter.join()
+
+    assert writer.metrics.dropped == 4 * 500 - 1
+    assert writer.metrics.max_queue_depth == 1
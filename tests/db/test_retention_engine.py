@@ -0,0 +1,92 @@
+import pytest
+
+from src.db.data.observation import Observation
+from src.db.db_connector import DatabaseConnector
+from src.db.service.observation_service import ObservationService
+from src.db.service.retention_engine import RetentionEngine, RetentionPolicy, SECONDS_IN_A_DAY
+
+DAY_ONE = 1_700_000_000
+
+
+@pytest.fixture(autouse=True)
+def test_db(tmp_path, monkeypatch):
+    monkeypatch.setattr("src.db.db_connector.DB_PATH", str(tmp_path / "database.db"))
+
+
+def observe(device_id: int | None, *times: int, mac_addr: str | None = None) -> None:
+    ObservationService().create_many(
+        Observation(
+            id=None,
+            device_id=device_id,
+            mac_addr=mac_addr,
+            ip_addr="192.168.0.2",
+            hostname="phone",
+            observed_at=observed_at,
+        )
+        for observed_at in times
+    )
+
+
+def read_intervals() -> list[tuple]:
+    connector = DatabaseConnector()
+    connector.connect()
+    rows = connector.find_all(
+        "SELECT device_key, arrived_at, left_at, observation_count FROM presence_intervals ORDER BY arrived_at;"
+    )
+    return [tuple(row) for row in rows]
+
+
+def test_compact_turns_old_observations_into_intervals():
+    # Home for an hour, gone for two, then back for half an hour
+    observe(1, *range(DAY_ONE, DAY_ONE + 3_601, 300), *range(DAY_ONE + 3 * 3_600, DAY_ONE + 3 * 3_600 + 1_801, 300))
+    observe(None, DAY_ONE, mac_addr="AA:BB:CC:DD:EE:FF")
+    observe(1, DAY_ONE + 8 * SECONDS_IN_A_DAY)
+
+    result = RetentionEngine(RetentionPolicy(raw_retention_days=7, max_gap_seconds=600)).compact(
+        now=DAY_ONE + 8 * SECONDS_IN_A_DAY
+    )
+
+    assert result.observations_compacted == 13 + 7 + 1
+    assert read_intervals() == [
+        ("device:1", DAY_ONE, DAY_ONE + 3_600, 13),
+        ("mac:AA:BB:CC:DD:EE:FF", DAY_ONE, DAY_ONE, 1),
+        ("device:1", DAY_ONE + 3 * 3_600, DAY_ONE + 3 * 3_600 + 1_800, 7),
+    ]
+    # Only the observation inside the retention period is kept raw
+    assert [o.observed_at for o in ObservationService().read_all()] == [DAY_ONE + 8 * SECONDS_IN_A_DAY]
+
+
+def test_incremental_compaction_matches_compacting_at_once():
+    observe(1, *range(DAY_ONE, DAY_ONE + 3_000, 300))
+    engine = RetentionEngine(RetentionPolicy(raw_retention_days=1, max_gap_seconds=600, chunk_size=3))
+    now = DAY_ONE + 2 * SECONDS_IN_A_DAY
+
+    assert engine.compact(now=now, max_chunks=1).observations_compacted == 3
+    assert engine.compact(now=now).observations_compacted == 7
+
+    assert read_intervals() == [("device:1", DAY_ONE, DAY_ONE + 2_700, 10)]
+
+
+def test_expired_intervals_are_pruned():
+    observe(1, DAY_ONE)
+    engine = RetentionEngine(RetentionPolicy(raw_retention_days=1, interval_retention_days=30))
+
+    engine.compact(now=DAY_ONE + 2 * SECONDS_IN_A_DAY)
+    assert len(read_intervals()) == 1
+
+    assert engine.compact(now=DAY_ONE + 31 * SECONDS_IN_A_DAY).intervals_pruned == 1
+    assert read_intervals() == []
+
+
+def test_history_continues_compacted_intervals_with_recent_observations():
+    observe(1, DAY_ONE, DAY_ONE + 300)
+    engine = RetentionEngine(RetentionPolicy(raw_retention_days=0, max_gap_seconds=600))
+    engine.compact(now=DAY_ONE + 301)
+    observe(1, DAY_ONE + 600, DAY_ONE + 5_000)
+
+    history = engine.history(device_id=1, since=DAY_ONE)
+
+    assert [(i.arrived_at, i.left_at, i.observation_count) for i in history] == [
+        (DAY_ONE, DAY_ONE + 600, 3),
+        (DAY_ONE + 5_000, DAY_ONE + 5_000, 1),
+    ]
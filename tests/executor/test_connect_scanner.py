@@ -0,0 +1,86 @@
+import socket
+import time
+
+import pytest
+
+from src.data.nmapdevice import NmapDevice
+from src.executor.connect_scanner import ConnectScanner, RateLimiter, service_for
+
+
+def device(ip_addr: str) -> NmapDevice:
+    return NmapDevice(hostname=f"host-{ip_addr}", ip_addr=ip_addr, mac_addr="AA:BB:CC:DD:EE:FF", os=None, ports=None)
+
+
+@pytest.fixture
+def listener():
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+        sock.bind(("127.0.0.1", 0))
+        sock.listen(128)
+        yield sock.getsockname()[1]
+
+
+@pytest.fixture
+def closed_port():
+    # Bound then closed straight away, so nothing is listening on it
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+@pytest.fixture
+def filtered_port():
+    # A listener that never accepts, once its backlog is full further connects go unanswered like a filtered port
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock, socket.socket() as backlog:
+        sock.bind(("127.0.0.1", 0))
+        sock.listen(0)
+        backlog.connect(sock.getsockname())
+        yield sock.getsockname()[1]
+
+
+def test_finds_open_ports_across_loopback_hosts(listener, closed_port):
+    # The whole of 127.0.0.0/8 is loopback, only 127.0.0.1 has the listener bound to it
+    devices = [device(f"127.0.0.{i}") for i in range(1, 21)]
+    scanned = []
+
+    result = ConnectScanner(ports=[listener, closed_port], max_sockets=4, timeout=1.0).scan(devices, scanned.append)
+
+    assert sorted(found.ip_addr for found in result) == sorted(found.ip_addr for found in devices)
+    assert scanned == result
+    by_ip = {found.ip_addr: found for found in result}
+    assert [port.id for port in by_ip["127.0.0.1"].ports] == [str(listener)]
+    assert all(by_ip[f"127.0.0.{i}"].ports == [] for i in range(2, 21))
+
+
+def test_scanned_device_matches_the_nmap_port_scan(listener):
+    [scanned] = ConnectScanner(ports=[listener]).scan([device("127.0.0.1")])
+
+    assert scanned.hostname == "host-127.0.0.1"
+    # Like nmap's port scan, which can't see MAC addresses
+    assert scanned.mac_addr is None
+    assert scanned.os.name == scanned.os.vendor == scanned.os.family == "(Unknown)"
+    assert scanned.ports[0].protocol == "tcp"
+
+
+def test_unanswered_connect_times_out(filtered_port):
+    started = time.monotonic()
+
+    [scanned] = ConnectScanner(ports=[filtered_port], timeout=0.2).scan([device("127.0.0.1")])
+
+    assert scanned.ports == []
+    assert 0.2 <= time.monotonic() - started < 2
+
+
+def test_rate_limiter_spaces_out_connects(listener):
+    started = time.monotonic()
+
+    ConnectScanner(ports=[listener] * 10, rate=100).scan([device("127.0.0.1")])
+
+    # 10 connects at 100 per second, the first starts straight away
+    assert time.monotonic() - started >= 0.09
+    assert RateLimiter(None).interval == 0
+
+
+def test_service_names_come_from_the_services_database():
+    # Minimal systems may have no services database at all
+    assert service_for(22).name in ("ssh", "unknown")
+    assert service_for(22) is service_for(22)
@@ -65,3 +65,33 @@ def test_running_as_sudo_true(mock_getuid):
 @patch("src.executor.default_executor.os.getuid", return_value=1000)
 def test_running_as_sudo_false(mock_getuid):
     assert running_as_sudo() is False
+
+
+@patch("src.executor.default_executor.running_as_sudo", return_value=True)
+@patch("src.executor.default_executor.subprocess.run", side_effect=subprocess.TimeoutExpired("nmap", 5))
+def test_execute_timeout_is_marked_as_timed_out(mock_subprocess, mock_sudo):
+    result = DefaultExecutor(timeout=5).execute("nmap 10.0.0.1")
+
+    assert result.timed_out is True
+
+
+@patch("src.executor.default_executor.running_as_sudo", return_value=True)
+@patch("src.executor.default_executor.subprocess.run")
+def test_execute_marks_hosts_nmap_gave_up_on_as_timed_out(mock_subprocess, mock_sudo):
+    mock_subprocess.return_value = MagicMock(stdout='<host starttime="1" timedout="true">', stderr="", returncode=0)
+
+    result = DefaultExecutor(timeout=5).execute("nmap --host-timeout 60s 10.0.0.1")
+
+    assert result.success is True
+    assert result.timed_out is True
+
+
+@patch("src.executor.default_executor.running_as_sudo", return_value=True)
+@patch("src.executor.default_executor.subprocess.run")
+def test_execute_failure_that_did_not_time_out(mock_subprocess, mock_sudo):
+    mock_subprocess.return_value = MagicMock(stdout="", stderr="Failed to resolve", returncode=1)
+
+    result = DefaultExecutor(timeout=5).execute("nmap 10.0.0.1")
+
+    assert result.success is False
+    assert result.timed_out is False
@@ -2,6 +2,10 @@ from unittest.mock import patch, MagicMock
 import pytest
 
 from src.executor.nmap_executor import NmapCommandBuilder, NmapExecutor, AvailableNmapFlags
+from src.util.nmap_capabilities import NmapCapabilities
+from src.util.exclusions import ExclusionIndex
+from src.util.host_range import parse_targets
+from src.util.timing_profile import choose_profile
 
 
 @pytest.fixture
@@ -18,12 +22,6 @@ def test_builder_adds_flags_correctly(test_nmap_builder):
     assert "nmap" in command
 
 
-def test_builder_sets_sudo():
-    builder = NmapCommandBuilder("10.0.0.1", "16").set_sudo()
-    command = builder.build()
-    assert command.startswith("sudo")
-
-
 def test_builder_disable_flag():
     builder = NmapCommandBuilder("127.0.0.1", "8")
     builder.enable_aggressive().disable_flag(AvailableNmapFlags.AGGRESSIVE)
@@ -44,11 +42,14 @@ def test_execute_icmp_host_discovery(mock_sudo, mock_executor):
     assert mock_executor.called
     assert result.stdout == "<xml>output</xml>"
     cmd = mock_executor.return_value.execute.call_args[0][0]
-    assert "-sV" in cmd
+    # Discovery is only a ping sweep, services are found by the port scan of the hosts that are up
+    assert "-sV" not in cmd
     assert "-sn" in cmd
     assert "-T5" in cmd
     assert "-PE" in cmd
     assert "-oX" in cmd
+    # Hostnames are resolved after discovery instead
+    assert "-n" in cmd.split()
 
 
 # @patch("src.executor.nmap_executor.DefaultExecutor")
@@ -66,3 +67,125 @@ def test_execute_icmp_host_discovery(mock_sudo, mock_executor):
 #     assert "-T5" in cmd
 #     assert "-Pn" in cmd
 #     assert "-oX -" in cmd
+
+
+@patch("src.executor.nmap_executor.DefaultExecutor")
+@patch("src.executor.nmap_executor.running_as_sudo", return_value=False)
+def test_host_discovery_is_privileged_with_cap_net_raw(mock_sudo, mock_executor):
+    capabilities = NmapCapabilities(path="/usr/bin/nmap", version="7.95", cap_net_raw=True)
+
+    NmapExecutor("192.168.1.0", "24", capabilities=capabilities).execute_arp_icmp_host_discovery()
+
+    cmd = mock_executor.return_value.execute.call_args[0][0]
+    assert "--privileged" in cmd
+    assert "sudo" not in cmd
+
+
+def test_builder_timing_profile_replaces_timing_flags(test_nmap_builder):
+    profile = choose_profile("discovery", 4096)
+
+    command = test_nmap_builder.enable_aggressive_timing().enable_timing_profile(profile).build()
+
+    assert "-T5" not in command
+    assert "-T4" in command
+    assert "--min-rate 300" in command
+
+
+@patch("src.executor.nmap_executor.DefaultExecutor")
+@patch("src.executor.nmap_executor.running_as_sudo", return_value=False)
+def test_port_scan_host_timeout_is_below_the_command_timeout(mock_sudo, mock_executor):
+    executor = NmapExecutor("192.168.1.0", "24", timeout=120)
+
+    assert executor.port_scan_profile("general").host_timeout == 60
+    assert executor.port_scan_profile("full").host_timeout == 115
+
+
+def test_builder_scans_ipv6_hosts_with_ipv6_enabled():
+    assert "-6" in NmapCommandBuilder("fd00::", "112").enable_exclude_ports().build()
+    assert "-6" not in NmapCommandBuilder("10.0.0.0", "16").enable_exclude_ports().build()
+
+
+@patch("src.executor.nmap_executor.DefaultExecutor")
+@patch("src.executor.nmap_executor.running_as_sudo", return_value=False)
+def test_host_discovery_excludes_only_the_exclusions_in_the_network(mock_sudo, mock_executor):
+    exclusions = ExclusionIndex(parse_targets("192.168.1.7 192.168.1.64/27 10.0.0.1"))
+
+    NmapExecutor("192.168.1.0", "24", exclusions=exclusions).execute_icmp_host_discovery()
+
+    cmd = mock_executor.return_value.execute.call_args[0][0]
+    assert "--exclude 192.168.1.7/32,192.168.1.64/27" in cmd
+
+
+@patch("src.executor.nmap_executor.DefaultExecutor")
+@patch("src.executor.nmap_executor.running_as_sudo", return_value=False)
+def test_host_discovery_writes_many_exclusions_to_a_file(mock_sudo, mock_executor):
+    exclusions = ExclusionIndex(parse_targets(" ".join(f"10.0.{i}.1" for i in range(100))))
+    excluded = []
+
+    def execute(command):
+        path = command.split("--excludefile ")[1].split()[0]
+        with open(path, encoding="UTF-8") as file:
+            excluded.extend(file.read().split())
+        return MagicMock()
+
+    mock_executor.return_value.execute.side_effect = execute
+    NmapExecutor("10.0.0.0", "16", exclusions=exclusions).execute_arp_host_discovery()
+
+    assert len(excluded) == 100
+    assert "10.0.99.1/32" in excluded
+    assert "--exclude " not in mock_executor.return_value.execute.call_args[0][0]
+
+
+@patch("src.executor.nmap_executor.DefaultExecutor")
+@patch("src.executor.nmap_executor.running_as_sudo", return_value=False)
+def test_fingerprinted_devices_skip_os_detection(mock_sudo, mock_executor):
+    NmapExecutor("192.168.1.0", "24").execute_general_port_scan(
+        ["192.168.1.10", "192.168.1.11"], MagicMock(), fingerprinted={"192.168.1.11"}
+    )
+
+    full, light = mock_executor.return_value.async_pooled_execute.call_args[0][0]
+    assert "-O" in full.split() and "--version-light" not in full
+    assert "-O" not in light.split() and "--version-light" in light
+    assert "-sV" in light
+
+
+@patch("src.executor.nmap_executor.DefaultExecutor")
+@patch("src.executor.nmap_executor.running_as_sudo", return_value=False)
+def test_later_stages_leave_out_scanned_ports_and_os_detection(mock_sudo, mock_executor):
+    NmapExecutor("192.168.1.0", "24").execute_full_port_scan(
+        ["192.168.1.10"], MagicMock(), exclude_ports="1-100,443", os_detection=False
+    )
+
+    (command,) = mock_executor.return_value.async_pooled_execute.call_args[0][0]
+    assert "-p-" in command
+    assert "--exclude-ports 1-100,443" in command
+    assert "-O" not in command.split()
+
+
+@patch("src.executor.nmap_executor.DefaultExecutor")
+@patch("src.executor.nmap_executor.running_as_sudo", return_value=False)
+def test_every_scan_runs_the_nmap_given(mock_sudo, mock_executor):
+    executor = NmapExecutor("192.168.1.0", "24", nmap="/opt/fake nmap")
+
+    executor.execute_arp_icmp_host_discovery()
+    executor.execute_general_port_scan(["192.168.1.10"], MagicMock())
+
+    discovery = mock_executor.return_value.execute.call_args[0][0]
+    (port_scan,) = mock_executor.return_value.async_pooled_execute.call_args[0][0]
+    for command in (discovery, port_scan):
+        assert command.split()[0] == "'/opt/fake"
+
+
+@patch("src.executor.nmap_executor.DefaultExecutor")
+@patch("src.executor.nmap_executor.running_as_sudo", return_value=True)
+def test_commands_are_not_run_through_sudo_as_root(mock_sudo, mock_executor):
+    executor = NmapExecutor("192.168.1.0", "24")
+
+    executor.execute_arp_icmp_host_discovery()
+    executor.execute_general_port_scan(["192.168.1.10"], MagicMock())
+
+    discovery = mock_executor.return_value.execute.call_args[0][0]
+    (port_scan,) = mock_executor.return_value.async_pooled_execute.call_args[0][0]
+    for command in (discovery, port_scan):
+        assert command.split()[0] == "nmap"
+        assert "sudo" not in command.split()
@@ -0,0 +1,46 @@
+import threading
+
+from src.data.command_result import CommandResult
+from src.executor.result_consumer import ResultConsumer
+
+
+def command_result(command: str) -> CommandResult:
+    return CommandResult(command=command, stdout="", stderr="", return_code=0, success=True)
+
+
+def test_results_are_handled_in_order_on_one_thread():
+    handled = []
+    threads = set()
+
+    def handler(result):
+        handled.append(result.command)
+        threads.add(threading.current_thread().name)
+
+    with ResultConsumer(handler) as consumer:
+        for i in range(100):
+            consumer.submit(command_result(f"nmap 10.0.0.{i}"))
+
+    assert handled == [f"nmap 10.0.0.{i}" for i in range(100)]
+    assert threads == {"result-consumer"}
+    assert consumer.metrics.submitted == consumer.metrics.handled == 100
+
+
+def test_failing_result_does_not_stop_the_consumer():
+    handled = []
+
+    def handler(result):
+        if result.command == "bad":
+            raise ValueError("unparseable")
+        handled.append(result.command)
+
+    consumer = ResultConsumer(handler).start()
+    for command in ["first", "bad", "last"]:
+        consumer.submit(command_result(command))
+    metrics = consumer.close()
+
+    assert handled == ["first", "last"]
+    assert metrics.failed == 1
+
+
+def test_close_without_start_returns_metrics():
+    assert ResultConsumer(lambda _: None).close().submitted == 0
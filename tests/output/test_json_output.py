@@ -0,0 +1,108 @@
+import json
+
+import pytest
+
+from src.data.nmapdevice import NmapDevice, OperatingSystem, Port, Service
+from src.util.phase_timings import PhaseTimings
+from src.output.json_output import (
+    JsonOutput,
+    OutputFormat,
+    device_to_record,
+    output_devices,
+    output_hostname,
+    output_phase_timings,
+    output_port_scan,
+    split_mac_and_vendor,
+)
+
+
+@pytest.fixture(autouse=True)
+def reset_output():
+    yield
+    JsonOutput().finish()
+    JsonOutput().set_format(OutputFormat.TEXT)
+
+
+@pytest.fixture
+def test_devices():
+    return [
+        NmapDevice(ip_addr="192.168.0.1", mac_addr="00:11:22:33:44:55 | Cisco", hostname="router", os=None, ports=None),
+        NmapDevice(ip_addr="192.168.0.2", mac_addr=None, hostname=None, os=None, ports=None),
+    ]
+
+
+def test_jsonl_writes_a_record_per_line_as_they_are_emitted(capsys, test_devices):
+    JsonOutput().set_format(OutputFormat.JSONL)
+
+    output_devices(test_devices, hosts_up=2, total_hosts="256")
+    lines = capsys.readouterr().out.splitlines()
+
+    assert [json.loads(line)["type"] for line in lines] == ["host", "host", "summary"]
+    assert json.loads(lines[0])["vendor"] == "Cisco"
+    assert json.loads(lines[2]) == {"type": "summary", "hosts_up": 2, "total_hosts": 256}
+
+
+def test_json_holds_records_until_finish(capsys, test_devices):
+    JsonOutput().set_format(OutputFormat.JSON)
+
+    output_devices(test_devices, hosts_up=2, total_hosts=256)
+    assert capsys.readouterr().out == ""
+
+    JsonOutput().finish()
+    records = json.loads(capsys.readouterr().out)
+
+    assert [record.get("ip_addr") for record in records] == ["192.168.0.1", "192.168.0.2", None]
+
+
+def test_port_scan_record_includes_os_and_ports(capsys):
+    JsonOutput().set_format(OutputFormat.JSONL)
+    device = NmapDevice(
+        ip_addr="192.168.0.3",
+        mac_addr=None,
+        hostname="nas",
+        os=OperatingSystem(name="Linux 5.X", vendor="Linux", family="Linux"),
+        ports=[Port(id="22", protocol="tcp", service=Service(name="ssh", product="OpenSSH", os_type="Linux"))],
+    )
+
+    output_port_scan(device)
+    record = json.loads(capsys.readouterr().out)
+
+    assert record["type"] == "port_scan"
+    assert record["os"] == {"name": "Linux 5.X", "vendor": "Linux", "family": "Linux"}
+    assert record["ports"] == [
+        {"id": "22", "protocol": "tcp", "service": {"name": "ssh", "product": "OpenSSH", "os_type": "Linux"}}
+    ]
+
+
+def test_device_to_record_without_ports(test_devices):
+    record = device_to_record(test_devices[1], "host")
+
+    assert record["mac_addr"] is None
+    assert record["os"] is None
+    assert record["ports"] is None
+
+
+@pytest.mark.parametrize(
+    "mac_addr, expected",
+    [
+        ("00:11:22:33:44:55 | Cisco", ("00:11:22:33:44:55", "Cisco")),
+        ("00:11:22:33:44:55 | (Unknown Vendor)", ("00:11:22:33:44:55", None)),
+        ("00:11:22:33:44:55", ("00:11:22:33:44:55", None)),
+        (None, (None, None)),
+    ],
+)
+def test_split_mac_and_vendor(mac_addr, expected):
+    assert split_mac_and_vendor(mac_addr) == expected
+
+
+def test_enrichment_and_timings_are_records_of_their_own(capsys, test_devices):
+    JsonOutput().set_format(OutputFormat.JSONL)
+    timings = PhaseTimings()
+    timings.phases.update({"sweep": 1.5, "hostnames": 0.25})
+
+    output_hostname(test_devices[0])
+    output_phase_timings(timings)
+    lines = capsys.readouterr().out.splitlines()
+
+    assert json.loads(lines[0]) == {"type": "hostname", "ip_addr": "192.168.0.1", "hostname": "router"}
+    assert json.loads(lines[1]) == {"type": "timings", "phases": {"sweep": 1.5, "hostnames": 0.25}, "total": 1.75}
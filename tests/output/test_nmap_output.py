@@ -1,6 +1,5 @@
 import pytest
 
-from src.data.command_result import CommandResult
 from src.data.nmapdevice import NmapDevice
 from src.data.scan_result import ScanResult
 from src.output.nmap_output import (
@@ -8,11 +7,22 @@ from src.output.nmap_output import (
     build_ip_message,
     build_mac_addr_message,
     get_ip_and_mac_message,
+    render_device_table,
     get_number_of_unique_devices,
     get_unique_devices_message,
     get_host_totals_message,
-    format_and_output_from_check,
+    build_diff_messages,
+    format_and_output_capabilities,
+    format_and_output_phase_timings,
+    format_ip_addr,
+    build_device_line,
+    ip_message_builder,
+    mac_addr_message_builder,
+    hostname_message_builder,
 )
+from src.util.device_diff import DeviceDiff, IpChange
+from src.util.nmap_capabilities import NmapCapabilities
+from src.util.phase_timings import PhaseTimings
 
 
 @pytest.fixture
@@ -71,6 +81,38 @@ def test_get_ip_and_mac_message_without_mac():
     assert "mac" not in msg.lower()
 
 
+def test_render_device_table_matches_line_per_device(test_devices):
+    table = render_device_table(test_devices)
+    assert table.splitlines() == [
+        "[bold magenta] [+][/bold magenta][bold magenta] Found ip address: [/bold magenta]"
+        "[bold cyan]192.168.0.1   [/bold cyan]"
+        "[bold magenta]and mac address: [/bold magenta][bold cyan]00:11:22:33:44:55 [/bold cyan]"
+        "[bold magenta]for hostname: [/bold magenta][bold cyan]router[/bold cyan]",
+        "[bold magenta] [+][/bold magenta][bold magenta] Found ip address: [/bold magenta]"
+        "[bold cyan]192.168.0.2   [/bold cyan]"
+        "[bold magenta]for hostname: [/bold magenta][bold cyan]laptop[/bold cyan]",
+        "[bold magenta] [+][/bold magenta][bold magenta] Found ip address: [/bold magenta]"
+        "[bold cyan]192.168.0.3   [/bold cyan]"
+        "[bold magenta]and mac address: [/bold magenta][bold cyan]AA:BB:CC:DD:EE:FF [/bold cyan]"
+        "[bold magenta]for hostname: [/bold magenta][bold cyan]phone[/bold cyan]",
+        "[bold magenta] [+][/bold magenta][bold magenta] Found ip address: [/bold magenta]"
+        "[bold cyan]192.168.0.4   [/bold cyan]"
+        "[bold magenta]and mac address: [/bold magenta][bold cyan]11:22:33:44:55:66 [/bold cyan]"
+        "[bold magenta]for hostname: [/bold magenta][bold cyan]router[/bold cyan]",
+    ]
+
+
+def test_device_line_builders_build_what_the_templates_render(test_devices):
+    device = test_devices[0]
+    built = (
+        ip_message_builder(format_ip_addr(device.ip_addr)).build()
+        + mac_addr_message_builder(f"{device.mac_addr:<20}").build()
+        + hostname_message_builder(device.hostname).build()
+    )
+
+    assert build_device_line(device, 20) == built
+
+
 def test_get_number_of_unique_devices(test_devices):
     count = get_number_of_unique_devices(test_devices)
     assert count == 4
@@ -96,31 +138,91 @@ def test_format_and_output_prints_expected(test_devices, scan_result_mock, capsy
     assert "✔️ It also found" in captured.out
 
 
-def test_format_and_output_from_check_found_version(capsys):
-    result = CommandResult(
-        command="command",
-        success=True,
-        stderr="",
-        stdout="Nmap version 7.95",
-        return_code=0,
+def test_format_and_output_ipv6_devices(capsys):
+    scan_result = ScanResult(
+        run_stats={"hosts": {"@up": "2", "@total": "256"}},
+        hosts=[
+            {"address": {"@addr": "fd00::1", "@addrtype": "ipv6"}},
+            {"address": {"@addr": "fd00::ab", "@addrtype": "ipv6"}},
+        ],
     )
 
-    format_and_output_from_check(result)
-    captured = capsys.readouterr()
+    format_and_output(scan_result, scan_result.get_devices())
 
-    assert "7.95" in captured.out
+    out = capsys.readouterr().out
+    assert "fd00::1 " in out
+    assert "fd00::ab" in out
 
 
-def test_format_and_output_from_check_not_found(capsys):
-    result = CommandResult(
-        command="command",
-        success=False,
-        stderr="",
-        stdout="",
-        return_code=0,
-    )
+@pytest.mark.parametrize(
+    "ip_addr,padded",
+    [
+        ("192.168.0.1", "192.168.0.1  "),
+        ("192.168.0.254", "192.168.0.254"),
+        ("fd00::1", "fd00::1   "),
+        ("fd00::", "fd00::    "),
+    ],
+)
+def test_format_ip_addr_pads_the_last_part(ip_addr, padded):
+    assert format_ip_addr(ip_addr) == padded
+
 
-    format_and_output_from_check(result)
+def test_format_and_output_capabilities_not_installed(capsys):
+    format_and_output_capabilities(NmapCapabilities(path=None), privileged=True)
     captured = capsys.readouterr()
 
     assert "ERROR" in captured.out
+    assert "Raw packets" not in captured.out
+
+
+def test_format_and_output_capabilities_as_root(capsys):
+    format_and_output_capabilities(NmapCapabilities(path="/usr/bin/nmap", version="7.95"), privileged=True)
+    captured = capsys.readouterr()
+
+    assert "Found nmap version: 7.95" in captured.out
+    assert "Raw packets available through: root" in captured.out
+
+
+def test_format_and_output_capabilities_with_cap_net_raw(capsys):
+    capabilities = NmapCapabilities(path="/usr/bin/nmap", version="7.95", cap_net_raw=True)
+
+    format_and_output_capabilities(capabilities, privileged=False)
+    captured = capsys.readouterr()
+
+    assert "Found nmap version: 7.95" in captured.out
+    assert "Raw packets available through: CAP_NET_RAW" in captured.out
+
+
+def test_format_and_output_capabilities_unprivileged(capsys):
+    format_and_output_capabilities(NmapCapabilities(path="/usr/bin/nmap", version="7.95"), privileged=False)
+    captured = capsys.readouterr()
+
+    assert "Found nmap version: 7.95" in captured.out
+    assert "Raw packets unavailable" in captured.out
+    assert "ERROR" not in captured.out
+
+
+def test_build_diff_messages(test_devices):
+    device_diff = DeviceDiff(
+        arrived=[test_devices[0]], departed=[test_devices[1]], ip_changed=[IpChange(test_devices[2], "192.168.0.9")]
+    )
+
+    messages = build_diff_messages(device_diff)
+
+    assert len(messages) == 3
+    assert "Arrived" in messages[0] and "192.168.0.1" in messages[0]
+    assert "Left" in messages[1] and "laptop" in messages[1]
+    assert "192.168.0.9 -> 192.168.0.3" in messages[2]
+
+
+def test_build_diff_messages_without_changes():
+    assert build_diff_messages(DeviceDiff()) == []
+
+
+def test_format_and_output_phase_timings(capsys):
+    timings = PhaseTimings()
+    timings.phases.update({"sweep": 1.5, "hostnames": 0.25})
+
+    format_and_output_phase_timings(timings)
+
+    assert capsys.readouterr().out.strip() == "[~] Timings: sweep: 1.50s | hostnames: 0.25s | total: 1.75s"
@@ -0,0 +1,27 @@
+from src.output.typer_output_builder import Slot, TyperOutputBuilder
+
+
+def test_compiled_template_renders_like_the_builder():
+    built = TyperOutputBuilder().add_square().apply_bold_magenta(" Found: ").apply_bold_cyan("10.0.0.1").build()
+
+    template = TyperOutputBuilder().add_square().apply_bold_magenta(" Found: ").apply_bold_cyan(Slot("ip")).compile()
+
+    assert template.render(ip="10.0.0.1") == built
+
+
+def test_braces_in_the_message_are_not_slots():
+    template = TyperOutputBuilder().add("{not a slot} ").add_slot("value").compile()
+
+    assert template.render(value="{kept}") == "{not a slot} {kept}"
+
+
+def test_slot_format_spec_can_use_other_slots():
+    template = TyperOutputBuilder().add_slot("mac_addr", "<{width}").add("|").compile()
+
+    assert template.render(mac_addr="AA", width=4) == "AA  |"
+
+
+def test_templates_can_be_joined():
+    template = TyperOutputBuilder().add_slot("a").compile() + TyperOutputBuilder().add("-").add_slot("b").compile()
+
+    assert template.render(a=1, b=2) == "1-2"
@@ -48,3 +48,11 @@ def test_nmap_output_parser_for_scan_result(fake_nmap_response):
     actual_scan_result: ScanResult = parser.create_scan_result()
     assert actual_scan_result.hosts is not None
     assert actual_scan_result.run_stats is not None
+
+
+def test_scan_result_round_trip_times_are_in_seconds(fake_nmap_response):
+    command_result = CommandResult(command="nmap", stdout=fake_nmap_response, stderr="", success=True, return_code=0)
+
+    scan_result: ScanResult = NmapOutputParser(command_result=command_result).create_scan_result()
+
+    assert scan_result.get_round_trip_times() == [0.003184]
@@ -0,0 +1,67 @@
+import json
+import os
+import subprocess
+from pathlib import Path
+
+from benchmarks.e2e_benchmark import FAKE_NMAP, whos_home_command
+
+
+def run_whos_home(tmp_path: Path, *args: str, **environment: str) -> list[dict]:
+    completed = subprocess.run(
+        whos_home_command(list(args)),
+        capture_output=True,
+        text=True,
+        check=True,
+        timeout=60,
+        env={**os.environ, "XDG_CACHE_HOME": str(tmp_path), **environment},
+    )
+    return [json.loads(line) for line in completed.stdout.splitlines() if line.startswith("{")]
+
+
+def test_scans_offline_against_the_fake_nmap(tmp_path):
+    records = run_whos_home(tmp_path, "192.0.2.0", "--port-scan", FAKE_NMAP_HOSTS="3", FAKE_NMAP_PORTS="2")
+
+    hosts = [record for record in records if record["type"] == "host"]
+    port_scans = [record for record in records if record["type"] == "port_scan"]
+    assert len(hosts) == 3
+    assert all(host["ip_addr"].startswith("192.0.2.") and host["mac_addr"] for host in hosts)
+    assert {record["ip_addr"] for record in port_scans} == {host["ip_addr"] for host in hosts}
+    assert all(record["os"]["name"] != "(Unknown)" for record in port_scans)
+
+
+def test_scans_ipv6_offline_against_the_fake_nmap(tmp_path):
+    # The fake nmap ignores --exclude, so the excluded host is found, but must not be port scanned
+    records = run_whos_home(
+        tmp_path, "fd00::", "--cidr", "120", "--port-scan", "--exclude", "fd00::56", FAKE_NMAP_HOSTS="3"
+    )
+
+    hosts = [record["ip_addr"] for record in records if record["type"] == "host"]
+    assert hosts == ["fd00::1", "fd00::56", "fd00::ab"]
+    assert {record["ip_addr"] for record in records if record["type"] == "port_scan"} == {"fd00::1", "fd00::ab"}
+
+
+def test_failed_and_cut_off_nmap_runs_leave_the_scan_running(tmp_path):
+    records = run_whos_home(tmp_path, "192.0.2.0", FAKE_NMAP_PARTIAL_RATE="1")
+
+    assert not [record for record in records if record["type"] == "host"]
+
+
+def test_replays_recorded_scans(tmp_path):
+    recordings = tmp_path / "recordings"
+    recorded = run_whos_home(
+        tmp_path / "record",
+        "192.0.2.0",
+        FAKE_NMAP_HOSTS="2",
+        FAKE_NMAP_RECORD_DIR=str(recordings),
+        FAKE_NMAP_REAL=str(FAKE_NMAP),
+    )
+
+    # The hosts generated would differ, so these can only come from the recording
+    replayed = run_whos_home(
+        tmp_path / "replay", "192.0.2.0", FAKE_NMAP_HOSTS="9", FAKE_NMAP_REPLAY_DIR=str(recordings)
+    )
+
+    assert [record["ip_addr"] for record in replayed if record["type"] == "host"] == [
+        record["ip_addr"] for record in recorded if record["type"] == "host"
+    ]
+    assert len([record for record in replayed if record["type"] == "host"]) == 2
@@ -0,0 +1,42 @@
+import json
+import subprocess
+import sys
+
+from benchmarks.startup_benchmark import CLI_MODULE, IMPORT_BUDGET_SECONDS, fastest_import_without_typer
+
+# The test allows this many times the budget, so only a slow import, not a slow machine, fails it. The benchmark
+# holds the import to the budget itself.
+IMPORT_BUDGET_HEADROOM = 2
+
+# Only needed once a scan runs, so must not be imported by `--help` or option errors
+DEFERRED_MODULES = [
+    "schedule",
+    "sqlite3",
+    "xmltodict",
+    "rich.progress",
+    "rich.live",
+    "src.db.db_connector",
+    "src.executor.nmap_executor",
+    "src.parser.nmap_output_parser",
+    "src.output.nmap_output",
+    "src.util.scheduler",
+    "src.executor.connect_scanner",
+    "asyncio",
+]
+
+
+def test_cli_import_defers_scan_modules():
+    completed = subprocess.run(
+        [sys.executable, "-c", f"import json, sys, {CLI_MODULE}; print(json.dumps(sorted(sys.modules)))"],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+
+    imported = set(json.loads(completed.stdout))
+
+    assert [module for module in DEFERRED_MODULES if module in imported] == []
+
+
+def test_cli_import_time_is_within_budget():
+    assert fastest_import_without_typer() < IMPORT_BUDGET_SECONDS * IMPORT_BUDGET_HEADROOM
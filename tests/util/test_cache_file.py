@@ -0,0 +1,51 @@
+import json
+import threading
+
+import pytest
+
+from src.util.cache_file import cache_dir, write_json_atomically
+
+
+def test_cache_dir_follows_xdg_cache_home(tmp_path, monkeypatch):
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path))
+
+    assert cache_dir() == tmp_path / "whos_home"
+
+
+def test_writes_the_cache_and_leaves_no_temporary_file(tmp_path):
+    path = tmp_path / "whos_home" / "networks.json"
+
+    write_json_atomically(path, {"192.168.1.0/24": {"runs": 1}})
+    write_json_atomically(path, {"192.168.1.0/24": {"runs": 2}})
+
+    assert json.loads(path.read_text(encoding="UTF-8")) == {"192.168.1.0/24": {"runs": 2}}
+    assert [file.name for file in path.parent.iterdir()] == ["networks.json"]
+
+
+def test_a_failed_write_leaves_the_cache_as_it_was(tmp_path):
+    path = tmp_path / "hostnames.json"
+    write_json_atomically(path, {"10.0.0.1": ["nas.lan", 1.0]})
+
+    with pytest.raises(TypeError):
+        write_json_atomically(path, {"10.0.0.1": object()})
+
+    assert json.loads(path.read_text(encoding="UTF-8")) == {"10.0.0.1": ["nas.lan", 1.0]}
+    assert [file.name for file in tmp_path.iterdir()] == ["hostnames.json"]
+
+
+def test_writers_at_once_never_replace_the_cache_with_half_of_one(tmp_path):
+    path = tmp_path / "fingerprints.json"
+    entries = {f"AA:BB:CC:DD:EE:{i:02X}": {"scanned": i} for i in range(256)}
+
+    def write(run):
+        for _ in range(20):
+            write_json_atomically(path, {"run": run, **entries})
+
+    writers = [threading.Thread(target=write, args=(run,)) for run in range(4)]
+    for writer in writers:
+        writer.start()
+    for writer in writers:
+        writer.join()
+
+    assert json.loads(path.read_text(encoding="UTF-8"))["AA:BB:CC:DD:EE:FF"] == {"scanned": 255}
+    assert [file.name for file in tmp_path.iterdir()] == ["fingerprints.json"]
@@ -0,0 +1,63 @@
+import pytest
+
+from src.data.nmapdevice import NmapDevice, Port, Service
+from src.util.device_diff import DeviceDiffer
+
+
+@pytest.fixture(autouse=True)
+def differ():
+    DeviceDiffer().reset()
+    yield DeviceDiffer()
+    DeviceDiffer().reset()
+
+
+def device(ip_addr, mac_addr=None, ports=None):
+    return NmapDevice(ip_addr=ip_addr, mac_addr=mac_addr, hostname=None, os=None, ports=ports)
+
+
+def port(port_id, name="ssh"):
+    return Port(id=port_id, protocol="tcp", service=Service(name=name, product="", os_type=""))
+
+
+def test_first_scan_has_nothing_to_compare_against(differ):
+    device_diff = differ.diff([device("10.0.0.1")])
+
+    assert device_diff.first_scan
+    assert not device_diff.has_changes
+
+
+def test_unchanged_scan_has_no_changes(differ):
+    differ.diff([device("10.0.0.1", "AA:BB:CC:DD:EE:01 | Vendor"), device("10.0.0.2")])
+
+    device_diff = differ.diff([device("10.0.0.2"), device("10.0.0.1", "AA:BB:CC:DD:EE:01 | Vendor")])
+
+    assert not device_diff.first_scan
+    assert not device_diff.has_changes
+
+
+def test_arrivals_departures_and_ip_changes(differ):
+    differ.diff([device("10.0.0.1", "AA:BB:CC:DD:EE:01"), device("10.0.0.2")])
+
+    device_diff = differ.diff([device("10.0.0.9", "aa-bb-cc-dd-ee-01"), device("10.0.0.3")])
+
+    assert [d.ip_addr for d in device_diff.arrived] == ["10.0.0.3"]
+    assert [d.ip_addr for d in device_diff.departed] == ["10.0.0.2"]
+    assert [(c.previous_ip_addr, c.device.ip_addr) for c in device_diff.ip_changed] == [("10.0.0.1", "10.0.0.9")]
+
+
+def test_scopes_are_compared_separately(differ):
+    differ.diff([device("10.0.0.1")], scope="10.0.0.0/24")
+
+    assert differ.diff([device("192.168.0.1")], scope="192.168.0.0/24").first_scan
+    assert not differ.diff([device("10.0.0.1")], scope="10.0.0.0/24").has_changes
+
+
+def test_diff_ports_reports_opened_and_closed_ports(differ):
+    assert differ.diff_ports(device("10.0.0.1", ports=[port("22"), port("80", "http")])).first_scan
+    assert not differ.diff_ports(device("10.0.0.1", ports=[port("80", "http"), port("22")])).has_changes
+
+    device_diff = differ.diff_ports(device("10.0.0.1", ports=[port("22"), port("443", "https")]))
+
+    [change] = device_diff.ports_changed
+    assert [p.id for p in change.opened] == ["443"]
+    assert [p.id for p in change.closed] == ["80"]
@@ -0,0 +1,49 @@
+from src.data.nmapdevice import NmapDevice
+from src.util.device_merge import DeviceMerger
+from src.whos_home import scan_targets
+
+
+def device(ip_addr, mac_addr=None, hostname=None):
+    return NmapDevice(hostname=hostname, ip_addr=ip_addr, mac_addr=mac_addr, os=None, ports=None)
+
+
+def test_overlapping_hosts_are_scanned_once():
+    assert list(scan_targets("10.0.0.0 10.0.0.128", "24", "")) == [("10.0.0.0", "24")]
+
+
+def test_hosts_inside_a_range_are_merged_into_it():
+    targets = list(scan_targets("192.168.1.77 10.0.0.1", "24", "192.168.0.0-192.168.1.255, 10.0.1.0/24"))
+
+    assert targets == [("10.0.0.0", "23"), ("192.168.0.0", "23")]
+
+
+def test_hostnames_are_scanned_as_given():
+    assert list(scan_targets("router.local 10.0.0.5", "24", "")) == [("router.local", "24"), ("10.0.0.0", "24")]
+
+
+def test_devices_found_again_are_only_returned_once():
+    merger = DeviceMerger()
+
+    first = merger.merge([device("10.0.0.1"), device("10.0.0.2")])
+    second = merger.merge([device("10.0.0.2"), device("10.0.0.3")])
+
+    assert [d.ip_addr for d in first] == ["10.0.0.1", "10.0.0.2"]
+    assert [d.ip_addr for d in second] == ["10.0.0.3"]
+
+
+def test_what_a_later_scan_found_is_merged_into_the_first_device():
+    merger = DeviceMerger()
+    first = merger.merge([device("10.0.0.2", hostname="printer.local")])
+
+    merger.merge([device("10.0.0.2", mac_addr="aa:bb:cc:dd:ee:ff", hostname="other.local")])
+
+    assert first[0].mac_addr == "aa:bb:cc:dd:ee:ff"
+    assert first[0].hostname == "printer.local"
+
+
+def test_devices_sharing_a_mac_address_are_kept_apart():
+    merger = DeviceMerger()
+
+    found = merger.merge([device("10.0.0.1", "aa:bb:cc:dd:ee:ff"), device("10.0.0.2", "aa:bb:cc:dd:ee:ff")])
+
+    assert len(found) == 2
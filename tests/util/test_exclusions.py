@@ -0,0 +1,88 @@
+import ipaddress
+
+import pytest
+
+from src.util.exclusions import ExclusionIndex, load_exclusions
+from src.util.host_range import parse_targets
+from src.whos_home import scan_targets
+
+
+@pytest.fixture
+def exclusions():
+    return ExclusionIndex(parse_targets("192.168.1.7 192.168.1.64/27 192.168.1.96-192.168.1.100 10.0.0.0/16 fd00::5"))
+
+
+def test_overlapping_and_adjacent_exclusions_are_merged(exclusions):
+    # 192.168.1.64/27 and 192.168.1.96-100 are adjacent, so are one interval
+    assert len(exclusions) == 4
+
+
+@pytest.mark.parametrize(
+    "ip_addr, excluded",
+    [
+        ("192.168.1.7", True),
+        ("192.168.1.8", False),
+        ("192.168.1.64", True),
+        ("192.168.1.100", True),
+        ("192.168.1.101", False),
+        ("10.0.255.255", True),
+        ("10.1.0.0", False),
+        ("fd00::5", True),
+        ("fd00::6", False),
+        ("printer.local", False),
+        ("", False),
+    ],
+)
+def test_contains(exclusions, ip_addr, excluded):
+    assert exclusions.contains(ip_addr) is excluded
+
+
+def test_covers_only_entirely_excluded_networks(exclusions):
+    assert exclusions.covers(ipaddress.ip_network("10.0.4.0/24"))
+    assert not exclusions.covers(ipaddress.ip_network("10.0.0.0/15"))
+    assert not exclusions.covers(ipaddress.ip_network("192.168.1.0/24"))
+
+
+def test_within_clips_the_exclusions_to_the_network(exclusions):
+    assert [str(network) for network in exclusions.within(ipaddress.ip_network("192.168.1.0/26"))] == ["192.168.1.7/32"]
+    assert [str(network) for network in exclusions.within(ipaddress.ip_network("192.168.1.96/30"))] == [
+        "192.168.1.96/30"
+    ]
+    assert not list(exclusions.within(ipaddress.ip_network("172.16.0.0/12")))
+
+
+def test_tens_of_thousands_of_exclusions():
+    networks = [ipaddress.ip_network(f"10.{i // 256}.{i % 256}.1") for i in range(50_000)]
+
+    exclusions = ExclusionIndex(reversed(networks))
+
+    assert len(exclusions) == 50_000
+    assert exclusions.contains("10.100.100.1")
+    assert not exclusions.contains("10.100.100.2")
+    assert len(list(exclusions.within(ipaddress.ip_network("10.7.0.0/16")))) == 256
+
+
+def test_exclude_file_lines_and_comments(tmp_path):
+    exclude_file = tmp_path / "exclude.txt"
+    exclude_file.write_text("# Fragile devices\n192.168.1.20  # PLC\n\n192.168.1.30-40, 10.0.0.1\n", encoding="UTF-8")
+
+    exclusions = load_exclusions("192.168.1.50", exclude_file)
+
+    assert all(exclusions.contains(ip) for ip in ("192.168.1.20", "192.168.1.35", "10.0.0.1", "192.168.1.50"))
+    assert not exclusions.contains("192.168.1.21")
+
+
+def test_exclude_file_errors_name_the_line(tmp_path):
+    exclude_file = tmp_path / "exclude.txt"
+    exclude_file.write_text("192.168.1.20\n192.168.1.300\n", encoding="UTF-8")
+
+    with pytest.raises(ValueError, match="line 2"):
+        load_exclusions(exclude_file=exclude_file)
+
+
+def test_entirely_excluded_blocks_are_not_scanned():
+    exclusions = ExclusionIndex(parse_targets("10.1.0.0/16 192.168.1.0/24"))
+
+    targets = list(scan_targets("192.168.1.0 router.local", "24", "10.0.0.0/14", exclusions))
+
+    assert targets == [("router.local", "24"), ("10.0.0.0", "16"), ("10.2.0.0", "16"), ("10.3.0.0", "16")]
@@ -0,0 +1,92 @@
+import pytest
+
+from src.data.nmapdevice import NmapDevice, OperatingSystem, Port, Service
+from src.util.fingerprint_cache import FingerprintCache
+
+DAY = 24 * 60 * 60
+LINUX = OperatingSystem(name="Linux 5.4", vendor="Linux", family="Linux")
+UNKNOWN = OperatingSystem(name="(Unknown)", vendor="(Unknown)", family="(Unknown)")
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 1_000_000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def port(port_id: str, name: str, product: str = "") -> Port:
+    return Port(id=port_id, protocol="tcp", service=Service(name=name, product=product, os_type=""))
+
+
+def discovered(ip_addr: str = "192.168.1.10", mac_addr: str | None = "AA:BB:CC:DD:EE:FF") -> NmapDevice:
+    return NmapDevice(hostname=None, ip_addr=ip_addr, mac_addr=mac_addr, os=None, ports=None)
+
+
+def scanned(ports: list[Port], os: OperatingSystem = UNKNOWN, ip_addr: str = "192.168.1.10") -> NmapDevice:
+    return NmapDevice(hostname=None, ip_addr=ip_addr, mac_addr=None, os=os, ports=ports)
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+
+@pytest.fixture
+def fingerprinted(tmp_path, clock):
+    cache = FingerprintCache(tmp_path / "fingerprints.json", max_age=7 * DAY, clock=clock)
+    cache.plan([discovered()], "general")
+    cache.update(scanned([port("22", "ssh", "OpenSSH 9.6"), port("80", "http", "nginx 1.24")], LINUX))
+    cache.save()
+    return tmp_path / "fingerprints.json"
+
+
+def test_device_without_a_fingerprint_is_fingerprinted(tmp_path, clock):
+    cache = FingerprintCache(tmp_path / "fingerprints.json", clock=clock)
+
+    assert cache.plan([discovered()], "general") == set()
+
+
+def test_devices_without_a_mac_address_are_never_cached(tmp_path, clock):
+    cache = FingerprintCache(tmp_path / "fingerprints.json", clock=clock)
+    cache.plan([discovered(mac_addr=None)], "general")
+    cache.update(scanned([port("22", "ssh")], LINUX))
+    cache.save()
+
+    assert (
+        FingerprintCache(tmp_path / "fingerprints.json", clock=clock).plan([discovered(mac_addr=None)], "general")
+        == set()
+    )
+
+
+def test_fingerprint_is_merged_when_the_open_ports_are_the_same(fingerprinted, clock):
+    clock.now += DAY
+    cache = FingerprintCache(fingerprinted, max_age=7 * DAY, clock=clock)
+
+    assert cache.plan([discovered(mac_addr="aa-bb-cc-dd-ee-ff")], "general") == {"192.168.1.10"}
+    device = cache.update(scanned([port("80", "http"), port("22", "ssh")]))
+
+    assert device.os == LINUX
+    assert [p.service.product for p in device.ports] == ["nginx 1.24", "OpenSSH 9.6"]
+
+
+def test_fingerprint_is_dropped_when_the_open_ports_changed(fingerprinted, clock):
+    cache = FingerprintCache(fingerprinted, max_age=7 * DAY, clock=clock)
+    cache.plan([discovered()], "general")
+
+    device = cache.update(scanned([port("22", "ssh"), port("443", "https")]))
+    cache.save()
+
+    assert device.os == UNKNOWN
+    assert FingerprintCache(fingerprinted, clock=clock).plan([discovered()], "general") == set()
+
+
+def test_stale_fingerprints_are_not_used(fingerprinted, clock):
+    clock.now += 8 * DAY
+
+    assert FingerprintCache(fingerprinted, max_age=7 * DAY, clock=clock).plan([discovered()], "general") == set()
+
+
+def test_fingerprints_are_kept_per_scan_type(fingerprinted, clock):
+    assert FingerprintCache(fingerprinted, clock=clock).plan([discovered()], "full") == set()
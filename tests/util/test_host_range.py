@@ -0,0 +1,94 @@
+import ipaddress
+import tracemalloc
+
+import pytest
+import typer
+
+from src.whos_home import scan_targets, validate_host_range
+from src.util.host_range import check_shard_count, coalesce, count_shards, expand_host_range, parse_targets, shards
+
+
+def test_range_is_summarized_into_the_fewest_networks():
+    networks = list(parse_targets("10.0.0.5-10.0.3.200"))
+
+    assert networks[0] == ipaddress.ip_network("10.0.0.5/32")
+    assert networks[-1] == ipaddress.ip_network("10.0.3.200/32")
+    assert sum(network.num_addresses for network in networks) == 3 * 256 + 200 - 5 + 1
+    assert len(networks) == 13
+
+
+def test_mixed_list_of_ranges_networks_addresses_and_ipv6():
+    networks = list(parse_targets("192.168.1.10-20, 10.0.0.0/8 172.16.0.1,fd00::1-fd00::3"))
+
+    assert ipaddress.ip_network("192.168.1.16/30") in networks
+    assert ipaddress.ip_network("10.0.0.0/8") in networks
+    assert ipaddress.ip_network("172.16.0.1/32") in networks
+    assert networks[-2:] == [ipaddress.ip_network("fd00::1/128"), ipaddress.ip_network("fd00::2/127")]
+
+
+@pytest.mark.parametrize("host_range", ["10.0.0.9-10.0.0.1", "10.0.0.1-fd00::1", "10.0.0.256", "nonsense-10.0.0.1"])
+def test_invalid_ranges_are_rejected(host_range):
+    with pytest.raises(ValueError):
+        list(parse_targets(host_range))
+
+
+def test_overlapping_and_adjacent_networks_are_merged():
+    networks = coalesce(parse_targets("192.168.1.0/25 192.168.1.128-192.168.1.255 192.168.1.7 fd00::/64 10.0.0.0/8"))
+
+    assert networks == [
+        ipaddress.ip_network("10.0.0.0/8"),
+        ipaddress.ip_network("192.168.1.0/24"),
+        ipaddress.ip_network("fd00::/64"),
+    ]
+
+
+def test_large_networks_are_split_into_shards():
+    assert list(expand_host_range("10.0.0.0/15 192.168.1.0/24")) == [
+        ("10.0.0.0", "16"),
+        ("10.1.0.0", "16"),
+        ("192.168.1.0", "24"),
+    ]
+
+
+def test_ipv6_shards_are_the_same_size_as_ipv4():
+    first = next(shards(coalesce(parse_targets("fd00::/64"))))
+
+    assert first == ipaddress.ip_network("fd00::/112")
+
+
+def test_slash_8_range_is_streamed_in_bounded_memory():
+    tracemalloc.start()
+    try:
+        covered = 0
+        blocks = 0
+        for _, cidr in expand_host_range("10.0.0.5-10.255.255.250"):
+            covered += 2 ** (32 - int(cidr))
+            blocks += 1
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    assert covered == 2**24 - 5 - 5
+    assert blocks == 256 + 2 * 15 - 2
+    # A list of the 16 million addresses would take over a gigabyte
+    assert peak < 64 * 1024
+
+
+def test_ranges_needing_too_many_nmap_runs_are_rejected():
+    with pytest.raises(ValueError, match="fd00::/64 would take 281474976710656 nmap runs"):
+        check_shard_count(parse_targets("fd00::/64"))
+    with pytest.raises(ValueError, match="at most 4096"):
+        check_shard_count(parse_targets("0.0.0.0/3"))
+
+
+def test_ranges_at_the_shard_limit_are_allowed():
+    assert check_shard_count(parse_targets("fd00::/100")) == [ipaddress.ip_network("fd00::/100")]
+    assert check_shard_count(parse_targets("16.0.0.0/4")) == [ipaddress.ip_network("16.0.0.0/4")]
+    assert count_shards(parse_targets("10.0.0.0/8 192.168.1.0/24")) == 257
+
+
+def test_host_range_and_host_too_large_to_scan_are_bad_parameters():
+    with pytest.raises(typer.BadParameter, match="fd00::/64"):
+        validate_host_range("fd00::/64")
+    with pytest.raises(typer.BadParameter, match="fd00::/64"):
+        next(scan_targets("fd00::", "64", ""))
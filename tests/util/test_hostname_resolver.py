@@ -0,0 +1,180 @@
+import threading
+import time
+
+from src.data.nmapdevice import NmapDevice
+from src.data.scan_result import ScanResult
+from src.util.hostname_resolver import HostnameResolver
+from src.util.phase_timings import PhaseTimings
+from src.whos_home import output_host_discovery_and_hostnames, output_resolved_hostnames
+
+
+class StubResolver:
+    """
+    Answers lookups from a table of PTR records, the way the system resolver would
+    """
+
+    def __init__(self, records: dict[str, str], delay: float = 0.0, failing: set[str] | None = None) -> None:
+        self.records = records
+        self.delay = delay
+        self.failing = failing or set()
+        self.lookups: list[str] = []
+        self._lock = threading.Lock()
+
+    def __call__(self, ip_addr: str) -> str | None:
+        with self._lock:
+            self.lookups.append(ip_addr)
+        time.sleep(self.delay)
+        if ip_addr in self.failing:
+            raise OSError("Temporary failure in name resolution")
+        return self.records.get(ip_addr)
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 1_000_000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def device(ip_addr: str, hostname: str | None = None) -> NmapDevice:
+    return NmapDevice(hostname=hostname, ip_addr=ip_addr, mac_addr=None, os=None, ports=None)
+
+
+def test_lookups_run_concurrently_and_fill_in_hostnames(tmp_path):
+    stub = StubResolver({f"10.0.0.{i}": f"host-{i}.lan" for i in range(20)}, delay=0.1)
+    devices = [device(f"10.0.0.{i}") for i in range(20)]
+    resolved = []
+    started = time.monotonic()
+
+    HostnameResolver(stub, cache_path=tmp_path / "hostnames.json").resolve(devices, resolved.append)
+
+    # Twenty lookups of 100ms each, one after the other would take two seconds
+    assert time.monotonic() - started < 1
+    assert [found.hostname for found in devices] == [f"host-{i}.lan" for i in range(20)]
+    assert len(resolved) == 20
+
+
+def test_cached_answers_carry_over_between_runs(tmp_path):
+    cache_path = tmp_path / "hostnames.json"
+    clock = FakeClock()
+    HostnameResolver(StubResolver({"10.0.0.1": "nas.lan"}), cache_path=cache_path, clock=clock).resolve(
+        [device("10.0.0.1"), device("10.0.0.2")]
+    )
+    stub = StubResolver({})
+    devices = [device("10.0.0.1"), device("10.0.0.2")]
+
+    HostnameResolver(stub, cache_path=cache_path, clock=clock).resolve(devices)
+
+    # 10.0.0.2 has no hostname, which is cached too
+    assert not stub.lookups
+    assert [found.hostname for found in devices] == ["nas.lan", None]
+
+
+def test_expired_answers_are_looked_up_again(tmp_path):
+    cache_path = tmp_path / "hostnames.json"
+    clock = FakeClock()
+    HostnameResolver(
+        StubResolver({"10.0.0.1": "nas.lan"}), cache_path=cache_path, ttl=600, negative_ttl=60, clock=clock
+    ).resolve([device("10.0.0.1"), device("10.0.0.2")])
+    stub = StubResolver({"10.0.0.1": "nas.lan", "10.0.0.2": "printer.lan"})
+    resolver = HostnameResolver(stub, cache_path=cache_path, ttl=600, negative_ttl=60, clock=clock)
+
+    clock.now += 120
+    resolver.resolve([device("10.0.0.1"), device("10.0.0.2")])
+    clock.now += 500
+    resolver.resolve([device("10.0.0.1"), device("10.0.0.2")])
+
+    assert stub.lookups == ["10.0.0.2", "10.0.0.1"]
+
+
+def test_failed_lookups_are_not_cached(tmp_path):
+    stub = StubResolver({"10.0.0.1": "nas.lan"}, failing={"10.0.0.1"})
+    resolver = HostnameResolver(stub, cache_path=tmp_path / "hostnames.json")
+    devices = [device("10.0.0.1")]
+
+    resolver.resolve(devices)
+    stub.failing.clear()
+    resolver.resolve(devices)
+
+    assert stub.lookups == ["10.0.0.1", "10.0.0.1"]
+    assert devices[0].hostname == "nas.lan"
+
+
+def test_slow_lookups_are_given_up_on(tmp_path):
+    stub = StubResolver({"10.0.0.1": "nas.lan"}, delay=1)
+    devices = [device("10.0.0.1"), device("10.0.0.2", hostname="router.lan")]
+    started = time.monotonic()
+
+    HostnameResolver(stub, cache_path=tmp_path / "hostnames.json", timeout=0.1).resolve(devices)
+
+    assert time.monotonic() - started < 0.5
+    assert [found.hostname for found in devices] == [None, "router.lan"]
+    # Devices that already have a hostname aren't looked up
+    assert stub.lookups == ["10.0.0.1"]
+
+
+def test_fill_cached_never_looks_up(tmp_path):
+    cache_path = tmp_path / "hostnames.json"
+    HostnameResolver(StubResolver({"10.0.0.1": "nas.lan"}), cache_path=cache_path).resolve([device("10.0.0.1")])
+    stub = StubResolver({"10.0.0.2": "printer.lan"})
+    devices = [device("10.0.0.1"), device("10.0.0.2")]
+
+    waiting = HostnameResolver(stub, cache_path=cache_path).fill_cached(devices)
+
+    assert not stub.lookups
+    assert devices[0].hostname == "nas.lan"
+    assert waiting == [devices[1]]
+
+
+def test_started_lookups_run_in_the_background_until_joined(tmp_path):
+    answer = threading.Event()
+
+    def lookup(ip_addr):
+        answer.wait()
+        return f"{ip_addr}.lan"
+
+    devices = [device("10.0.0.1"), device("10.0.0.2")]
+    started = time.monotonic()
+
+    lookups = HostnameResolver(lookup, cache_path=tmp_path / "hostnames.json").start(devices)
+
+    assert time.monotonic() - started < 0.5
+    assert [found.hostname for found in devices] == [None, None]
+    answer.set()
+    assert sorted(found.ip_addr for found in lookups.join()) == ["10.0.0.1", "10.0.0.2"]
+    assert [found.hostname for found in devices] == ["10.0.0.1.lan", "10.0.0.2.lan"]
+
+
+def test_scan_carries_on_while_hostnames_are_looked_up(tmp_path, monkeypatch, capsys):
+    answer = threading.Event()
+
+    def lookup(ip_addr):
+        answer.wait()
+        return {"10.0.0.1": "nas.lan"}.get(ip_addr)
+
+    monkeypatch.setattr(
+        "src.util.hostname_resolver.HostnameResolver",
+        lambda: HostnameResolver(lookup, cache_path=tmp_path / "hostnames.json"),
+    )
+    scan_result = ScanResult(
+        run_stats={"hosts": {"@up": "1", "@total": "256"}},
+        hosts=[{"address": {"@addr": "10.0.0.1", "@addrtype": "ipv4"}}],
+    )
+    devices = scan_result.get_devices()
+    timings = PhaseTimings()
+
+    lookups = output_host_discovery_and_hostnames(scan_result, devices, False, "10.0.0.0/24", timings)
+
+    assert lookups is not None and devices[0].hostname is None
+    answer.set()
+    output_resolved_hostnames(lookups, timings, None)
+    assert "nas.lan" in capsys.readouterr().out
+    assert "hostnames" in timings.phases
+
+
+def test_hostnames_are_not_looked_up_when_turned_off(monkeypatch):
+    monkeypatch.setattr("src.util.hostname_resolver.HostnameResolver", None)
+    scan_result = ScanResult(run_stats={"hosts": {"@up": "0", "@total": "256"}}, hosts=[])
+
+    assert output_host_discovery_and_hostnames(scan_result, [], False, "10.0.0.0/24", PhaseTimings(), False) is None
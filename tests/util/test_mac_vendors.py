@@ -0,0 +1,137 @@
+import gzip
+
+from generate_mac_prefixes import generate, read_ieee_registry, read_wireshark_manuf
+from src.data.scan_result import ScanResult
+from src.util.mac_vendors import BUNDLED_PREFIXES, OuiIndex, load_index, read_prefixes
+
+
+def test_longest_matching_prefix_names_the_vendor():
+    index = OuiIndex(
+        [
+            ("70B3D5", "IEEE Registration Authority"),
+            ("70B3D51", "Medium Block Vendor"),
+            ("70B3D5123", "Small Block Vendor"),
+        ]
+    )
+
+    assert index.lookup("70:B3:D5:12:34:56") == "Small Block Vendor"
+    assert index.lookup("70-B3-D5-1F-FF-FF") == "Medium Block Vendor"
+    assert index.lookup("70b3.d5ff.ffff") == "IEEE Registration Authority"
+    assert len(index) == 3
+
+
+def test_unknown_and_invalid_addresses_have_no_vendor():
+    index = OuiIndex([("B827EB", "Raspberry Pi Foundation")])
+
+    assert index.lookup("B8:27:EC:00:00:01") is None
+    assert index.lookup("not a mac") is None
+    assert index.lookup(None) is None
+    assert OuiIndex([]).lookup("B8:27:EB:00:00:01") is None
+
+
+def test_later_tables_replace_earlier_entries():
+    index = OuiIndex([("B827EB", "Raspberry Pi"), ("B827EB", "Raspberry Pi Foundation")])
+
+    assert index.lookup("B8:27:EB:00:00:01 | (Unknown Vendor)") == "Raspberry Pi Foundation"
+
+
+def test_reads_the_nmap_mac_prefixes_format(tmp_path):
+    path = tmp_path / "nmap-mac-prefixes"
+    path.write_text("# comment\n000000 Xerox\n0055DA0 Shinko Technos\nnot-hex Broken\n\nB827EB\n", encoding="UTF-8")
+
+    assert list(read_prefixes(path)) == [("000000", "Xerox"), ("0055DA0", "Shinko Technos")]
+    assert not list(read_prefixes(tmp_path / "missing"))
+
+
+def test_bundled_table_has_every_block_size():
+    index = OuiIndex(read_prefixes(BUNDLED_PREFIXES))
+
+    assert len(index) > 40000
+    assert index.lookup("B8:27:EB:12:34:56") == "Raspberry Pi Foundation"
+    assert index.lookup("F0:9F:C2:12:34:56") == "Ubiquiti Inc"
+    assert index.lookup("00:55:DA:01:23:45") == "Shinko Technos co.,ltd."
+    assert index.lookup("00:1B:C5:00:12:34") == "OpenRB.com, Direct SIA"
+
+
+def test_nmap_table_is_laid_over_the_bundled_one(tmp_path, monkeypatch):
+    (tmp_path / "nmap-mac-prefixes").write_text("B827EB Raspberry Pi\n", encoding="UTF-8")
+    monkeypatch.setenv("NMAPDIR", str(tmp_path))
+
+    index = load_index()
+
+    assert index.lookup("B8:27:EB:12:34:56") == "Raspberry Pi"
+    assert index.lookup("F0:9F:C2:12:34:56") == "Ubiquiti Inc"
+
+
+def test_reads_the_ieee_registries(tmp_path):
+    registry = tmp_path / "mam.txt"
+    registry.write_text(
+        "OUI/MA-L   Organization\n\n"
+        "B8-27-EB   (hex)\t\tRaspberry Pi Foundation\n"
+        "B827EB     (base 16)\t\tRaspberry Pi Foundation\n"
+        "\t\t\t\tMountbatten House  Cambridge\n\n"
+        "00-55-DA   (hex)\t\tKoolPOS Inc.\n"
+        "100000-1FFFFF     (base 16)\t\tKoolPOS Inc.\n\n"
+        "40-D8-55   (hex)\t\tAvant Technologies\n"
+        "0D7000-0D7FFF     (base 16)\t\tAvant Technologies\n",
+        encoding="UTF-8",
+    )
+
+    assert list(read_ieee_registry(registry)) == [
+        ("B827EB", "Raspberry Pi Foundation"),
+        ("0055DA1", "KoolPOS Inc."),
+        ("40D8550D7", "Avant Technologies"),
+    ]
+
+
+def test_reads_wireshark_manuf(tmp_path):
+    manuf = tmp_path / "manuf"
+    manuf.write_text(
+        "# comment\n"
+        "00:00:18\tWebsterC\tWebster Computer Corporation\t# Appletalk/Ethernet Gateway\n"
+        "00:00:13\tCamex\n"
+        "00:55:DA:10:00:00/28\tKoolPOS\tKoolPOS Inc.\n"
+        "00:1B:C5:00:10:00/36\tOpenRBco\tOpenRB.com, Direct SIA\n"
+        "01:80:C2:00:00:00/44\tSpanning-tree-(for-bridges)\n",
+        encoding="UTF-8",
+    )
+
+    assert list(read_wireshark_manuf(manuf)) == [
+        ("000018", "Webster Computer Corporation"),
+        ("000013", "Camex"),
+        ("0055DA1", "KoolPOS Inc."),
+        ("001BC5001", "OpenRB.com, Direct SIA"),
+    ]
+
+
+def test_generated_table_prefers_the_later_registries(tmp_path):
+    manuf = tmp_path / "manuf"
+    manuf.write_text("B8:27:EB\tRaspberr\tRaspberry Pi\n00:00:13\tCamex\n", encoding="UTF-8")
+    registry = tmp_path / "oui.txt"
+    registry.write_text(
+        "B8-27-EB   (hex)\t\tRaspberry Pi  Foundation\nB827EB   (base 16)\t\tRaspberry Pi  Foundation\n"
+    )
+    output = tmp_path / "mac-prefixes.gz"
+
+    generate([manuf, registry], output)
+
+    with gzip.open(output, "rt", encoding="UTF-8") as table:
+        assert [line for line in table if not line.startswith("#")] == [
+            "000013 Camex\n",
+            "B827EB Raspberry Pi Foundation\n",
+        ]
+    assert list(read_prefixes(output)) == [("000013", "Camex"), ("B827EB", "Raspberry Pi Foundation")]
+
+
+def test_scan_result_fills_in_missing_vendors():
+    scan_result = ScanResult(
+        run_stats={},
+        hosts={
+            "address": [
+                {"@addr": "192.168.0.2", "@addrtype": "ipv4"},
+                {"@addr": "B8:27:EB:12:34:56", "@addrtype": "mac"},
+            ]
+        },
+    )
+
+    assert scan_result.get_address(0, "mac") == "B8:27:EB:12:34:56 | Raspberry Pi Foundation"
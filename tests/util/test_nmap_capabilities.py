@@ -0,0 +1,87 @@
+import os
+import struct
+from unittest.mock import patch
+
+import pytest
+
+from src.util.nmap_capabilities import (
+    CAP_NET_RAW,
+    VFS_CAP_FLAGS_EFFECTIVE,
+    find_compiled_features,
+    has_cap_net_raw,
+    probe_nmap,
+)
+
+VERSION_OUTPUT = """Nmap version 7.94SVN ( https://nmap.org )
+Platform: x86_64-pc-linux-gnu
+Compiled with: liblua-5.4.6 openssl-3.0.13 libssh2-1.11.0 libz-1.3 libpcre2-10.42 libpcap-1.10.4 nmap-libdnet-1.12 ipv6
+Compiled without:
+Available nsock engines: epoll poll select
+"""
+
+
+@pytest.fixture
+def fake_nmap(tmp_path):
+    nmap = tmp_path / "bin" / "nmap"
+    nmap.parent.mkdir()
+    calls = tmp_path / "calls"
+    nmap.write_text(f"#!/bin/sh\necho run >> {calls}\ncat <<'EOF'\n{VERSION_OUTPUT}EOF\n")
+    nmap.chmod(0o755)
+    return nmap, calls
+
+
+def test_probe_finds_version_and_features(fake_nmap, tmp_path):
+    nmap, _ = fake_nmap
+
+    capabilities = probe_nmap(str(nmap), cache_path=tmp_path / "cache.json")
+
+    assert capabilities.installed
+    assert capabilities.version == "7.94"
+    assert "libpcap" in capabilities.features and "ipv6" in capabilities.features
+    assert not capabilities.cap_net_raw
+
+
+def test_probe_is_cached_until_the_binary_changes(fake_nmap, tmp_path):
+    nmap, calls = fake_nmap
+    cache_path = tmp_path / "cache.json"
+
+    probe_nmap(str(nmap), cache_path=cache_path)
+    cached = probe_nmap(str(nmap), cache_path=cache_path)
+    assert calls.read_text().count("run") == 1
+    assert cached.version == "7.94"
+
+    os.utime(nmap, (0, 12345))
+    probe_nmap(str(nmap), cache_path=cache_path)
+    assert calls.read_text().count("run") == 2
+
+
+def test_probe_without_nmap_installed(tmp_path):
+    capabilities = probe_nmap(str(tmp_path / "missing-nmap"), cache_path=tmp_path / "cache.json")
+
+    assert not capabilities.installed
+
+
+def test_find_compiled_features_without_compiled_line():
+    assert not find_compiled_features("Nmap version 7.95")
+
+
+@pytest.mark.parametrize(
+    "magic_etc, permitted, expected",
+    [
+        (0x02000000 | VFS_CAP_FLAGS_EFFECTIVE, 1 << CAP_NET_RAW, True),
+        (0x02000000, 1 << CAP_NET_RAW, False),
+        (0x02000000 | VFS_CAP_FLAGS_EFFECTIVE, 1 << 12, False),
+    ],
+)
+def test_has_cap_net_raw(magic_etc, permitted, expected):
+    with patch(
+        "src.util.nmap_capabilities.os.getxattr", return_value=struct.pack("<IIIII", magic_etc, permitted, 0, 0, 0)
+    ):
+        assert has_cap_net_raw("/usr/bin/nmap") is expected
+
+
+def test_has_cap_net_raw_without_capabilities(tmp_path):
+    binary = tmp_path / "nmap"
+    binary.touch()
+
+    assert not has_cap_net_raw(str(binary))
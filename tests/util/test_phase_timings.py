@@ -0,0 +1,37 @@
+import pytest
+
+from src.util.phase_timings import PhaseTimings
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def test_phases_are_timed_in_the_order_they_first_ran():
+    clock = FakeClock()
+    timings = PhaseTimings(clock)
+
+    with timings.phase("sweep"):
+        clock.now += 1.5
+    with timings.phase("general port scan"):
+        clock.now += 10
+    with timings.phase("sweep"):
+        clock.now += 0.5
+
+    assert timings.phases == {"sweep": 2.0, "general port scan": 10.0}
+    assert timings.total == 12.0
+
+
+def test_failed_phase_is_still_timed():
+    clock = FakeClock()
+    timings = PhaseTimings(clock)
+
+    with pytest.raises(RuntimeError), timings.phase("sweep"):
+        clock.now += 3
+        raise RuntimeError("nmap failed")
+
+    assert timings.phases == {"sweep": 3}
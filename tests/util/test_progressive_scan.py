@@ -0,0 +1,98 @@
+import random
+
+from src.data.nmapdevice import NmapDevice, OperatingSystem, Port, Service
+from src.data.scan_result import ScanResult
+from src.util.progressive_scan import (
+    ProgressivePortScan,
+    format_port_ranges,
+    parse_port_ranges,
+    port_scan_stages,
+)
+
+LINUX = OperatingSystem(name="Linux 5.4", vendor="Linux", family="Linux")
+UNKNOWN = OperatingSystem(name="(Unknown)", vendor="(Unknown)", family="(Unknown)")
+
+
+def device(port_ids: list[str], os: OperatingSystem = UNKNOWN) -> NmapDevice:
+    return NmapDevice(
+        hostname=None,
+        ip_addr="192.168.1.10",
+        mac_addr=None,
+        os=os,
+        ports=[
+            Port(id=port_id, protocol="tcp", service=Service(name="", product="", os_type="")) for port_id in port_ids
+        ],
+    )
+
+
+def test_port_ranges_round_trip():
+    assert parse_port_ranges("1,3-4,6-7,65535") == {1, 3, 4, 6, 7, 65535}
+    assert format_port_ranges({1, 3, 4, 6, 7, 65535}) == "1,3-4,6-7,65535"
+    assert format_port_ranges(set()) == ""
+
+
+def test_a_single_scan_is_not_staged():
+    assert list(port_scan_stages({"general": False, "extended": True, "full": False})) == [("extended", None)]
+    assert [stage for _, stage in port_scan_stages({"general": True, "full": True}, progressive=False)] == [None, None]
+
+
+def test_each_stage_leaves_out_the_ports_scanned_before():
+    stages = port_scan_stages({"general": True, "extended": True, "full": True})
+
+    scan_type, stage = next(stages)
+    assert (scan_type, stage.exclude_ports, stage.os_detection, stage.final) == ("general", None, True, False)
+    stage.add_scanned_ports("7,9,13,21-23")
+    stage.merge(device(["22"], LINUX))
+
+    scan_type, stage = next(stages)
+    assert (scan_type, stage.exclude_ports, stage.os_detection, stage.final) == (
+        "extended",
+        "7,9,13,21-23",
+        False,
+        False,
+    )
+    stage.add_scanned_ports("1-6,8")
+
+    scan_type, stage = next(stages)
+    assert (scan_type, stage.exclude_ports, stage.final) == ("full", "1-9,13,21-23", True)
+
+
+def test_stages_probe_every_port_exactly_once():
+    generator = random.Random(3)
+    top_100 = set(generator.sample(range(1, 65536), 100))
+    top_1000 = top_100 | set(generator.sample(range(1, 65536), 900))
+    chosen = {"general": top_100, "extended": top_1000, "full": set(range(1, 65536))}
+    probes = 0
+
+    for scan_type, stage in port_scan_stages({"general": True, "extended": True, "full": True}):
+        # What nmap scans with the stage's --exclude-ports
+        scanned = chosen[scan_type] - parse_port_ranges(stage.exclude_ports or "")
+        probes += len(scanned)
+        stage.add_scanned_ports(format_port_ranges(scanned))
+
+    assert probes == 65535
+
+
+def test_stages_merge_into_one_view_per_device():
+    scan = ProgressivePortScan().start_stage(final=False)
+    scan.merge(device(["22", "80"], LINUX))
+
+    merged = scan.start_stage(final=True).merge(device(["8443"]))
+
+    assert [port.id for port in merged.ports] == ["22", "80", "8443"]
+    assert merged.os == LINUX
+
+
+def test_scanned_ports_are_read_from_the_scan_info():
+    scan_result = ScanResult(
+        run_stats={},
+        hosts={},
+        scan_info=[
+            {"@type": "syn", "@protocol": "tcp", "@numservices": "3", "@services": "22,80,443"},
+            {"@type": "udp", "@protocol": "udp", "@numservices": "1", "@services": "53"},
+        ],
+    )
+
+    assert scan_result.get_scanned_ports() == "22,80,443"
+    assert scan_result.get_scanned_ports("udp") == "53"
+    assert ScanResult(run_stats={}, hosts={}).get_scanned_ports() is None
@@ -0,0 +1,83 @@
+import io
+
+import pytest
+from rich.console import Console
+
+from src.util.scan_progress import ScanProgress, format_duration
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+
+def test_snapshot_counts_throughput_and_eta(clock):
+    progress = ScanProgress(clock=clock)
+    progress.add_commands(10)
+    tasks = [progress.start(f"nmap -p 22 10.0.0.{i}") for i in range(4)]
+    clock.now = 2.0
+    progress.complete(tasks[0])
+    progress.complete(tasks[1], success=False)
+
+    snapshot = progress.snapshot()
+
+    assert (snapshot.completed, snapshot.failed, snapshot.in_flight, snapshot.queued) == (2, 1, 2, 6)
+    assert snapshot.throughput == 1.0
+    assert snapshot.eta == 8.0
+
+
+def test_snapshot_lists_slowest_in_flight_targets_first(clock):
+    progress = ScanProgress(slowest=2, clock=clock)
+    progress.add_commands(3)
+    for i in range(3):
+        progress.start(f"nmap -p 22 10.0.0.{i}")
+        clock.now += 1
+
+    assert progress.snapshot().slowest == [("10.0.0.0", 3.0), ("10.0.0.1", 2.0)]
+
+
+def test_completing_an_unknown_task_is_ignored(clock):
+    progress = ScanProgress(clock=clock)
+    progress.complete(42)
+
+    assert progress.snapshot().completed == 0
+
+
+@pytest.mark.parametrize("targets", [10, 5_000])
+def test_rendered_lines_do_not_grow_with_the_number_of_targets(clock, targets):
+    progress = ScanProgress(slowest=5, clock=clock)
+    progress.add_commands(targets)
+    for i in range(min(targets, 20)):
+        progress.start(f"nmap 10.0.{i >> 8}.{i & 0xFF}")
+
+    rendered = io.StringIO()
+    Console(file=rendered, width=200).print(progress)
+
+    assert len(rendered.getvalue().splitlines()) == 6
+
+
+@pytest.mark.parametrize("seconds, expected", [(0, "00:00"), (125.9, "02:05"), (3725, "1:02:05")])
+def test_format_duration(seconds, expected):
+    assert format_duration(seconds) == expected
+
+
+def test_timed_out_commands_count_as_failed_and_measured(clock):
+    progress = ScanProgress(clock=clock)
+    progress.add_commands(4)
+    progress.complete(progress.start("nmap -p 22 10.0.0.1"))
+    progress.complete(progress.start("nmap -p 22 10.0.0.2"), success=False)
+    progress.complete(progress.start("nmap -p 22 10.0.0.3"), success=False, timed_out=True)
+    # nmap exits 0 when a host hits --host-timeout
+    progress.complete(progress.start("nmap -p 22 10.0.0.4"), timed_out=True)
+
+    snapshot = progress.snapshot()
+
+    assert (snapshot.completed, snapshot.failed, snapshot.timed_out, snapshot.measured) == (4, 3, 2, 3)
@@ -0,0 +1,59 @@
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from src.util.display import Display
+from src.util.nmap_capabilities import NmapCapabilities
+from src.util.scheduler import Scheduler
+from src.whos_home import main
+
+
+@pytest.fixture(autouse=True)
+def reset_display():
+    yield
+    # pylint: disable=protected-access
+    Display._instance = None
+    Display._headless = False
+    Display._machine_output = False
+
+
+def test_headless_disables_live_rendering():
+    assert Display().live
+
+    Display().enable_headless()
+
+    assert Display().headless
+    assert not Display().live
+
+
+@patch("src.util.scheduler.time.sleep")
+@patch("src.util.scheduler.schedule.idle_seconds", return_value=42.5)
+def test_wait_for_next_run_sleeps_until_next_job(mock_idle_seconds, mock_sleep):
+    Scheduler.wait_for_next_run()
+
+    mock_sleep.assert_called_once_with(42.5)
+
+
+@patch("src.util.scheduler.time.sleep")
+@patch("src.util.scheduler.schedule.idle_seconds", return_value=-3)
+def test_wait_for_next_run_does_not_sleep_when_a_job_is_overdue(mock_idle_seconds, mock_sleep):
+    Scheduler.wait_for_next_run()
+
+    mock_sleep.assert_called_once_with(0)
+
+
+@patch("src.util.scheduler.Scheduler.schedule_task")
+@patch("src.util.nmap_capabilities.probe_nmap", return_value=NmapCapabilities(path="nmap", version="7.95"))
+@patch("src.executor.nmap_executor.NmapExecutor")
+def test_every_shard_is_scanned_on_a_scheduled_pass(mock_executor, mock_probe, mock_schedule_task):
+    mock_executor.return_value.execute_icmp_host_discovery.return_value = MagicMock(success=False)
+    # Runs a single scheduled pass instead of looping forever
+    mock_schedule_task.side_effect = lambda schedule_value, main_fn, **main_kwargs: main_fn(**main_kwargs)
+
+    main(host_range="10.0.0.0/14", schedule="1h", only_icmp=True, icmp_and_arp=False, headless=True)
+
+    scanned = [(call.kwargs["host"], call.kwargs["cidr"]) for call in mock_executor.call_args_list]
+    shards = [("10.0.0.0", "16"), ("10.1.0.0", "16"), ("10.2.0.0", "16"), ("10.3.0.0", "16")]
+    assert scanned == shards + shards
+    mock_schedule_task.assert_called_once()
+    assert mock_schedule_task.call_args.kwargs["host_range"] == "10.0.0.0/14"
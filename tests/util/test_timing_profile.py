@@ -0,0 +1,73 @@
+from src.data.timing_template import TimingTemplate
+from src.util.scan_progress import ScanProgress
+from src.util.timing_profile import NetworkHistory, NetworkStats, choose_profile, network_size
+
+
+def test_small_network_discovery_keeps_insane_timing():
+    profile = choose_profile("discovery", 256)
+
+    assert profile.describe() == "-T5 --max-retries 1"
+
+
+def test_large_network_discovery_sets_a_minimum_rate_and_host_group():
+    profile = choose_profile("discovery", network_size("16"))
+
+    assert profile.describe() == "-T4 --max-retries 2 --min-rate 1000 --min-hostgroup 1024"
+
+
+def test_lossy_network_gets_more_retries_and_no_minimum_rate():
+    profile = choose_profile("discovery", network_size("20"), NetworkStats(srtt=0.01, failure_rate=0.5, runs=3))
+
+    assert profile.template == TimingTemplate.AGGRESSIVE
+    assert profile.max_retries == 3
+    assert profile.min_rate is None
+
+
+def test_slow_network_port_scan_backs_off():
+    profile = choose_profile("extended", 1, NetworkStats(srtt=0.25, runs=1))
+
+    assert profile.describe() == "-T4 --max-retries 1 --host-timeout 360s"
+
+
+def test_forced_template_is_used_on_its_own():
+    profile = choose_profile("discovery", network_size("16"), template=TimingTemplate.NORMAL)
+
+    assert profile.describe() == "-T3"
+    assert profile.options == {}
+
+
+def test_network_size():
+    assert network_size("24") == 256
+    assert network_size("32") == 1
+    assert network_size("not a prefix") == 1
+
+
+def test_history_is_smoothed_and_saved(tmp_path):
+    history = NetworkHistory(tmp_path / "networks.json")
+
+    history.record("192.168.1.0/24", [0.002, 0.004, 0.1], completed=10, timed_out=0).save()
+    history.record("192.168.1.0/24", [0.008], completed=10, timed_out=4).save()
+
+    stats = NetworkHistory.load(tmp_path / "networks.json").get("192.168.1.0/24")
+    assert stats.runs == 2
+    assert abs(stats.srtt - (0.75 * 0.004 + 0.25 * 0.008)) < 1e-9
+    assert abs(stats.failure_rate - 0.1) < 1e-9
+
+
+def test_failures_that_did_not_time_out_leave_the_failure_rate_unchanged(tmp_path):
+    history = NetworkHistory(tmp_path / "networks.json")
+    history.record("192.168.1.0/24", [0.004], completed=10, timed_out=2)
+    progress = ScanProgress()
+    progress.add_commands(4)
+    progress.complete(progress.start("nmap -p 22 192.168.1.1"), success=False)
+    progress.complete(progress.start("nmap -p 22 192.168.1.2"), success=False)
+    snapshot = progress.snapshot()
+
+    history.record("192.168.1.0/24", [0.004], snapshot.measured, snapshot.timed_out)
+
+    assert snapshot.failed == 2
+    assert abs(history.get("192.168.1.0/24").failure_rate - 0.2) < 1e-9
+
+
+def test_missing_history_is_empty(tmp_path):
+    assert NetworkHistory.load(tmp_path / "missing.json").get("10.0.0.0/8") is None